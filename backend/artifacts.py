@@ -0,0 +1,62 @@
+import os
+import re
+
+# Model artifact file names, shared by the server and the training scripts.
+# Artifacts are named <dataset>_<method><extension>, updated models add a version: <dataset>_<method>.v<n><extension>.
+
+# Forecasting methods, longest first so "sarima_svr" is not mistaken for "svr"
+METHODS = ["sarima_svr", "sarima", "svr", "lstm"]
+# Artifact extensions in order of preference when a model has several artifacts,
+# sarima snapshots are read instead of the pickled SARIMAX results
+ARTIFACT_EXTENSIONS = [".npz", ".pkl", ".h5"]
+VERSION_PATTERN = re.compile(r"^(.*)\.v(\d+)$")
+
+
+# Split artifact file name into model name, extension and version, None if it isn't a model artifact.
+# Artifacts without a version are version 1.
+def parse_artifact_name(file_name):
+    name, extension = os.path.splitext(file_name)
+    if extension not in ARTIFACT_EXTENSIONS:
+        return None
+    version = 1
+    match = VERSION_PATTERN.match(name)
+    if match is not None:
+        name, version = match.group(1), int(match.group(2))
+    for method in METHODS:
+        if name.endswith("_" + method) and len(name) > len(method) + 1:
+            return name, extension, version
+    return None
+
+
+def artifact_file_name(name, extension, version=1):
+    if version == 1:
+        return name + extension
+    return f"{name}.v{version}{extension}"
+
+
+# Path of the artifact of every model in the directory, the newest version in the preferred format
+def find_artifacts(model_dir, extensions=ARTIFACT_EXTENSIONS):
+    found = {}
+    if os.path.isdir(model_dir):
+        for file_name in sorted(os.listdir(model_dir)):
+            parsed = parse_artifact_name(file_name)
+            if parsed is None:
+                continue
+            name, extension, version = parsed
+            if extension not in extensions:
+                continue
+            rank = (version, -ARTIFACT_EXTENSIONS.index(extension))
+            if name not in found or rank > found[name][0]:
+                found[name] = (rank, os.path.join(model_dir, file_name))
+    return {name: path for name, (_, path) in found.items()}
+
+
+# Newest version of a model, 0 if it has no artifacts
+def latest_version(model_dir, name):
+    versions = [0]
+    if os.path.isdir(model_dir):
+        for file_name in os.listdir(model_dir):
+            parsed = parse_artifact_name(file_name)
+            if parsed is not None and parsed[0] == name:
+                versions.append(parsed[2])
+    return max(versions)
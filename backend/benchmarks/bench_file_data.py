@@ -0,0 +1,55 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+
+# Run from the backend directory: python benchmarks/bench_file_data.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import build_row_index, read_rows
+from suite import measure, time_once
+
+
+# Whole file as row objects, the default /file/data response
+def rows_response(file_path):
+    with open(file_path, "r") as f:
+        file_data = list(csv.reader(f))
+    headers = file_data[0]
+    return json.dumps({"columns": headers, "rows": [dict(zip(headers, row)) for row in file_data[1:]]})
+
+
+# Whole file as column arrays
+def columns_response(file_path):
+    headers, rows, total = read_rows(file_path)
+    return json.dumps({"columns": headers, "values": [[row[i] for row in rows] for i in range(len(headers))],
+                       "total": total})
+
+
+# One page of row objects read through the row index
+def page_response(file_path, offset, limit):
+    headers, rows, total = read_rows(file_path, offset, limit)
+    return json.dumps({"columns": headers, "rows": [dict(zip(headers, row)) for row in rows], "total": total})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "data.csv")
+        for rows in args.rows:
+            with open(file_path, "w") as f:
+                f.write("\n".join(['Laikotarpis,"Kiekis, kg"'] + ["2015-01-01,2295.0"] * rows))
+            _, index_time = time_once(lambda: build_row_index(file_path))
+            print(f"{rows} rows, row index built in {index_time * 1000:.1f}ms")
+            for name, func, func_args in [("rows", rows_response, (file_path,)),
+                                          ("columns", columns_response, (file_path,)),
+                                          ("first page", page_response, (file_path, 0, args.limit)),
+                                          ("last page", page_response, (file_path, rows - args.limit, args.limit))]:
+                body = func(*func_args)
+                elapsed = measure(lambda: func(*func_args), args.repeat)["median"]
+                print(f"  {name:10} {elapsed * 1000:9.1f}ms {len(body) / 1024:10.1f}KB")
@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+# Run from the backend directory: python benchmarks/bench_inference_pool.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import InferencePool
+
+DATASETS = ["snow_cleaners", "notebooks", "cheese"]
+METHODS = ["svr", "sarima_svr", "lstm"]
+STEPS = [12, 24, 60]
+
+
+# Forecast throughput of the inference pool with the given number of worker processes
+async def measure_throughput(processes, requests):
+    pool = InferencePool(processes, requests, {}, 1)
+    pool.start()
+    await pool.wait_ready()
+    jobs = itertools.cycle(itertools.product(DATASETS, METHODS, STEPS))
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*[pool.forecast(f"{dataset}_{method}", method, f"create_models/{dataset}.csv", steps)
+                               for dataset, method, steps in itertools.islice(jobs, requests)])
+        return requests / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    process_counts = sorted({1, *[2 ** i for i in range(1, args.max_processes.bit_length())], args.max_processes})
+    baseline = None
+    for processes in process_counts:
+        throughput = asyncio.run(measure_throughput(processes, args.requests))
+        baseline = baseline or throughput
+        print(f"{processes:3} processes: {throughput:8.1f} forecasts/s  speedup {throughput / baseline:5.2f}x")
@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import numpy as np
+
+# Run from the backend directory: python benchmarks/bench_lstm_inference.py
+# Every runtime is measured in its own process so peak memory isn't shared between them.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from suite import measure, time_once
+
+RUNTIMES = ["keras", "tf_function", "tflite"]
+
+
+# Peak resident memory of this process in bytes
+def peak_memory():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure_runtime(runtime, model_path, repeat):
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "3")
+    import tensorflow as tf
+    from keras.models import load_model
+    from lstm_runtime import compile_lstm
+    from rollout import lstm_recursive_forecast
+    tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
+    base_memory = peak_memory()
+    model, load_time = time_once(lambda: compile_lstm(load_model(model_path), runtime))
+    lag = model.input_shape[1]
+    single = np.random.rand(1, lag, 1).astype(np.float32)
+    batch = np.random.rand(32, lag, 1).astype(np.float32)
+    return {
+        "runtime": runtime,
+        "model": type(model).__name__,
+        "load_ms": load_time * 1000,
+        "predict_1_ms": measure(lambda: model.predict(single, verbose=0), repeat)["median"] * 1000,
+        "predict_32_ms": measure(lambda: model.predict(batch, verbose=0), repeat)["median"] * 1000,
+        "rollout_120_ms": measure(lambda: lstm_recursive_forecast(model, single[:, :, 0], 120),
+                                  repeat)["median"] * 1000,
+        "memory_mb": (peak_memory() - base_memory) / 2 ** 20,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="models/cheese_lstm.h5")
+    parser.add_argument("--runtime", choices=RUNTIMES)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.runtime is not None:
+        print(json.dumps(measure_runtime(args.runtime, args.model, args.repeat)))
+    else:
+        print(f"{'runtime':12} {'load':>10} {'predict 1':>10} {'predict 32':>11} {'rollout 120':>12} {'memory':>10}")
+        for runtime in RUNTIMES:
+            output = subprocess.run([sys.executable, __file__, "--runtime", runtime, "--model", args.model,
+                                     "--repeat", str(args.repeat)], capture_output=True, text=True, check=True)
+            result = json.loads(output.stdout.strip().splitlines()[-1])
+            print(f"{runtime:12} {result['load_ms']:8.1f}ms {result['predict_1_ms']:8.2f}ms "
+                  f"{result['predict_32_ms']:9.2f}ms {result['rollout_120_ms']:10.2f}ms {result['memory_mb']:8.1f}MB")
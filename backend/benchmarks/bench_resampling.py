@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import numpy as np
+
+# Run from the backend directory: python benchmarks/bench_resampling.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from constants import INTERPOLATION_SIZE
+from resampling import upsample, downsample
+from suite import measure
+
+
+# Previous loop based implementations of interpolate_data and undo_interpolation
+def interpolate_data_loop(df, num_interpolations, endpoint=False):
+    interpolated_values = []
+    for i in range(len(df) - 1):
+        interpolated = np.linspace(
+            df[i], df[i + 1], num=num_interpolations, endpoint=endpoint)
+        interpolated_values.extend(interpolated)
+    return np.array(interpolated_values)
+
+
+def undo_interpolation_loop(df):
+    array = []
+    for i in range(0, len(df), INTERPOLATION_SIZE):
+        array.append(df[i])
+    return array
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 2000, 20000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        data = rng.random(size) * 1e5
+        dense = upsample(data, INTERPOLATION_SIZE)
+        assert np.array_equal(dense, interpolate_data_loop(data, INTERPOLATION_SIZE))
+        assert np.array_equal(downsample(dense, INTERPOLATION_SIZE), undo_interpolation_loop(dense))
+        loop_up = measure(lambda: interpolate_data_loop(data, INTERPOLATION_SIZE), args.repeat)["min"]
+        linear = measure(lambda: upsample(data, INTERPOLATION_SIZE), args.repeat)["min"]
+        spline = measure(lambda: upsample(data, INTERPOLATION_SIZE, mode="spline"), args.repeat)["min"]
+        loop_down = measure(lambda: undo_interpolation_loop(dense), args.repeat)["min"]
+        down = measure(lambda: downsample(dense, INTERPOLATION_SIZE), args.repeat)["min"]
+        columns = measure(lambda: upsample(np.stack([data] * 4, axis=1), INTERPOLATION_SIZE), args.repeat)["min"]
+        print(f"{size:>6} points: upsample loop {loop_up * 1000:8.3f}ms  linear {linear * 1000:7.3f}ms "
+              f"({loop_up / linear:5.0f}x)  spline {spline * 1000:7.3f}ms  4 columns {columns * 1000:7.3f}ms  |  "
+              f"downsample loop {loop_down * 1000:7.3f}ms  slice {down * 1000:6.4f}ms ({loop_down / down:6.0f}x)")
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import numpy as np
+
+# Run from the backend directory: python benchmarks/bench_rollout.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from forecasting import BatchData
+from registry import ModelRegistry
+from rollout import recursive_forecast, lstm_recursive_forecast
+from suite import measure
+
+
+# Previous rolling forecast, one predict call and one append per block of 12 values
+def rollout_loop(model, scaler, X, steps, lstm):
+    forecasts = []
+    if lstm:
+        X = X.reshape(X.shape[0], X.shape[1], 1)
+        forecast = model.predict(X[-1:], verbose=0)
+        X = np.append(X[-1:][:, 12:, :], forecast.reshape(1, 12, 1), axis=1)
+        forecasts.append(scaler.inverse_transform(forecast.reshape(-1, 1)).flatten())
+        for _ in range(steps//12 + 1):
+            next_forecast = model.predict(X, verbose=0)
+            forecasts.append(scaler.inverse_transform(next_forecast.reshape(-1, 1)).flatten())
+            X = np.append(X[-1:][:, 12:, :], next_forecast.reshape(1, 12, 1), axis=1)
+    else:
+        forecast = model.predict(X[-1:])
+        X = np.append(X[-1:][:, 12:], forecast.reshape(-1, 12), axis=1)
+        forecasts.append(scaler.inverse_transform(forecast.reshape(-1, 1)).flatten())
+        for _ in range(steps//12 + 1):
+            next_forecast = model.predict(X)
+            forecasts.append(scaler.inverse_transform(next_forecast.reshape(-1, 1)).flatten())
+            X = np.append(X[-1:][:, 12:], next_forecast.reshape(-1, 12), axis=1)
+    return np.array(forecasts).flatten()[:steps]
+
+
+def rollout_engine(model, scaler, X, steps, lstm):
+    if lstm:
+        forecast = lstm_recursive_forecast(model, X[-1:], steps)
+    else:
+        forecast = recursive_forecast(model.predict, X[-1:], steps)
+    return scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="cheese")
+    parser.add_argument("--horizons", type=int, nargs="+", default=[12, 36, 60, 120])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    # Long svr rollouts of some models diverge, overflow warnings are expected there
+    np.seterr(over="ignore", invalid="ignore")
+
+    registry = ModelRegistry("models")
+    registry.discover()
+    data = BatchData()
+    for method, feature_range, lstm in [("svr", (0, 1), False), ("lstm", (-1, 1), True)]:
+        model = registry.get(f"{args.dataset}_{method}")
+        scaler, _, X = data.prepared(f"create_models/{args.dataset}.csv", feature_range)
+        # Warm up graph tracing and predict adapters
+        rollout_engine(model, scaler, X, 12, lstm)
+        rollout_loop(model, scaler, X, 12, lstm)
+        for steps in args.horizons:
+            loop = measure(lambda: rollout_loop(model, scaler, X, steps, lstm), args.repeat)["min"]
+            engine = measure(lambda: rollout_engine(model, scaler, X, steps, lstm), args.repeat)["min"]
+            print(f"{method:5} {steps:4} steps: per-block loop {loop * 1000:8.2f}ms  "
+                  f"rollout engine {engine * 1000:8.2f}ms  ({loop / engine:5.1f}x)")
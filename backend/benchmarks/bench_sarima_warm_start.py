@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+
+# Run from the backend directory: python benchmarks/bench_sarima_warm_start.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "create_models"))
+from dependencies import np, product
+from constants import CROSS_VALIDATION_SPLITS, TEST_SIZE_SAMPLES_SARIMA
+from utilities import read_data
+import arima
+from suite import time_once
+
+
+# Every configuration on every fold in this process, in grid order like a worker runs its chunk
+def search(data, configs, warm_start, fold_update):
+    arima._fitted.clear()
+
+    def score(params):
+        evaluate = arima.make_ARIMA_trial({"data": data}, (warm_start, fold_update), params)
+        return np.mean([evaluate(fold) for fold in range(CROSS_VALIDATION_SPLITS)])
+    scores, elapsed = time_once(lambda: [score(params) for params in configs])
+    iterations = sum(fitted["iterations"] for fitted in arima._fitted.values())
+    return np.array(scores), iterations, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="create_models/cheese.csv")
+    parser.add_argument("--combinations", type=int, default=60)
+    args = parser.parse_args()
+
+    df = np.array(read_data(args.dataset)).flatten().astype(float)
+    data = df[:-TEST_SIZE_SAMPLES_SARIMA]
+    configs = list(product(product(range(0, 3), range(0, 2), range(0, 3)),
+                           product(range(0, 3), range(0, 2), range(0, 3), [12])))
+    configs = configs[:args.combinations]
+    print(f"{len(configs)} configurations, {CROSS_VALIDATION_SPLITS} folds")
+    cold_scores, cold_iterations, cold_time = search(data, configs, False, "refit")
+    print(f"  {'cold start':22} {cold_iterations:6} optimizer iterations {cold_time:8.2f}s  "
+          f"best {configs[np.argmin(cold_scores)]} mae {cold_scores.min():.3f}")
+    for label, warm_start, fold_update in [("warm start", True, "refit"), ("append previous fold", False, "append"),
+                                           ("extend first fold", False, "extend")]:
+        scores, iterations, elapsed = search(data, configs, warm_start, fold_update)
+        print(f"  {label:22} {iterations:6} optimizer iterations {elapsed:8.2f}s  "
+              f"best {configs[np.argmin(scores)]} mae {scores.min():.3f}, median relative mae change "
+              f"{np.median(np.abs(scores - cold_scores) / cold_scores):.2e}")
@@ -0,0 +1,36 @@
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Run from the backend directory: python benchmarks/bench_series_store.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import build_series_store
+from forecasting import read_series
+from suite import measure, time_once
+
+
+# Previous series reading, csv parsed on every call
+def read_series_csv(file_path):
+    df = pd.read_csv(file_path)
+    return np.array(df[df.select_dtypes(include=[np.number]).columns]).flatten()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10000, 1000000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_path = os.path.join(directory, "data.csv")
+        for rows in args.rows:
+            dates = pd.date_range("1900-01-01", periods=rows, freq="D")
+            pd.DataFrame({"Laikotarpis": dates, "Kiekis": np.random.rand(rows) * 1000}).to_csv(file_path, index=False)
+            _, convert = time_once(lambda: build_series_store(file_path))
+            csv_time = measure(lambda: read_series_csv(file_path), args.repeat)["median"]
+            store_time = measure(lambda: read_series(file_path), args.repeat)["median"]
+            print(f"{rows:8} rows: conversion {convert * 1000:8.1f}ms  csv read {csv_time * 1000:8.2f}ms  "
+                  f"store read {store_time * 1000:6.3f}ms")
@@ -0,0 +1,61 @@
+import argparse
+import os
+import sys
+from multiprocessing import Pool
+
+# Run from the backend directory: python benchmarks/bench_svr_search.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "create_models"))
+from dependencies import np, SVR, MultiOutputRegressor, MinMaxScaler, TimeSeriesSplit, ParameterGrid, mean_absolute_error
+from constants import CROSS_VALIDATION_SPLITS, TEST_SIZE_SAMPLES
+from utilities import read_data, preprocess_data
+from svr import find_best_SVR_parameters
+from suite import time_once
+
+
+# Previous search, static batches of combinations each fitted with a multi output svr using all cores
+def find_best_batch(parameter_combinations, X, Y, scaler):
+    best_mae, best_params = float("inf"), None
+    tscv = TimeSeriesSplit(n_splits=CROSS_VALIDATION_SPLITS, test_size=1)
+    for params in parameter_combinations:
+        svr = MultiOutputRegressor(SVR(**params), n_jobs=-1)
+        fold_mae = []
+        for train_index, test_index in tscv.split(X):
+            svr.fit(X[train_index], Y[train_index])
+            test_forecast = scaler.inverse_transform(svr.predict(X[test_index]).reshape(-1, 1))
+            fold_mae.append(mean_absolute_error(scaler.inverse_transform(Y[test_index].reshape(-1, 1)), test_forecast))
+        avg_mae = sum(fold_mae) / len(fold_mae)
+        if avg_mae < best_mae:
+            best_mae, best_params = avg_mae, params
+    return [best_params, best_mae]
+
+
+def search_batches(param_combinations, X, Y, scaler, processes):
+    batch_size = max(1, len(param_combinations) // processes)
+    with Pool(processes) as pool:
+        batches = [param_combinations[i:i + batch_size] for i in range(0, len(param_combinations), batch_size)]
+        results = pool.starmap(find_best_batch, [(batch, X, Y, scaler) for batch in batches])
+    return min(results, key=lambda x: x[1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="create_models/cheese.csv")
+    parser.add_argument("--combinations", type=int, default=400)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, os.cpu_count()])
+    args = parser.parse_args()
+
+    df = np.array(read_data(args.dataset)).flatten()
+    scaler = MinMaxScaler()
+    X, Y = preprocess_data(scaler.fit_transform(df.reshape(-1, 1)))
+    X, Y = X[:-TEST_SIZE_SAMPLES], Y[:-TEST_SIZE_SAMPLES]
+    parameter_grid = {"C": np.arange(0.8, 1.2, 0.1), "gamma": [*np.arange(0.05, 5, 0.5), 'auto', 'scale'],
+                      "kernel": ['poly', 'rbf', 'linear', 'sigmoid'], "epsilon": np.arange(0.05, 0.5, 0.05),
+                      "degree": [2, 3, 4, 5, 6]}
+    combinations = list(ParameterGrid(parameter_grid))
+    # Evenly spread sample of the grid
+    combinations = combinations[::max(1, len(combinations) // args.combinations)]
+    for processes in sorted(set(args.processes)):
+        batch_result, batch_time = time_once(lambda: search_batches(combinations, X, Y, scaler, processes))
+        task_result, task_time = time_once(lambda: find_best_SVR_parameters(combinations, X, Y, scaler, processes))
+        print(f"{processes:3} processes, {len(combinations)} combinations: static batches {batch_time:7.2f}s  "
+              f"task scheduler {task_time:7.2f}s  same result {batch_result[0] == task_result[0]}")
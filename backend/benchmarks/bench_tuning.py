@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+
+# Run from the backend directory: python benchmarks/bench_tuning.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "create_models"))
+from dependencies import np, product, MinMaxScaler, ParameterGrid
+from constants import CROSS_VALIDATION_SPLITS, TEST_SIZE_SAMPLES, TEST_SIZE_SAMPLES_SARIMA
+from utilities import read_data, preprocess_data
+from tuning import tune, STRATEGIES
+from svr import make_SVR_trial
+from arima import make_ARIMA_trial
+
+
+# SVR grid on the windowed series
+def svr_search(df, combinations):
+    scaler = MinMaxScaler()
+    X, Y = preprocess_data(scaler.fit_transform(df.reshape(-1, 1)))
+    X, Y = X[:-TEST_SIZE_SAMPLES], Y[:-TEST_SIZE_SAMPLES]
+    parameter_grid = {"C": np.arange(0.8, 1.2, 0.1), "gamma": [*np.arange(0.05, 5, 0.5), 'auto', 'scale'],
+                      "kernel": ['poly', 'rbf', 'linear', 'sigmoid'], "epsilon": np.arange(0.05, 0.5, 0.05),
+                      "degree": [2, 3, 4, 5, 6]}
+    configs = list(ParameterGrid(parameter_grid))
+    configs = configs[::max(1, len(configs) // combinations)]
+    return make_SVR_trial, configs, {"X": X, "Y": Y}, scaler
+
+
+# SARIMA orders on the training part of the series
+def sarima_search(df, combinations):
+    configs = list(product(product(range(0, 3), range(0, 2), range(0, 3)),
+                           product(range(0, 3), range(0, 2), range(0, 3), [12])))
+    configs = configs[::max(1, len(configs) // combinations)]
+    return make_ARIMA_trial, configs, {"data": df[:-TEST_SIZE_SAMPLES_SARIMA]}, (False, "refit")
+
+
+SEARCHES = {"svr": svr_search, "sarima": sarima_search}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default="create_models/cheese.csv")
+    parser.add_argument("--search", choices=list(SEARCHES), nargs="+", default=list(SEARCHES))
+    parser.add_argument("--combinations", type=int, default=60)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    df = np.array(read_data(args.dataset)).flatten().astype(float)
+    for name in args.search:
+        make_trial, configs, arrays, context = SEARCHES[name](df, args.combinations)
+        reports = {strategy: tune(make_trial, configs, CROSS_VALIDATION_SPLITS, arrays, context, strategy,
+                                  args.processes) for strategy in STRATEGIES}
+        exhaustive = reports["exhaustive"]
+        for strategy, report in reports.items():
+            print(f"{name:6} {strategy:10} {report['fits']:5} fits {report['time']:8.2f}s  mae {report['mae']:12.3f}  "
+                  f"same params as exhaustive {report['params'] == exhaustive['params']}")
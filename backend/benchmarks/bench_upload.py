@@ -0,0 +1,55 @@
+import argparse
+import os
+import sys
+import tempfile
+import tracemalloc
+
+# Run from the backend directory: python benchmarks/bench_upload.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import save_upload
+from suite import time_once
+
+
+# Previous upload handling, whole file read, decoded and split in memory
+def save_upload_in_memory(source, file_path, min_rows):
+    content = source.read().decode("utf-8")
+    cleaned_content = [line for line in content.splitlines() if line.strip()]
+    if len(cleaned_content) >= min_rows:
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(cleaned_content))
+    return len(cleaned_content)
+
+
+# Write csv file of about the given size with an empty line every 10 rows
+def write_dataset(path, size_mb):
+    row = "2015-01-01,2295.0\n"
+    rows = size_mb * 1024 * 1024 // len(row)
+    with open(path, "w") as f:
+        f.write("Laikotarpis,Kiekis\n")
+        for i in range(rows):
+            f.write(row if i % 10 else "\n")
+
+
+# Peak traced memory in MB and time of one upload
+def measure(save, source_path, target_path):
+    with open(source_path, "rb") as source:
+        tracemalloc.start()
+        _, elapsed = time_once(lambda: save(source, target_path, 36))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak / 2 ** 20, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        source_path = os.path.join(directory, "upload.csv")
+        target_path = os.path.join(directory, "saved.csv")
+        for size_mb in args.sizes:
+            write_dataset(source_path, size_mb)
+            for name, save in [("in memory", save_upload_in_memory), ("streaming", save_upload)]:
+                peak, elapsed = measure(save, source_path, target_path)
+                print(f"{size_mb:5}MB {name:10} peak memory {peak:8.1f}MB  time {elapsed:6.2f}s")
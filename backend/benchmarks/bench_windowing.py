@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import numpy as np
+
+# Run from the backend directory: python benchmarks/bench_windowing.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from constants import LAG_COUNT, SLIDING_WINDOW_SIZE, FORECASTING_PERIOD
+from windowing import make_windows
+from suite import measure
+
+
+# Previous loop based implementation of preprocess_data
+def preprocess_data_loop(data):
+    X = []
+    Y = []
+    start_index = len(data) % LAG_COUNT
+    for i in range(start_index, len(data)-LAG_COUNT, SLIDING_WINDOW_SIZE):
+        X.append(data[i:i + LAG_COUNT])
+        Y.append(data[i + LAG_COUNT:i + LAG_COUNT+FORECASTING_PERIOD])
+    X = np.array(X).reshape(-1, LAG_COUNT)
+    Y = np.array(Y).reshape(-1, FORECASTING_PERIOD)
+    return X, Y
+
+
+def preprocess_data_strided(data):
+    return make_windows(data, LAG_COUNT, FORECASTING_PERIOD, SLIDING_WINDOW_SIZE, len(data) % LAG_COUNT)
+
+
+# Strided windows copied into contiguous arrays, for consumers that need them
+def preprocess_data_strided_copy(data):
+    X, Y = preprocess_data_strided(data)
+    return np.ascontiguousarray(X), np.ascontiguousarray(Y)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        data = rng.random((size, 1))
+        loop = measure(lambda: preprocess_data_loop(data), args.repeat)["min"]
+        strided = measure(lambda: preprocess_data_strided(data), args.repeat)["min"]
+        copied = measure(lambda: preprocess_data_strided_copy(data), args.repeat)["min"]
+        print(f"{size:>9} points: loop {loop * 1000:9.3f}ms  strided view {strided * 1000:7.3f}ms "
+              f"({loop / strided:8.0f}x)  strided copy {copied * 1000:7.3f}ms ({loop / copied:6.1f}x)")
@@ -0,0 +1,132 @@
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Benchmark cases of the server: windowing, scaling, resampling and the forecasts of every method,
+# run by suite.py
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+from sklearn.preprocessing import MinMaxScaler
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+from constants import LAG_COUNT, SLIDING_WINDOW_SIZE, TEST_SIZE_SAMPLES_ARIMA, INTERPOLATION_SIZE
+from functions import preprocess_data
+from windowing import lag_matrix
+from resampling import upsample
+from storage import build_derived
+from registry import ModelRegistry
+from forecasting import compute_forecasts
+
+DATASETS = ["snow_cleaners", "notebooks", "cheese"]
+METHODS = ["svr", "lstm", "sarima", "sarima_svr"]
+# Validation forecast and extrapolations of one, five and ten years
+HORIZONS = [12, 24, 60, 120]
+DATA_DIR = os.path.join(BACKEND_DIR, "create_models")
+
+
+def bundled_series(name):
+    df = pd.read_csv(os.path.join(DATA_DIR, f"{name}.csv"))
+    return np.array(df.select_dtypes(include=[np.number])).flatten().astype(np.float64)
+
+
+# Yearly seasonal series with a trend and noise, the same in every run
+def synthetic_series(size):
+    rng = np.random.default_rng(size)
+    t = np.arange(size)
+    return 1000 + 0.01 * t + 200 * np.sin(2 * np.pi * t / 12) + rng.normal(0, 50, size)
+
+
+# (label, series) of the bundled datasets and the synthetic series of the given sizes
+def all_series(sizes):
+    return [(name, lambda name=name: bundled_series(name)) for name in DATASETS] + \
+           [(f"synthetic_{size}", lambda size=size: synthetic_series(size)) for size in sizes]
+
+
+# Uploads the forecasts read, written once into a temporary directory with their binary stores
+class Uploads:
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix="forecast-bench-")
+        self.paths = {}
+        atexit.register(shutil.rmtree, self.directory, True)
+
+    def path(self, label, series):
+        if label not in self.paths:
+            path = os.path.join(self.directory, f"{label}.csv")
+            pd.DataFrame({"Laikotarpis": pd.date_range("2000-01-01", periods=len(series), freq="h"),
+                          "Kiekis": series}).to_csv(path, index=False)
+            build_derived(path)
+            self.paths[label] = path
+        return path
+
+
+# Sarima model of the dataset, the saved model if there is one, otherwise fitted with the parameters of
+# the training config like create_models does
+def sarima_model(registry, dataset, series):
+    model = registry.get(f"{dataset}_sarima")
+    if model is not None:
+        return model
+    with open(os.path.join(DATA_DIR, "training.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    params = next(item["params"]["sarima"] for item in config["datasets"] if item["name"] == dataset)
+    order, seasonal_order = (tuple(order) for order in params)
+    return SARIMAX(series[:-TEST_SIZE_SAMPLES_ARIMA], order=order, seasonal_order=seasonal_order).fit(disp=0)
+
+
+def kernel_case(func, series):
+    def setup():
+        data = series()
+        return lambda: func(data)
+    return setup
+
+
+def forecast_case(models, model_name, method_name, file_path, steps):
+    def setup():
+        get_model = models()
+        return lambda: compute_forecasts(get_model, [(model_name, method_name, file_path, steps)])
+    return setup
+
+
+def cases(options):
+    result = []
+    for label, series in all_series(options.sizes):
+        result.append((f"windowing/preprocess_data/{label}", kernel_case(preprocess_data, series)))
+        result.append((f"windowing/lag_matrix/{label}",
+                       kernel_case(lambda data: lag_matrix(data, LAG_COUNT, SLIDING_WINDOW_SIZE), series)))
+        result.append((f"scaling/min_max/{label}",
+                       kernel_case(lambda data: MinMaxScaler().fit_transform(data.reshape(-1, 1)), series)))
+        result.append((f"resampling/upsample/{label}",
+                       kernel_case(lambda data: upsample(data, INTERPOLATION_SIZE), series)))
+
+    registry = ModelRegistry(os.path.join(BACKEND_DIR, "models"))
+    registry.discover()
+    uploads = Uploads()
+    loaded = {}
+
+    # Models of a dataset, loaded when the first case using them runs
+    def dataset_models(dataset):
+        def load():
+            if dataset not in loaded:
+                series = bundled_series(dataset)
+                loaded[dataset] = {f"{dataset}_{method}": registry.get(f"{dataset}_{method}")
+                                   for method in ["svr", "lstm", "sarima_svr"]}
+                loaded[dataset][f"{dataset}_sarima"] = sarima_model(registry, dataset, series)
+            return loaded[dataset].get
+        return load
+
+    for dataset in DATASETS:
+        file_path = uploads.path(dataset, bundled_series(dataset))
+        for method in METHODS:
+            for steps in HORIZONS:
+                result.append((f"predict/{method}/{dataset}/{steps}",
+                               forecast_case(dataset_models(dataset), f"{dataset}_{method}", method, file_path, steps)))
+    # Validation forecasts go through every window of the series, the cheese models forecast the larger series
+    for size in [size for size in options.sizes if size <= options.max_predict_size]:
+        file_path = uploads.path(f"synthetic_{size}", synthetic_series(size))
+        for method in METHODS:
+            result.append((f"predict/{method}/synthetic_{size}/12",
+                           forecast_case(dataset_models("cheese"), f"cheese_{method}", method, file_path, 12)))
+    return result
@@ -0,0 +1,55 @@
+import json
+import os
+import sys
+
+# Benchmark cases of create_models: one fold of every tuner and the training preprocessing, run by suite.py
+CREATE_MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "create_models")
+sys.path.insert(0, CREATE_MODELS_DIR)
+from dependencies import np, MinMaxScaler
+from constants import TEST_SIZE_SAMPLES, TEST_SIZE_SAMPLES_SARIMA
+from utilities import read_data, preprocess_data
+from arima import make_ARIMA_trial
+from svr import make_SVR_trial
+from lstm import make_LSTM_trial
+
+DATASETS = ["snow_cleaners", "notebooks", "cheese"]
+
+
+def training_params():
+    with open(os.path.join(CREATE_MODELS_DIR, "training.json"), "r", encoding="utf-8") as f:
+        config = json.load(f)
+    return {dataset["name"]: dataset["params"] for dataset in config["datasets"]}
+
+
+# Scaled windows of the series the svr and lstm tuners search on, like perform_SVR and perform_LSTM
+def window_arrays(data, lstm=False):
+    scaler = MinMaxScaler(feature_range=(-1, 1) if lstm else (0, 1))
+    X, Y = preprocess_data(scaler.fit_transform(data.reshape(-1, 1)))
+    X, Y = X[:-TEST_SIZE_SAMPLES], Y[:-TEST_SIZE_SAMPLES]
+    if lstm:
+        X = X.reshape(X.shape[0], X.shape[1], 1)
+    return {"X": X, "Y": Y}, scaler
+
+
+# First fold of a tuner trial, the trial is built on every call like in a search
+def fold_case(make_trial, arrays, context, params):
+    def setup():
+        return lambda: make_trial(arrays, context, params)(0)
+    return setup
+
+
+def cases(options):
+    result = []
+    params = training_params()
+    for dataset in DATASETS:
+        data = np.array(read_data(os.path.join(CREATE_MODELS_DIR, f"{dataset}.csv"))).flatten().astype(np.float64)
+        sarima_params = tuple(tuple(order) for order in params[dataset]["sarima"])
+        result.append((f"tune_fold/sarima/{dataset}",
+                       fold_case(make_ARIMA_trial, {"data": data[:-TEST_SIZE_SAMPLES_SARIMA]}, (False, "refit"),
+                                 sarima_params)))
+        arrays, scaler = window_arrays(data)
+        result.append((f"tune_fold/svr/{dataset}", fold_case(make_SVR_trial, arrays, scaler, params[dataset]["svr"])))
+        arrays, scaler = window_arrays(data, lstm=True)
+        lstm_params = {**params[dataset]["lstm"], "epochs": options.lstm_epochs}
+        result.append((f"tune_fold/lstm/{dataset}", fold_case(make_LSTM_trial, arrays, scaler, lstm_params)))
+    return result
@@ -0,0 +1,175 @@
+import argparse
+import datetime
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from importlib import metadata
+
+# Benchmark suite of the preprocessing, inference and training kernels. Results are saved as JSON so runs can be
+# compared over time. Run from the backend directory:
+#   python benchmarks/suite.py run [--filter predict/svr] [--sizes 10000 100000 1000000] [--output results.json]
+#   python benchmarks/suite.py compare benchmarks/results/old.json benchmarks/results/new.json
+# Case groups import modules of different directories, both have a constants module, so every group runs in
+# its own process. The bench_*.py scripts comparing implementations time their calls with measure and time_once.
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+GROUPS = {"serving": "cases_serving", "training": "cases_training"}
+
+
+# Time one case, calls are repeated until a round takes at least 0.2s. Returns seconds per call.
+def measure(func, repeat):
+    func()
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    rounds = sorted(total / number for total in timer.repeat(repeat=repeat, number=number))
+    mean = sum(rounds) / len(rounds)
+    return {
+        "min": rounds[0],
+        "median": rounds[len(rounds) // 2],
+        "mean": mean,
+        "stdev": (sum((value - mean) ** 2 for value in rounds) / len(rounds)) ** 0.5,
+        "rounds": len(rounds),
+        "iterations": number,
+    }
+
+
+# Run func once, returns its result and the seconds it took. For work too slow or stateful to repeat.
+def time_once(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+# Run the cases of one group in this process. A group module has cases(options) returning (name, setup) pairs,
+# setup() prepares the data and models of the case and returns the function that is timed.
+def run_group(group, options):
+    sys.path.insert(0, BENCHMARK_DIR)
+    module = importlib.import_module(GROUPS[group])
+    results = {}
+    for name, setup in module.cases(options):
+        name = f"{group}/{name}"
+        if options.filter and not any(pattern in name for pattern in options.filter):
+            continue
+        results[name] = measure(setup(), options.repeat)
+        print(f"{name:55} {results[name]['median'] * 1000:12.3f}ms", file=sys.stderr, flush=True)
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def package_versions():
+    versions = {}
+    for package in ["numpy", "pandas", "scikit-learn", "statsmodels", "tensorflow"]:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+    return versions
+
+
+# Run every group in a child process and save the merged results
+def run(options):
+    results = {}
+    for group in options.groups:
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "results.json")
+            command = [sys.executable, os.path.abspath(__file__), "run-group", group, output,
+                       "--repeat", str(options.repeat), "--sizes", *[str(size) for size in options.sizes],
+                       "--max-predict-size", str(options.max_predict_size), "--lstm-epochs", str(options.lstm_epochs)]
+            if options.filter:
+                command += ["--filter", *options.filter]
+            subprocess.run(command, cwd=BACKEND_DIR, check=True)
+            with open(output, "r", encoding="utf-8") as f:
+                results.update(json.load(f))
+    commit = git_commit()
+    report = {
+        "meta": {
+            "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            "commit": commit,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "packages": package_versions(),
+            "options": {"repeat": options.repeat, "sizes": options.sizes, "max_predict_size": options.max_predict_size,
+                        "lstm_epochs": options.lstm_epochs, "filter": options.filter},
+        },
+        "results": results,
+    }
+    output = options.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.datetime.now():%Y%m%d-%H%M%S}-{(commit or 'unknown')[:8]}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to {output}")
+
+
+# Compare the medians of two runs, returns whether any case got slower than the threshold allows
+def compare(old_path, new_path, threshold):
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"old: {old['meta']['commit']} {old['meta']['time']}\nnew: {new['meta']['commit']} {new['meta']['time']}")
+    slower = 0
+    for name in sorted(set(old["results"]) | set(new["results"])):
+        if name not in old["results"] or name not in new["results"]:
+            print(f"{name:55} {'only in ' + ('new' if name in new['results'] else 'old'):>40}")
+            continue
+        before, after = old["results"][name]["median"], new["results"][name]["median"]
+        ratio = after / before
+        status = ""
+        if ratio > 1 + threshold:
+            status = "slower"
+            slower += 1
+        elif ratio < 1 / (1 + threshold):
+            status = "faster"
+        print(f"{name:55} {before * 1000:12.3f}ms {after * 1000:12.3f}ms {ratio:7.2f}x  {status}")
+    print(f"{slower} cases slower by more than {threshold:.0%}")
+    return slower > 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    for command in ["run", "run-group"]:
+        command_parser = commands.add_parser(command)
+        if command == "run":
+            command_parser.add_argument("--groups", nargs="+", choices=list(GROUPS), default=list(GROUPS))
+            command_parser.add_argument("--output", default=None)
+        else:
+            command_parser.add_argument("group", choices=list(GROUPS))
+            command_parser.add_argument("output")
+        command_parser.add_argument("--filter", nargs="+", default=None)
+        command_parser.add_argument("--repeat", type=int, default=5)
+        command_parser.add_argument("--sizes", type=int, nargs="+", default=[10 ** 4, 10 ** 5, 10 ** 6])
+        # Largest synthetic series forecasted by the predict cases
+        command_parser.add_argument("--max-predict-size", type=int, default=10 ** 4)
+        # Epochs of the lstm tuning fold, the tuned models train for 100
+        command_parser.add_argument("--lstm-epochs", type=int, default=10)
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        run(args)
+    elif args.command == "run-group":
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run_group(args.group, args), f)
+    else:
+        sys.exit(1 if compare(args.old, args.new, args.threshold) else 0)
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+
+# Approximate memory cost of one cached forecast value (list slot + float object)
+BYTES_PER_VALUE = 32
+# Fixed overhead of one cache entry (key tuple, list object, bookkeeping)
+ENTRY_OVERHEAD_BYTES = 256
+# Size of the blocks the file hash is computed over
+HASH_BLOCK_SIZE = 1 << 20
+
+# Hashes of uploaded files, reused while the file is unchanged on disk
+_file_hashes = {}
+_file_hashes_lock = threading.Lock()
+
+
+# Get content hash of a file, only rehashing when its size or modification time changes
+def file_content_hash(file_path):
+    stat = os.stat(file_path)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    with _file_hashes_lock:
+        cached = _file_hashes.get(file_path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+    with _file_hashes_lock:
+        _file_hashes[file_path] = (signature, content_hash)
+    return content_hash
+
+
+# Forget the stored hash of a file that was overwritten or removed
+def forget_file_hash(file_path):
+    with _file_hashes_lock:
+        _file_hashes.pop(file_path, None)
+
+
+# Get version of a model artifact, changes whenever the artifact file is replaced
+def model_version(model_path):
+    try:
+        stat = os.stat(model_path)
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+# LRU cache of forecast results bounded by entry count and approximate size in bytes
+class ForecastCache:
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        # Keys stored for each uploaded file and files of each key, used for invalidation
+        self._file_keys = {}
+        self._key_files = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # Build cache key for a forecast request
+    @staticmethod
+    def make_key(content_hash, method_name, steps, model_version):
+        return (content_hash, method_name, steps, model_version)
+
+    # Get cached forecast, None if it is not in the cache
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    # Save forecast for the given file into the cache
+    def put(self, key, value, file_path):
+        size = ENTRY_OVERHEAD_BYTES + BYTES_PER_VALUE * len(value)
+        # Results larger than the whole cache are not stored
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            self._file_keys.setdefault(file_path, set()).add(key)
+            self._key_files.setdefault(key, set()).add(file_path)
+            # Evict least recently used entries until the cache fits its bounds
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                evicted_key, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._forget_key(evicted_key)
+                self.evictions += 1
+
+    # Remove key from the file bookkeeping
+    def _forget_key(self, key):
+        for file_path in self._key_files.pop(key, ()):
+            keys = self._file_keys.get(file_path)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._file_keys[file_path]
+
+    # Drop all cached forecasts of a file
+    def invalidate(self, file_path):
+        forget_file_hash(file_path)
+        with self._lock:
+            keys = self._file_keys.pop(file_path, set())
+            for key in keys:
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._size -= entry[1]
+                    self.invalidations += 1
+                self._forget_key(key)
+
+    # Cache counters
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
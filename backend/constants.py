@@ -4,5 +4,60 @@ SLIDING_WINDOW_SIZE = 12
 FORECASTING_PERIOD = 12
 TEST_SIZE_SAMPLES = 1
 TEST_SIZE_SAMPLES_ARIMA = 12
+TEST_FORECAST_STEP_SIZE = 12
 CROSS_VALIDATION_SPLITS = 3
 INTERPOLATION_SIZE = 30
+
+FORECAST_CACHE_MAX_ENTRIES = 1024
+FORECAST_CACHE_MAX_BYTES = 64 * 1024 * 1024
+# Minimum number of rows of an uploaded dataset, including the header
+MIN_DATASET_ROWS = 36
+# Size of the chunks uploads are streamed to disk in
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Maximum number of forecasts in one /forecast/batch request
+MAX_FORECAST_BATCH_SIZE = 64
+
+MONGO_URL = "mongodb://localhost:27017"
+# Threads running blocking MongoDB calls, matches the pymongo connection pool size
+DB_POOL_SIZE = 16
+# Threads running blocking file system calls
+IO_WORKERS = 8
+# Processes running model inference and the number of forecasts allowed to wait for one
+INFERENCE_PROCESSES = 4
+INFERENCE_QUEUE_SIZE = 32
+# Maximum number of concurrent forecasts per method, methods not listed may use every process
+INFERENCE_METHOD_LIMITS = {"lstm": 2, "sarima": 4, "svr": 4, "sarima_svr": 4}
+# Seconds a client is asked to wait when the inference queue is full
+INFERENCE_RETRY_AFTER = 2
+# Memory budget of the models resident in one inference process, in bytes
+MODEL_MEMORY_BUDGET = 512 * 1024 * 1024
+# Models used this many times within the window of seconds are only evicted after the other models, models listed
+# are never evicted
+MODEL_PIN_AFTER_HITS = 3
+MODEL_PIN_WINDOW = 10 * 60
+MODEL_PINNED = []
+# Runtime serving lstm models: "keras", "tf_function" or "tflite"
+LSTM_RUNTIME = "tf_function"
+# Update the models a user trained on a dataset in the background when a newer version of it is uploaded,
+# the shared models of the bundled datasets are never updated from uploads
+UPDATE_MODELS_ON_UPLOAD = True
+# Training and model update jobs running at once, cores the searches, model fits and library threads of a job use,
+# seconds the searches of a training job may take, seconds after which any job is stopped, and the niceness
+# job processes run with
+TRAINING_JOBS = 1
+TRAINING_PROCESSES = 2
+TRAINING_TIME_BUDGET = 15 * 60
+TRAINING_TIME_LIMIT = 45 * 60
+TRAINING_NICENESS = 10
+# Threads hashing passwords, logins and registrations allowed to wait for one and seconds a rejected client is asked
+# to wait. Argon2 cost parameters of new hashes, memory cost in KiB, older hashes are upgraded on login.
+PASSWORD_HASHING_WORKERS = 2
+PASSWORD_HASHING_QUEUE_SIZE = 16
+PASSWORD_HASHING_RETRY_AFTER = 1
+PASSWORD_TIME_COST = 3
+PASSWORD_MEMORY_COST = 65536
+PASSWORD_PARALLELISM = 4
+# Profile requests sent with the X-Profile header and save the profiles into the directory, the PROFILING_ENABLED
+# and PROFILE_DIR environment variables override them
+PROFILING_ENABLED = False
+PROFILE_DIR = "profiles"
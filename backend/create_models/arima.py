@@ -1,38 +1,108 @@
-from dependencies import np, product, Pool, os, TimeSeriesSplit, SARIMAX,joblib
+from dependencies import np, product, TimeSeriesSplit, SARIMAX,joblib
 from utilities import evaluate_performance, mean_absolute_error
-from constants import TEST_SIZE_SAMPLES_SARIMA, FORECASTING_PERIOD, CROSS_VALIDATION_SPLITS
+from constants import TEST_SIZE_SAMPLES_SARIMA, FORECASTING_PERIOD, CROSS_VALIDATION_SPLITS, SARIMA_WARM_START, \
+    SARIMA_FOLD_UPDATE
+from sarima_snapshot import save_sarima_snapshot
+from tuning import tune
 import warnings
 
-# Walk forward validation
-def find_best_ARIMA_parameters(data, params):
-    best_mae = float("inf")
-    best_params = None
+# Fitted parameters of the current process by training data and orders, name -> value dicts with
+# the optimizer iterations the fit took. Warm starts other fits of the same search.
+_fitted = {}
+
+
+# Orders one ar or ma term smaller than the given ones, their fitted parameters are the given model's
+# parameters with the extra term set to zero
+def nested_orders(order, seasonal_order):
+    (p, d, q), (P, D, Q, s) = order, seasonal_order
+    smaller = [((p - 1, d, q), (P, D, Q, s)), ((p, d, q - 1), (P, D, Q, s)),
+               ((p, d, q), (P - 1, D, Q, s)), ((p, d, q), (P, D, Q - 1, s))]
+    return [(o, so) for o, so in smaller if min(o) >= 0 and min(so) >= 0]
+
+
+# Starting parameters from a fit of the same orders on the previous fold or of a nested order on this fold
+def warm_start_params(model, train, order, seasonal_order, previous):
+    fitted = previous
+    if fitted is None:
+        for nested in nested_orders(order, seasonal_order):
+            fitted = _fitted.get((train.tobytes(), *nested))
+            if fitted is not None:
+                break
+    if fitted is None:
+        return None
+    return np.array([fitted["params"].get(name, 0.0) for name in model.param_names])
+
+
+# Ways a fold's fit is made from the fit of the previous, shorter fold:
+#   refit  - every fold is fitted on its own
+#   append - the new observations are appended to the previous fit and the parameters refitted from its ones
+#   extend - the new observations are appended to the previous fit and filtered with its parameters,
+#            only the first fold of a configuration is fitted
+FOLD_UPDATES = ["refit", "append", "extend"]
+# The likelihood is flat near a warm start, default tolerances stop the optimizer too early
+WARM_START_TOLERANCES = {"factr": 1e2, "pgtol": 1e-8}
+
+
+# Walk forward validation trial, fits the parameters on one dataset split at a time. Context is
+# (warm_start, fold_update), with warm_start every fit starts from the closest already fitted parameters.
+def make_ARIMA_trial(arrays, context, params):
+    warnings.filterwarnings("ignore")
+    warm_start, fold_update = context
+    if fold_update not in FOLD_UPDATES:
+        raise ValueError(f"Unknown fold update '{fold_update}', use one of {FOLD_UPDATES}")
+    data = arrays["data"]
+    order, seasonal_order = params
     tscv = TimeSeriesSplit(n_splits=CROSS_VALIDATION_SPLITS,
                            test_size=FORECASTING_PERIOD)
-    warnings.filterwarnings("ignore")
+    splits = list(tscv.split(data))
+    previous = []
+    # Results of the last fold fitted, folds read from the result store are skipped
+    last = {}
 
-    for order, seasonal_order in params:
-        fold_mae = []
-        for train_index, test_index in tscv.split(data):
-            train, test = data[train_index], data[test_index]
+    def evaluate(fold):
+        train_index, test_index = splits[fold]
+        train, test = data[train_index], data[test_index]
+        refit = True
+        if fold_update != "refit" and fold - 1 in last:
+            # Expanding window folds, the train set is the previous one followed by new observations
+            results = last.pop(fold - 1)
+            refit = fold_update == "append"
+            model = results.append(train[results.nobs:], refit=refit, initialization="approximate_diffuse",
+                                   fit_kwargs={"disp": 0, **WARM_START_TOLERANCES} if refit else None)
+        else:
+            last.clear()
             model = SARIMAX(train, order=order, seasonal_order=seasonal_order)
             model.initialize_approximate_diffuse()
 
-            model = model.fit(full_output=0, disp=0)
+            start_params, tolerances = None, {}
+            if warm_start:
+                start_params = warm_start_params(model, train, order, seasonal_order,
+                                                 previous[-1] if previous else None)
+            if start_params is not None:
+                tolerances = WARM_START_TOLERANCES
+            model = model.fit(start_params=start_params, disp=0, **tolerances)
+        last[fold] = model
+        if refit:
+            fitted = {"params": dict(zip(model.model.param_names, model.params)),
+                      "iterations": model.mle_retvals["iterations"]}
+            _fitted[(train.tobytes(), order, seasonal_order)] = fitted
+            previous.append(fitted)
 
-            test_forecast = model.forecast(len(test))
-            test_forecast[np.isnan(test_forecast)] = np.finfo(np.float64).max
-            mae = mean_absolute_error(test, test_forecast)
-            fold_mae.append(mae)
-        avg_mae = sum(fold_mae) / len(fold_mae)
+        test_forecast = model.forecast(len(test))
+        test_forecast[np.isnan(test_forecast)] = np.finfo(np.float64).max
+        return mean_absolute_error(test, test_forecast)
+    return evaluate
 
-        if avg_mae < best_mae:
-            best_mae = avg_mae
-            best_params = [order, seasonal_order]
-    return [best_params, best_mae]
 
+def find_best_ARIMA_parameters(data, params, strategy=None, warm_start=SARIMA_WARM_START, time_budget=None,
+                               processes=None, fold_update=SARIMA_FOLD_UPDATE):
+    report = tune(make_ARIMA_trial, params, CROSS_VALIDATION_SPLITS, {"data": data}, (warm_start, fold_update),
+                  strategy, processes, family="sarima", time_budget=time_budget)
+    return [report["params"], report["mae"]]
 
-def perform_ARIMA(data, dataset_name, params=None, exogenous_features=None):
+
+def perform_ARIMA(data, dataset_name, params=None, exogenous_features=None, strategy=None, time_budget=None,
+                  processes=None):
     order, seasonal_order = None, None
     # Split dataset into train and test
     train, test = data[:-
@@ -49,16 +119,11 @@ def perform_ARIMA(data, dataset_name, params=None, exogenous_features=None):
             product(p_values, d_values, q_values),
             product(P_values, D_values, Q_values, [12])
         ))
-        # Divide parameter combinations to each of the available cores
-        batch_size = len(param_combinations)//os.cpu_count()
-        # Assign data to each core to process
-        with Pool() as pool:
-            batches = [param_combinations[i:i+batch_size]
-                       for i in range(0, len(param_combinations), batch_size)]
-            results = pool.starmap(find_best_ARIMA_parameters, [(
-                train, batch) for batch in batches])
+        # Walk forward validation of every combination on all cores
+        best_params, _ = find_best_ARIMA_parameters(train, param_combinations, strategy,
+                                                    time_budget=time_budget, processes=processes)
         # Get best parameters based on lowest mean absolute error
-        order, seasonal_order = min(results, key=lambda x: x[1])[0]
+        order, seasonal_order = best_params
         print(f"Best parameters for SARIMA: {order}, {seasonal_order}")
     else:
         order, seasonal_order = params
@@ -86,14 +151,16 @@ def perform_ARIMA(data, dataset_name, params=None, exogenous_features=None):
 
         model_fit = model.fit()
         # Save model
-        joblib.dump(model_fit, f'../models/{dataset_name}_sarimax.pkl')
-        # Forecasting train set
+        joblib.dump(model_fit, f'../models/{dataset_name}_sarima.pkl')
+        # Forecasting test set
         predictions = model_fit.forecast(steps=TEST_SIZE_SAMPLES_SARIMA)
         train_index = np.arange(len(train))
-        # Forecasting test set
+        # Forecasting train set
         train_forecast = model_fit.predict(start=train_index[0],
                                            end=train_index[-1],
                                            typ='levels')
+        # Save predictions and state snapshot read by the server instead of the pickled model
+        save_sarima_snapshot(f'../models/{dataset_name}_sarima.npz', model_fit, train_forecast, predictions)
 
     error_values = {}
     # Evaluating error metrics for train and test sets
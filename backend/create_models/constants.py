@@ -1,3 +1,5 @@
+import os
+
 SEED = 10
 LAG_COUNT = 24
 SLIDING_WINDOW_SIZE = 12
@@ -5,4 +7,21 @@ FORECASTING_PERIOD = 12
 TEST_SIZE_SAMPLES = 1
 TEST_SIZE_SAMPLES_SARIMA = 12
 CROSS_VALIDATION_SPLITS = 3
-INTERPOLATION_SIZE = 30
\ No newline at end of file
+INTERPOLATION_SIZE = 30
+# Hyperparameter search strategy: "exhaustive", "prune" or "halving"
+TUNING_STRATEGY = "prune"
+# Share of configurations kept after each successive halving rung is 1 / HALVING_ETA
+HALVING_ETA = 3
+# Sqlite store of evaluated tuning folds, lets interrupted or refined searches skip finished fits. None disables it.
+# Kept next to this file whatever directory the tuners run from
+TUNING_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tuning_results.sqlite")
+# Start SARIMA tuning fits from the parameters of the previous fold or a nested smaller order. Fewer
+# optimizer iterations, but fits can end in a different optimum, see benchmarks/bench_sarima_warm_start.py
+SARIMA_WARM_START = False
+# How a tuning fit of a fold is made from the fit of the previous fold: "refit", "append" or "extend", see arima.py.
+# "extend" fits a configuration once, its later folds are scored with the parameters of the first one.
+SARIMA_FOLD_UPDATE = "refit"
+# Epochs lstm models are fine tuned for when a dataset gets new observations
+UPDATE_LSTM_EPOCHS = 5
+# Methods trained by a training job, sarima svr models are stacked on the sarima model of the same job
+TRAINING_METHODS = ["sarima", "svr", "sarima_svr", "lstm"]
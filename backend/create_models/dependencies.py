@@ -3,6 +3,7 @@ import pandas as pd
 import tensorflow as tf
 import matplotlib.pyplot as plt
 import os
+import sys
 import joblib
 
 from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score, mean_absolute_percentage_error
@@ -11,7 +12,6 @@ from sklearn.multioutput import MultiOutputRegressor
 from sklearn.model_selection import GridSearchCV, TimeSeriesSplit, ParameterGrid
 from sklearn.svm import SVR
 
-from multiprocessing import Pool
 
 from statsmodels.tsa.seasonal import seasonal_decompose
 from statsmodels.tsa.statespace.sarimax import SARIMAX
@@ -26,3 +26,6 @@ from keras.models import Sequential, load_model
 from keras.layers import LSTM, Dense
 from keras.optimizers import Adam
 from keras.callbacks import ModelCheckpoint, EarlyStopping
+
+# Modules shared with the server live in the backend directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -1,6 +1,7 @@
-from dependencies import set_random_seed, EarlyStopping, np, tf, MinMaxScaler,  Dense,  Sequential, ModelCheckpoint, os, Adam, LSTM, TimeSeriesSplit, ParameterGrid, Pool
+from dependencies import set_random_seed, EarlyStopping, np, tf, MinMaxScaler,  Dense,  Sequential, ModelCheckpoint, os, Adam, LSTM, TimeSeriesSplit, ParameterGrid
 from utilities import evaluate_performance, mean_absolute_error, preprocess_data
-from constants import FORECASTING_PERIOD, LAG_COUNT, SEED, TEST_SIZE_SAMPLES, CROSS_VALIDATION_SPLITS
+from constants import FORECASTING_PERIOD, SEED, TEST_SIZE_SAMPLES, CROSS_VALIDATION_SPLITS
+from tuning import tune
 import warnings
 
 
@@ -22,50 +23,56 @@ def create_lstm_model(X, units=24, activation_function='relu', num_layers=1, dro
         model.compile(optimizer=Adam(learning_rate=learning_rate), loss='mse')
     return model
 
-# Walk forward validation
-def find_best_LSTM_architecture(parameter_combinations, X, Y, scaler):
+# Walk forward validation trial, the model keeps training on each following dataset split
+def make_LSTM_trial(arrays, scaler, params):
     tf.get_logger().setLevel('ERROR')
     warnings.filterwarnings("ignore")
+    # Configurations run in parallel processes, each one trains on a single thread
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(1)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+    except RuntimeError:
+        pass
     set_random_seed(SEED)
-
-    best_mae = float("inf")
-    best_params = None
+    X, Y = arrays["X"], arrays["Y"]
     tscv = TimeSeriesSplit(n_splits=CROSS_VALIDATION_SPLITS, test_size=1)
-
-    for params in parameter_combinations:
-
-        fold_mae = []
-
-        lstm = create_lstm_model(X, units=params['units'], activation_function=params['activation_function'],
-                                 num_layers=params['num_layers'], dropout_rate=params['dropout_rate'], learning_rate=params['learning_rate'])
-        for train_index, test_index in tscv.split(X):
-            train_X, test_X = X[train_index], X[test_index]
-            train_Y, test_Y = Y[train_index], Y[test_index]
-            train_X = train_X.reshape(
-                train_X.shape[0], train_X.shape[1], 1)
-            test_X = test_X.reshape(
-                test_X.shape[0], test_X.shape[1], 1)
-            early_stopping = EarlyStopping(
-                monitor='val_loss', patience=3, restore_best_weights=True)
-            lstm.fit(train_X, train_Y,
-                     epochs=params['epochs'],
-                     batch_size=params['batch_size'],
-                     workers=os.cpu_count(), use_multiprocessing=True, verbose=0, callbacks=[early_stopping])
-            test_forecast = lstm.predict(test_X, verbose=0)
-            test_forecast = scaler.inverse_transform(
-                test_forecast.reshape(-1, 1))
-            mae = mean_absolute_error(scaler.inverse_transform(
-                test_Y.reshape(-1, 1)).reshape(-1, 1), test_forecast.reshape(-1, 1))
-            fold_mae.append(mae)
-        avg_mae = sum(fold_mae) / len(fold_mae)
-
-        if avg_mae < best_mae:
-            best_mae = avg_mae
-            best_params = params
-    return [best_params, best_mae]
-
-
-def perform_LSTM(data, model_name, parameters=None, use_model=False, exogenous_features=None):
+    splits = list(tscv.split(X))
+    lstm = create_lstm_model(X, units=params['units'], activation_function=params['activation_function'],
+                             num_layers=params['num_layers'], dropout_rate=params['dropout_rate'], learning_rate=params['learning_rate'])
+
+    trained = []
+
+    def train(fold):
+        train_index, _ = splits[fold]
+        early_stopping = EarlyStopping(
+            monitor='val_loss', patience=3, restore_best_weights=True)
+        lstm.fit(X[train_index], Y[train_index],
+                 epochs=params['epochs'],
+                 batch_size=params['batch_size'],
+                 verbose=0, callbacks=[early_stopping])
+        trained.append(fold)
+
+    def evaluate(fold):
+        # Folds read from the result store are skipped, train on them first so the model is the same
+        for previous in range(len(trained), fold + 1):
+            train(previous)
+        _, test_index = splits[fold]
+        test_forecast = lstm.predict(X[test_index], verbose=0)
+        test_forecast = scaler.inverse_transform(
+            test_forecast.reshape(-1, 1))
+        return mean_absolute_error(scaler.inverse_transform(
+            Y[test_index].reshape(-1, 1)).reshape(-1, 1), test_forecast.reshape(-1, 1))
+    return evaluate
+
+
+def find_best_LSTM_architecture(parameter_combinations, X, Y, scaler, strategy=None, time_budget=None, processes=None):
+    report = tune(make_LSTM_trial, parameter_combinations, CROSS_VALIDATION_SPLITS, {"X": X, "Y": Y},
+                  scaler, strategy, processes, family="lstm", time_budget=time_budget)
+    return [report["params"], report["mae"]]
+
+
+def perform_LSTM(data, model_name, parameters=None, use_model=False, exogenous_features=None, strategy=None, time_budget=None,
+                 processes=None):
     set_random_seed(SEED)
     scaler = MinMaxScaler(feature_range=(-1, 1))
     exogenous_scaler = MinMaxScaler(feature_range=(-1, 1))
@@ -75,16 +82,13 @@ def perform_LSTM(data, model_name, parameters=None, use_model=False, exogenous_f
     X, Y = preprocess_data(data)
 
     if exogenous_features is not None:
-        # Flatten feature array
-        X = X.reshape(-1, 1)
-        # Add external features
+        # Add external features as additional channels of the series
+        channels = [data]
         for i in range(len(exogenous_features)):
-            scaled_feature = exogenous_scaler.fit_transform(
-                exogenous_features[i].reshape(-1, 1))
-            feature, _ = preprocess_data(scaled_feature)
-            X = np.hstack((X, feature.reshape(-1, 1)))
-        # Reshape features array into correct form
-        X = X.reshape(-1, LAG_COUNT, len(exogenous_features)+1)
+            channels.append(exogenous_scaler.fit_transform(
+                exogenous_features[i].reshape(-1, 1)))
+        # Features array of shape (windows, LAG_COUNT, channels)
+        X, _ = preprocess_data(np.hstack(channels))
         # Split data into train and test sets
         train_X, train_Y = X[:-TEST_SIZE_SAMPLES], Y[:-TEST_SIZE_SAMPLES]
         test_X, test_Y = X[-TEST_SIZE_SAMPLES:], Y[-TEST_SIZE_SAMPLES:]
@@ -110,14 +114,8 @@ def perform_LSTM(data, model_name, parameters=None, use_model=False, exogenous_f
 
         param_combinations = list(ParameterGrid(param_grid))
 
-        batch_size = len(param_combinations)//os.cpu_count()  # 8 cores
-        with Pool() as pool:
-            batches = [param_combinations[i:i+batch_size]
-                       for i in range(0, len(param_combinations), batch_size)]
-            results = pool.starmap(find_best_LSTM_architecture, [(
-                batch, train_X, train_Y, scaler) for batch in batches])
-
-        parameters = min(results, key=lambda x: x[1])[0]
+        parameters, _ = find_best_LSTM_architecture(param_combinations, train_X, train_Y, scaler, strategy,
+                                                    time_budget, processes)
         print(f'Best parameters for LSTM: {parameters}')
 
     model = create_lstm_model(train_X, units=parameters['units'], activation_function=parameters['activation_function'],
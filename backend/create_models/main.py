@@ -1,104 +1,102 @@
-from dependencies import np,pd
-from utilities import read_data, plot_results
+from dependencies import np
+from utilities import read_data, plot_results, limit_threads
 from svr import perform_SVR
 from arima import perform_ARIMA
 from lstm import perform_LSTM
+from pipeline import Stage, run_pipeline
+import argparse
+import json
 import os
 import warnings
 warnings.filterwarnings("ignore")
 
+# Methods trained for every dataset and the methods each of them needs the results of
+METHODS = ["sarima", "svr", "lstm", "sarima_svr"]
+DEPENDENCIES = {"sarima_svr": ["sarima"]}
+LABELS = {"sarima": "SARIMA", "svr": "SVR", "lstm": "LSTM", "sarima_svr": "SARIMA+SVR"}
 
-if __name__ == "__main__":
-    # Create directory to store models for the API
-    os.makedirs('../models', exist_ok=True)
 
-    # Read the datasets
-    df_snow = read_data('snow_cleaners.csv')
-    df_cheese = read_data('cheese.csv')
-    df_notebooks = read_data('notebooks.csv')
+# Train one method on one dataset, runs on a pipeline worker process. Methods without parameters
+# search for them with the given number of processes.
+def train_method(method, dataset_name, data, params, processes, use_saved_lstm_weights, sarima_result=None):
+    warnings.filterwarnings("ignore")
+    # Library thread pools stay within the cores of the stage
+    limit_threads(processes)
+    print(f"---{LABELS[method]} {dataset_name}---")
+    if method == "sarima":
+        # Orders are lists in the config file
+        params = None if params is None else tuple(tuple(order) for order in params)
+        return perform_ARIMA(data, dataset_name, params, processes=processes)
+    if method == "svr":
+        return perform_SVR(data, dataset_name, best_params=params, processes=processes)
+    if method == "lstm":
+        return perform_LSTM(data, dataset_name, parameters=params, use_model=use_saved_lstm_weights,
+                            processes=processes)
+    arima_forecast_train, arima_forecast_test, _ = sarima_result
+    arima_forecasts = np.concatenate((arima_forecast_train, arima_forecast_test))
+    return perform_SVR(data, dataset_name, arima_forecasts=arima_forecasts, best_params=params, processes=processes)
 
-    # Method parameters
-    best_LSTM_snow_cleaners = {'units': 12, 'dropout': 0.1,
-                               'activation': 'tanh', 'epochs': 100, 'batch_size': 1}
-    best_LSTM_notebooks = {'units': 12, 'dropout': 0.1,
-                           'activation': 'tanh', 'epochs': 100, 'batch_size': 1}
-    best_LSTM_cheese = {'units': 12, 'dropout': 0.1,
-                        'activation': 'tanh', 'epochs': 100, 'batch_size': 1}
 
-    best_SVR_snow_cleaners = {'C': 1.1, 'gamma': 'scale',
-                              'kernel': 'poly', 'epsilon': 0.01, 'degree': 2}
-    best_SVR_notebooks = {'C': 1.1, 'gamma': 'scale',
-                          'kernel': 'poly', 'epsilon': 0.01, 'degree': 3}
-    best_SVR_cheese = {'C': 0.9, 'gamma': 'scale',
-                       'kernel': 'poly', 'epsilon': 0.01, 'degree': 5}
+# Pipeline stages of the datasets, methods searching for their parameters take the whole cpu budget
+def build_stages(config, datasets, cpus):
+    stages = []
+    for dataset in config["datasets"]:
+        for method in METHODS:
+            params = dataset["params"].get(method)
+            stage_cpus = 1 if params is not None else cpus
+            stages.append(Stage(f"{dataset['name']}/{method}", train_method,
+                                (method, dataset["name"], datasets[dataset["name"]], params, stage_cpus,
+                                 config.get("use_saved_lstm_weights", True)),
+                                [f"{dataset['name']}/{dependency}" for dependency in DEPENDENCIES.get(method, [])],
+                                stage_cpus))
+    return stages
 
-    best_SARIMA_SVR_snow_cleaners = {
-        'C': 1.5, 'gamma': 'scale', 'kernel': 'poly', 'epsilon': 0.01, 'degree': 3}
-    best_SARIMA_SVR_notebooks = {
-        'C': 0.9, 'gamma': 'scale', 'kernel': 'poly', 'epsilon': 0.01, 'degree': 3}
-    best_SARIMA_SVR_cheese = {'C': 0.9, 'gamma': 'scale',
-                              'kernel': 'poly', 'epsilon': 0.01, 'degree': 5}
-    best_SARIMA_snow_cleaners = [(1, 1, 1), (1, 0, 1, 12)]
-    best_SARIMA_notebooks = [(3, 0, 1), (0, 0, 1, 12)]
-    best_SARIMA_cheese = [(2, 0, 1), (1, 0, 0, 12)]
 
-    datasets = [[df_snow, 'Kiekis, vnt', 'Sniego valytuvų eksportas iš Lietuvos į Latviją',
+# Plot the test forecasts of every method against the last year of the dataset
+def plot_dataset(dataset, df, results):
+    forecasts, labels = [], []
+    for method in METHODS:
+        result = results.get(f"{dataset['name']}/{method}")
+        if result is not None:
+            forecasts.append(result[1])
+            labels.append(LABELS[method])
+    steps = len(forecasts[0]) if forecasts else 0
+    if steps:
+        plot_results(np.array(df).flatten()[-steps:], forecasts, labels, dataset["title"], dataset["ylabel"],
+                     df.index[-steps:])
 
-                 'snow_cleaners', best_SARIMA_snow_cleaners, best_SVR_snow_cleaners,
-                 best_LSTM_snow_cleaners,
-                 best_SARIMA_SVR_snow_cleaners],
-                [df_notebooks, 'Kiekis, kg', 'Sąsiuvinių eksportas iš Lietuvos į Latviją',
 
-                 'notebooks', best_SARIMA_notebooks, best_SVR_notebooks,
-                 best_LSTM_notebooks,
-                 best_SARIMA_SVR_notebooks],
-                [df_cheese, 'Kiekis, kg', 'Sūrių eksportas iš Lietuvos į Latviją',
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="training.json")
+    parser.add_argument("--cpus", type=int, default=None)
+    parser.add_argument("--datasets", nargs="+", default=None)
+    parser.add_argument("--plot", action="store_true")
+    args = parser.parse_args()
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    if args.datasets is not None:
+        config["datasets"] = [dataset for dataset in config["datasets"] if dataset["name"] in args.datasets]
+    cpus = args.cpus or config.get("cpus") or os.cpu_count()
 
-                 'cheese', best_SARIMA_cheese, best_SVR_cheese,
-                 best_LSTM_cheese,
-                 best_SARIMA_SVR_cheese]]
+    # Create directory to store models for the API
+    os.makedirs('../models', exist_ok=True)
+
+    # Read the datasets
+    frames = {dataset["name"]: read_data(dataset["file"]) for dataset in config["datasets"]}
+    datasets = {name: np.array(df).flatten() for name, df in frames.items()}
 
-    # Loop through each dataset
-    for i in datasets:
-        # Get data and flatten it
-        df = i[0]
-        df = np.array(df).flatten()
+    results, report = run_pipeline(build_stages(config, datasets, cpus), cpus)
+    # Error metrics of the trained models next to their timings
+    for name, result in results.items():
+        report["stages"][name]["errors"] = {metric: float(value) for metric, value in result[2].items()}
+    with open(config.get("report", "training_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Trained {len(results)} of {len(report['stages'])} stages in {report['wall_time']:.1f}s, "
+          f"{report['stage_time']:.1f}s of stage time on {cpus} cpus")
+    for name, stage in report["stages"].items():
+        print(f"  {name:25} {stage['status']:8} {stage.get('duration', 0):8.1f}s")
 
-        test_forecasts = []
-        train_forecasts = []
-        # Perform sarima
-        print("---SARIMA---")
-        arima_forecast_train, arima_forecast_test, error_values_sarima = perform_ARIMA(
-            df, i[3], i[4])
-        # Save sarima forecasts
-        test_forecasts.append([
-            arima_forecast_test])
-        train_forecasts.append([arima_forecast_train])
-        # Perform svr
-        print("---SVR-----")
-        train_forecast, test_forecast, error_values_svr = perform_SVR(
-            df, i[3], best_params=i[5])
-        # Save svr forecasts
-        test_forecasts.append([test_forecast])
-        train_forecasts.append([train_forecast])
-        # Perform lstm
-        print("---LSTM----")
-        train_forecast, test_forecast, error_values_lstm = perform_LSTM(
-            df, i[3],
-            use_model=True, parameters=i[6])
-        # Save lstm forecasts
-        test_forecasts.append([test_forecast])
-        train_forecasts.append([train_forecast])
-        # Perform sarima+svr
-        print("---SARIMA+SVR-----")
-        arima_forecasts = np.concatenate(
-            (arima_forecast_train, arima_forecast_test))
-        train_forecast, test_forecast, error_values_sarima_svr = perform_SVR(
-            df, i[3], arima_forecasts=arima_forecasts, best_params=i[7])
-        # Save sarima+svr forecasts
-        test_forecasts.append([test_forecast])
-        train_forecasts.append([train_forecast])
-        # Plot test forecasts
-        date_labels = pd.date_range(
-            start='2022-01-01', end='2022-12-01', freq='MS')
-        plot_results(df,train_forecast,['SARIMA','SVR','LSTM','SARIMA+SVR'],i[2],i[1],date_labels)
+    if args.plot:
+        for dataset in config["datasets"]:
+            plot_dataset(dataset, frames[dataset["name"]], results)
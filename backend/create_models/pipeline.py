@@ -0,0 +1,98 @@
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+
+# Step of a training pipeline, func(*args, *results of the dependencies) runs on a worker process
+# and may use up to cpus cores
+class Stage:
+    def __init__(self, name, func, args=(), dependencies=(), cpus=1):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.dependencies = list(dependencies)
+        self.cpus = cpus
+
+
+def _run_stage(func, args, dependency_results):
+    start = time.time()
+    result = func(*args, *dependency_results)
+    return result, start, time.time()
+
+
+# Check that every dependency exists and the stages have no cycles
+def check_stages(stages):
+    names = {stage.name: stage for stage in stages}
+    if len(names) != len(stages):
+        raise ValueError("Stage names have to be unique")
+    for stage in stages:
+        for dependency in stage.dependencies:
+            if dependency not in names:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+    visited, visiting = set(), set()
+
+    def visit(name):
+        if name in visiting:
+            raise ValueError(f"Stage '{name}' depends on itself")
+        if name not in visited:
+            visiting.add(name)
+            for dependency in names[name].dependencies:
+                visit(dependency)
+            visiting.discard(name)
+            visited.add(name)
+    for stage in stages:
+        visit(stage.name)
+
+
+# Run the stages on worker processes as soon as their dependencies finished, while the cores of the running
+# stages fit the cpu budget. Stages that are ready start in the order they are listed. A failed stage skips
+# the stages depending on it. Returns {stage name: result} and the timing report of every stage.
+def run_pipeline(stages, cpus):
+    check_stages(stages)
+    pending = list(stages)
+    running = {}
+    results = {}
+    report = {}
+    free = cpus
+    start = time.time()
+    # Spawned workers don't inherit TensorFlow state of the parent process
+    with ProcessPoolExecutor(max_workers=cpus, mp_context=multiprocessing.get_context("spawn")) as executor:
+        while pending or running:
+            for stage in list(pending):
+                if any(report.get(dependency, {}).get("status") in ["failed", "skipped"] for dependency in stage.dependencies):
+                    pending.remove(stage)
+                    report[stage.name] = {"status": "skipped", "cpus": stage.cpus}
+                    print(f"Skipped {stage.name}, a stage it depends on failed")
+                    continue
+                if not all(dependency in results for dependency in stage.dependencies):
+                    continue
+                # A stage wider than the budget runs alone
+                if min(stage.cpus, cpus) > free:
+                    continue
+                pending.remove(stage)
+                free -= min(stage.cpus, cpus)
+                future = executor.submit(_run_stage, stage.func, stage.args,
+                                         [results[dependency] for dependency in stage.dependencies])
+                running[future] = (stage, time.time())
+                print(f"Started {stage.name}")
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, queued = running.pop(future)
+                free += min(stage.cpus, cpus)
+                try:
+                    result, stage_start, stage_end = future.result()
+                except Exception as error:
+                    report[stage.name] = {"status": "failed", "cpus": stage.cpus, "error": repr(error),
+                                          "traceback": traceback.format_exception(error)}
+                    print(f"Failed {stage.name}: {error!r}")
+                    continue
+                results[stage.name] = result
+                report[stage.name] = {"status": "done", "cpus": stage.cpus, "start": stage_start - start,
+                                      "end": stage_end - start, "duration": stage_end - stage_start,
+                                      "waited": stage_start - queued}
+                print(f"Finished {stage.name} in {stage_end - stage_start:.1f}s")
+    return results, {"cpus": cpus, "wall_time": time.time() - start,
+                     "stage_time": sum(stage.get("duration", 0) for stage in report.values()), "stages": report}
@@ -0,0 +1,80 @@
+import hashlib
+import json
+import pickle
+import sqlite3
+import time
+import numpy as np
+
+# Fold results of tuning runs, one row per dataset, model family, parameter combination and fold.
+# Shared by every worker process of a search, each finished fold is committed right away.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fold_results (
+    dataset TEXT NOT NULL,
+    family TEXT NOT NULL,
+    params TEXT NOT NULL,
+    folds INTEGER NOT NULL,
+    fold INTEGER NOT NULL,
+    mae REAL NOT NULL,
+    fit_time REAL NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (dataset, family, params, folds, fold)
+)
+"""
+
+
+# Content hash of the arrays and the context a search runs on
+def dataset_hash(arrays, context=None):
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        array = np.ascontiguousarray(arrays[name])
+        digest.update(f"{name}:{array.dtype.str}:{array.shape}".encode())
+        digest.update(array.tobytes())
+    digest.update(pickle.dumps(context))
+    return digest.hexdigest()
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Can't store parameter value {value!r}")
+
+
+# Parameter combination as a stable string key
+def params_key(params):
+    return json.dumps(params, sort_keys=True, default=_json_default)
+
+
+class ResultStore:
+    def __init__(self, path):
+        self.path = path
+        # Several worker processes write at once, wait for the lock instead of failing
+        self.connection = sqlite3.connect(path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+        self.connection.commit()
+
+    # {fold: mae} of the already evaluated folds
+    def get(self, dataset, family, params, folds):
+        rows = self.connection.execute(
+            "SELECT fold, mae FROM fold_results WHERE dataset = ? AND family = ? AND params = ? AND folds = ?",
+            (dataset, family, params_key(params), folds))
+        return dict(rows.fetchall())
+
+    def put(self, dataset, family, params, folds, fold, mae, fit_time):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO fold_results VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (dataset, family, params_key(params), folds, fold, float(mae), fit_time, time.time()))
+
+    def close(self):
+        self.connection.close()
+
+
+# Stores opened by the current process
+_stores = {}
+
+
+def open_store(path):
+    if path not in _stores:
+        _stores[path] = ResultStore(path)
+    return _stores[path]
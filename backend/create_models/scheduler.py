@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+import numpy as np
+from threadpoolctl import threadpool_limits
+
+# Chunks of tasks queued per worker process. Idle workers take the next chunk from the shared queue,
+# so a few more chunks than processes balance uneven task times without per-task overhead.
+CHUNKS_PER_PROCESS = 16
+
+# Shared arrays attached by the current worker process and the lock guarding their updates
+_arrays = {}
+_blocks = []
+_lock = None
+
+
+# Numpy arrays copied into shared memory once, worker processes map them instead of receiving pickled copies
+class SharedArrays:
+    def __init__(self, arrays):
+        self.blocks = []
+        # Name, shape and dtype of every array, passed to the workers to attach them
+        self.specs = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            self.blocks.append(block)
+            self.specs[name] = (block.name, array.shape, array.dtype.str)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+# Attach shared arrays from their specs
+def attach_arrays(specs):
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        # Workers share the resource tracker of the process that created the block, which removes it
+        block = shared_memory.SharedMemory(name=block_name)
+        _blocks.append(block)
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    return arrays
+
+
+# Worker process initializer
+def _init_worker(specs, lock):
+    global _lock
+    # Tasks are the only level of parallelism, libraries inside them run on one thread
+    threadpool_limits(1)
+    _arrays.update(attach_arrays(specs))
+    _lock = lock
+
+
+# Lock shared by the tasks of one run, for tasks updating shared arrays
+def shared_lock():
+    return _lock
+
+
+def _run_chunk(func, chunk):
+    return [func(_arrays, task) for task in chunk]
+
+
+# Run func(arrays, task) for every task on a pool of worker processes, yielding (task, result) pairs as
+# chunks of tasks finish. arrays is a dict of numpy arrays placed in shared memory for every task, or
+# SharedArrays kept by the caller so updates of the tasks carry over to its next runs.
+def run_tasks(func, tasks, arrays=None, processes=None, chunk_size=None):
+    tasks = list(tasks)
+    if not tasks:
+        return
+    processes = processes or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, len(tasks) // (processes * CHUNKS_PER_PROCESS))
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    shared = arrays if isinstance(arrays, SharedArrays) else SharedArrays(arrays or {})
+    try:
+        with ProcessPoolExecutor(max_workers=min(processes, len(chunks)), initializer=_init_worker,
+                                 initargs=(shared.specs, multiprocessing.Lock())) as executor:
+            futures = {executor.submit(_run_chunk, func, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                for task, result in zip(futures[future], future.result()):
+                    yield task, result
+    finally:
+        if shared is not arrays:
+            shared.close()
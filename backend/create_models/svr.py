@@ -1,49 +1,38 @@
-from dependencies import os, np,joblib, SVR, MultiOutputRegressor, mean_absolute_error, MinMaxScaler, TimeSeriesSplit, ParameterGrid, Pool
-from constants import SLIDING_WINDOW_SIZE, LAG_COUNT, TEST_SIZE_SAMPLES, CROSS_VALIDATION_SPLITS
-from utilities import evaluate_performance, preprocess_data
+from dependencies import np,joblib, SVR, MultiOutputRegressor, mean_absolute_error, MinMaxScaler, TimeSeriesSplit, ParameterGrid
+from constants import TEST_SIZE_SAMPLES, CROSS_VALIDATION_SPLITS
+from utilities import evaluate_performance, preprocess_data, create_lag_features
+from tuning import tune
 import warnings
 
 
-def find_best_SVR_parameters(parameter_combinations, X, Y, scaler):
-
+# Walk forward validation trial, fits the parameters on one dataset split at a time
+def make_SVR_trial(arrays, scaler, params):
     warnings.filterwarnings("ignore")
-    best_mae = float("inf")
-    best_params = None
-
+    X, Y = arrays["X"], arrays["Y"]
     # Splitting time series into n_splits, with test data set size 1, meaning if there are 3 splits 2 will be used for training and 1 for testing
     tscv = TimeSeriesSplit(n_splits=CROSS_VALIDATION_SPLITS, test_size=1)
+    splits = list(tscv.split(X))
+    svr = MultiOutputRegressor(SVR(**params), n_jobs=1)
+
+    def evaluate(fold):
+        train_index, test_index = splits[fold]
+        svr.fit(X[train_index], Y[train_index])
+        test_forecast = scaler.inverse_transform(
+            svr.predict(X[test_index]).reshape(-1, 1)).reshape(-1, 1)
+        # Evaluating mean absolute error metric
+        return mean_absolute_error(scaler.inverse_transform(
+            Y[test_index].reshape(-1, 1)).reshape(-1, 1), test_forecast)
+    return evaluate
 
-    # Looping through each parameter combination
-    for params in parameter_combinations:
-        # Creating SVR model
-        svr = SVR(**params)
-        svr = MultiOutputRegressor(svr, n_jobs=-1)
 
-        fold_mae = []
-        # Looping through each dataset split
-        for train_index, test_index in tscv.split(X):
-            train_X, test_X = X[train_index], X[test_index]
-            train_Y, test_Y = Y[train_index], Y[test_index]
-            # Fitting the model
-            svr.fit(train_X, train_Y)
-            # Making predictions
-            test_forecast = svr.predict(test_X)
-            test_forecast = scaler.inverse_transform(
-                test_forecast.reshape(-1, 1)).reshape(-1, 1)
-            # Evaluating mean absolute error metric
-            mae = mean_absolute_error(scaler.inverse_transform(
-                test_Y.reshape(-1, 1)).reshape(-1, 1), test_forecast)
-            fold_mae.append(mae)
-        # Averaging mean absolute error among all tested splits
-        avg_mae = sum(fold_mae) / len(fold_mae)
-        # Updating best parameters if error is smaller
-        if avg_mae < best_mae:
-            best_mae = avg_mae
-            best_params = params
-    return [best_params, best_mae]
+def find_best_SVR_parameters(parameter_combinations, X, Y, scaler, processes=None, strategy=None, time_budget=None):
+    report = tune(make_SVR_trial, parameter_combinations, CROSS_VALIDATION_SPLITS, {"X": X, "Y": Y},
+                  scaler, strategy, processes, family="svr", time_budget=time_budget)
+    return [report["params"], report["mae"]]
 
 
-def perform_SVR(data,dataset_name, arima_forecasts=None, best_params=None, exogenous_features=None):
+def perform_SVR(data,dataset_name, arima_forecasts=None, best_params=None, exogenous_features=None, strategy=None, time_budget=None,
+                processes=None):
     # Data scaler
     scaler = MinMaxScaler()
     # External feature scaler
@@ -57,13 +46,9 @@ def perform_SVR(data,dataset_name, arima_forecasts=None, best_params=None, exoge
         data = scaler.transform(data.reshape(-1, 1))
         arima_forecasts = scaler.transform(
             arima_forecasts.reshape(-1, 1)).flatten()
-        arima_forecasts_new = []
-        # Creating lag features from arima forecasts
-        for j in range(0, len(arima_forecasts)-LAG_COUNT, SLIDING_WINDOW_SIZE):
-            arima_forecasts_new.append(arima_forecasts[j:j + LAG_COUNT])
-        arima_forecasts_new = np.array(arima_forecasts_new)
         X, Y = preprocess_data(data)
-        X = arima_forecasts_new
+        # Creating lag features from arima forecasts
+        X = create_lag_features(arima_forecasts)
         # Adding external features
         if exogenous_features is not None:
             for i in range(len(exogenous_features)):
@@ -98,33 +83,27 @@ def perform_SVR(data,dataset_name, arima_forecasts=None, best_params=None, exoge
                           "epsilon": np.arange(0.05, 0.5, 0.05),
                           "degree": [2, 3, 4, 5, 6]}
         param_combinations = list(ParameterGrid(parameter_grid))
-        # Divide parameter combinations to each of the available cores
-        batch_size = len(param_combinations)//os.cpu_count()
-        # Assign data to each core to process  
-        with Pool() as pool:
-            batches = [param_combinations[i:i+batch_size]
-                       for i in range(0, len(param_combinations), batch_size)]
-            results = pool.starmap(find_best_SVR_parameters, [(
-                batch, train_X, train_Y, scaler) for batch in batches])
-        # Get best parameters based on lowest mean absolute error
-        best_params = min(results, key=lambda x: x[1])[0]
+        # Walk forward validation of every combination on all cores
+        best_params, _ = find_best_SVR_parameters(param_combinations, train_X, train_Y, scaler, processes, strategy,
+                                                   time_budget)
         # Creating SVR model
         svr = SVR(C=best_params['C'], gamma=best_params['gamma'], kernel=best_params['kernel'],
                   epsilon=best_params['epsilon'], degree=best_params['degree'])
-        svr = MultiOutputRegressor(svr, n_jobs=-1)
+        # Final fit uses the cores of the budget, every core without one
+        svr = MultiOutputRegressor(svr, n_jobs=processes or -1)
         svr.fit(train_X, train_Y)
         print(f"Best parameters for SVR: {best_params}")
     else:
         # Creating SVR model
         svr = SVR(C=best_params['C'], gamma=best_params['gamma'], kernel=best_params['kernel'],
                   epsilon=best_params['epsilon'], degree=best_params['degree'])
-        svr = MultiOutputRegressor(svr, n_jobs=-1)
+        svr = MultiOutputRegressor(svr, n_jobs=processes or -1)
         svr.fit(train_X, train_Y)
-        # Saving the model
-        if arima_forecasts is None:
-            joblib.dump(svr, f'../models/{dataset_name}_svr.pkl')
-        else:
-            joblib.dump(svr, f'../models/{dataset_name}_sarimax_svr.pkl')
+    # Saving the model
+    if arima_forecasts is None:
+        joblib.dump(svr, f'../models/{dataset_name}_svr.pkl')
+    else:
+        joblib.dump(svr, f'../models/{dataset_name}_sarima_svr.pkl')
     # Forecasting train set
     train_forecast = svr.predict(train_X)
     train_forecast = scaler.inverse_transform(
@@ -0,0 +1,115 @@
+from dependencies import np, os, sys
+from arima import perform_ARIMA
+from svr import perform_SVR
+from lstm import perform_LSTM
+from update import read_series, series_path
+from utilities import limit_threads
+from constants import TRAINING_METHODS
+from artifacts import artifact_file_name, latest_version, parse_artifact_name
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import warnings
+
+# Train the models of an uploaded dataset with the grid searches of main.py. Hyperparameter searches share
+# the time budget, every method gets an even part of the time that is left. Models are trained in a staging
+# directory and moved into the model directory as the next version once training finished, so the server
+# never sees a partly trained model. Progress and the trained methods are printed as PROGRESS and RESULT
+# lines of json for the job queue of the server.
+# Usage from the create_models directory:
+#   python train.py <model prefix> <csv file> <model directory> [--methods ...] [--time-budget seconds]
+#                   [--processes count]
+
+
+def report(kind, **values):
+    print(f"{kind} {json.dumps(values)}", flush=True)
+
+
+def train_method(method, data, prefix, time_budget, arima_forecasts, processes=None):
+    if method == "sarima":
+        train_forecast, test_forecast, _ = perform_ARIMA(data, prefix, time_budget=time_budget, processes=processes)
+        return np.concatenate((train_forecast, test_forecast))
+    if method == "svr":
+        perform_SVR(data, prefix, time_budget=time_budget, processes=processes)
+    elif method == "sarima_svr":
+        if arima_forecasts is None:
+            raise RuntimeError("Sarima svr needs the sarima model of the same job")
+        perform_SVR(data, prefix, arima_forecasts=arima_forecasts, time_budget=time_budget,
+                    processes=processes)
+    elif method == "lstm":
+        perform_LSTM(data, prefix, time_budget=time_budget, processes=processes)
+    return arima_forecasts
+
+
+# Move trained artifacts into the model directory as the next version of the models
+def publish(staging_models, model_dir, prefix):
+    version = 1 + max(latest_version(model_dir, f"{prefix}_{method}") for method in TRAINING_METHODS)
+    for file_name in sorted(os.listdir(staging_models)):
+        parsed = parse_artifact_name(file_name)
+        if parsed is None:
+            continue
+        name, extension, _ = parsed
+        path = os.path.join(model_dir, artifact_file_name(name, extension, version))
+        os.replace(os.path.join(staging_models, file_name), path)
+        print(f"Saved {path}")
+
+
+# Train the methods on the data of the file, searches, final fits and library threads use at most the given
+# number of processes. Returns the trained methods.
+def train_models(prefix, file_path, model_dir, methods=TRAINING_METHODS, time_budget=None, processes=None):
+    warnings.filterwarnings("ignore")
+    if processes is not None:
+        limit_threads(processes)
+    data = read_series(file_path)
+    # Sarima svr models are stacked on the sarima model, which is trained first
+    methods = [method for method in TRAINING_METHODS if method in methods or
+               (method == "sarima" and "sarima_svr" in methods)]
+    deadline = None if time_budget is None else time.time() + time_budget
+    # Training scripts save models to ../models, the staging directory is laid out the same way
+    staging = tempfile.mkdtemp(prefix=f".staging-{prefix}-", dir=model_dir)
+    staging_models = os.path.join(staging, "models")
+    os.makedirs(os.path.join(staging, "work"))
+    os.makedirs(staging_models)
+    working_directory = os.getcwd()
+    trained = []
+    arima_forecasts = None
+    try:
+        os.chdir(os.path.join(staging, "work"))
+        for i, method in enumerate(methods):
+            report("PROGRESS", method=method, done=i, total=len(methods))
+            method_budget = None
+            if deadline is not None:
+                method_budget = max(0, deadline - time.time()) / (len(methods) - i)
+            try:
+                arima_forecasts = train_method(method, data, prefix, method_budget, arima_forecasts,
+                                               processes)
+                trained.append(method)
+            except Exception as error:
+                print(f"Training {method} failed: {error!r}")
+        report("PROGRESS", method=None, done=len(methods), total=len(methods))
+        os.chdir(working_directory)
+        if trained:
+            publish(staging_models, model_dir, prefix)
+            # Data the models know, later uploads with more observations update them
+            np.save(series_path(model_dir, prefix), data)
+    finally:
+        os.chdir(working_directory)
+        shutil.rmtree(staging, ignore_errors=True)
+    report("RESULT", trained=trained, failed=[method for method in methods if method not in trained])
+    return trained
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("prefix")
+    parser.add_argument("file_path")
+    parser.add_argument("model_dir")
+    parser.add_argument("--methods", nargs="+", choices=TRAINING_METHODS, default=TRAINING_METHODS)
+    parser.add_argument("--time-budget", type=float, default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    trained = train_models(args.prefix, os.path.abspath(args.file_path), os.path.abspath(args.model_dir),
+                           args.methods, args.time_budget, args.processes)
+    sys.exit(0 if trained else 1)
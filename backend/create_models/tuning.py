@@ -0,0 +1,141 @@
+import math
+import time
+import numpy as np
+from scheduler import SharedArrays, run_tasks, shared_lock
+from constants import TUNING_STRATEGY, HALVING_ETA, TUNING_RESULTS_PATH
+from results import ResultStore, dataset_hash, open_store
+
+# Hyperparameter search shared by the sarima, svr and lstm tuners.
+# A tuner is make_trial(arrays, context, params) returning a function that fits the configuration on
+# fold i and returns its error, called for folds 0, 1, ... in order. A configuration scores the mean
+# error of its folds, the lowest score wins and ties go to the configuration listed first.
+#   exhaustive - every configuration on every fold
+#   prune      - stop a configuration once it can't beat the best finished one. Errors are never
+#                negative, so after k folds the mean is at least their sum / folds. Finds the same best
+#                configuration as exhaustive search.
+#   halving    - successive halving with folds as the budget, every rung keeps the best 1 / eta
+#                configurations on the mean of the folds seen so far, the last rung runs pruned on all
+#                folds. Fewer fits, but a configuration that starts badly can be dropped.
+STRATEGIES = ["exhaustive", "prune", "halving"]
+
+
+# Whether a configuration with these fold errors can't beat the best one anymore
+def _is_beaten(index, errors, folds, best):
+    bound = sum(errors) / folds
+    best_error, best_index = best
+    return bound > best_error or (bound == best_error and index > best_index)
+
+
+# Evaluate one configuration on its folds, runs on a worker process. Folds found in the result store
+# are read instead of fitted, returns the fold errors, whether it was pruned or stopped by the deadline
+# and the folds fitted.
+def _run_trial(arrays, task):
+    index, params, folds, make_trial, context, prune, store, deadline = task
+    known = {}
+    if store is not None:
+        path, dataset, family, total = store
+        results = open_store(path)
+        known = results.get(dataset, family, params, total)
+    evaluate = None
+    best = arrays["best"]
+    errors = []
+    fitted = 0
+    for fold in range(folds):
+        if prune and errors:
+            with shared_lock():
+                beaten = _is_beaten(index, errors, folds, best)
+            if beaten:
+                return errors, True, fitted
+        if fold in known:
+            errors.append(known[fold])
+            continue
+        if deadline is not None and time.time() >= deadline:
+            return errors, True, fitted
+        # Trials are only built once a fold has to be fitted
+        if evaluate is None:
+            evaluate = make_trial(arrays, context, params)
+        start = time.perf_counter()
+        error = evaluate(fold)
+        fitted += 1
+        errors.append(error)
+        if store is not None:
+            results.put(dataset, family, params, total, fold, error, time.perf_counter() - start)
+    # Finished configurations become the bound the others are pruned against
+    if prune:
+        score = sum(errors) / folds
+        with shared_lock():
+            if score < best[0] or (score == best[0] and index < best[1]):
+                best[0], best[1] = score, index
+    return errors, False, fitted
+
+
+# Run configurations for the given number of folds, returns {index: (errors, pruned, fitted)}
+def _run_rung(make_trial, context, configs, indices, folds, arrays, processes, prune, store, deadline):
+    tasks = [(index, configs[index], folds, make_trial, context, prune, store, deadline) for index in indices]
+    return {task[0]: result for task, result in run_tasks(_run_trial, tasks, arrays, processes)}
+
+
+# Search configurations for the lowest mean fold error. With a family name, fold errors are kept in the
+# result store under the dataset hash, family and parameters, and reused by later searches.
+# With a time budget in seconds, no folds are fitted after it runs out and the best finished configuration wins.
+# Returns dict with the best params, their error and the fits the search needed.
+def tune(make_trial, configs, folds, arrays=None, context=None, strategy=None, processes=None, eta=HALVING_ETA,
+         family=None, results_path=TUNING_RESULTS_PATH, time_budget=None):
+    strategy = strategy or TUNING_STRATEGY
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown tuning strategy '{strategy}', use one of {STRATEGIES}")
+    start = time.perf_counter()
+    deadline = None if time_budget is None else time.time() + time_budget
+    store = None
+    if family is not None and results_path is not None:
+        # Creates the table before the workers open the store, connections aren't shared with forked workers
+        ResultStore(results_path).close()
+        store = (results_path, dataset_hash(arrays or {}, context), family, folds)
+    # Arrays and the best score and index, shared with the worker processes of every rung
+    with SharedArrays({**(arrays or {}), "best": np.array([np.inf, -1.0])}) as arrays:
+        candidates = list(range(len(configs)))
+        scores = {}
+        fits = 0
+        cached = 0
+        pruned = 0
+        if strategy == "halving":
+            budget = 1
+            while budget < folds and len(candidates) > 1:
+                results = _run_rung(make_trial, context, configs, candidates, budget, arrays, processes, False, store,
+                                    deadline)
+                for errors, _, fitted in results.values():
+                    fits += fitted
+                    cached += len(errors) - fitted
+                # Keep the configurations with the lowest error on the folds seen so far, configurations stopped by
+                # the deadline go last
+                keep = max(1, math.ceil(len(candidates) / eta))
+                candidates = sorted(candidates, key=lambda index: (
+                    np.inf if results[index][1] else np.mean(results[index][0]), index))[:keep]
+                budget = min(folds, budget * eta)
+        results = _run_rung(make_trial, context, configs, candidates, folds, arrays, processes,
+                            strategy != "exhaustive", store, deadline)
+        for index, (errors, was_pruned, fitted) in results.items():
+            fits += fitted
+            cached += len(errors) - fitted
+            pruned += was_pruned
+            if not was_pruned:
+                scores[index] = sum(errors) / folds
+    if not scores:
+        raise RuntimeError(f"Time budget of {time_budget}s ran out before any configuration was evaluated")
+    best_index = min(scores, key=lambda index: (scores[index], index))
+    report = {
+        "strategy": strategy,
+        "params": configs[best_index],
+        "mae": scores[best_index],
+        "configs": len(configs),
+        "fits": fits,
+        "cached": cached,
+        "exhaustive_fits": len(configs) * folds,
+        "pruned": pruned,
+        "out_of_time": deadline is not None and time.time() >= deadline,
+        "time": time.perf_counter() - start,
+    }
+    print(f"Tuning ({strategy}): {fits} of {report['exhaustive_fits']} fold fits, {cached} read from results, "
+          f"{pruned} configurations pruned{' or stopped by the time budget' if report['out_of_time'] else ''}, "
+          f"{report['time']:.1f}s")
+    return report
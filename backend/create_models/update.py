@@ -0,0 +1,161 @@
+from dependencies import np, pd, joblib, os, sys, tf, MinMaxScaler, load_model, set_random_seed
+from sklearn.base import clone
+from utilities import preprocess_data, create_lag_features
+from constants import SEED, TEST_SIZE_SAMPLES, TEST_SIZE_SAMPLES_SARIMA, UPDATE_LSTM_EPOCHS
+from artifacts import artifact_file_name, find_artifacts, latest_version
+from sarima_snapshot import save_sarima_snapshot
+from utilities import limit_threads
+import argparse
+import warnings
+
+# Incremental update of the models of a dataset when a newer version of it, with observations appended
+# to the end, is uploaded. Parameters found by the grid searches are kept, every model is refreshed with the
+# new data and saved as the next version of its artifact, the server picks the newest version.
+#   sarima     - fitted results are extended with the new observations, parameters stay the same
+#   svr        - multi output svr refitted with the same parameters on its support vectors and the new windows
+#   sarima_svr - same, on lag windows of the updated sarima predictions
+#   lstm       - saved weights fine tuned for a few epochs on the windows of the new data
+# Usage from the create_models directory:
+#   python update.py <dataset name> <csv file> [model directory] [--processes count]
+
+
+# Read the numeric columns of a file as one flat series, like the server does
+def read_series(file_path):
+    df = pd.read_csv(file_path)
+    return np.array(df[df.select_dtypes(include=[np.number]).columns], dtype=np.float64).flatten()
+
+
+# Series the models of a dataset were last trained or updated on
+def series_path(model_dir, dataset_name):
+    return os.path.join(model_dir, f"{dataset_name}.series.npy")
+
+
+def load_base_series(model_dir, dataset_name):
+    path = series_path(model_dir, dataset_name)
+    if os.path.exists(path):
+        return np.load(path)
+    # Models that were never updated are trained on the dataset of this directory
+    if os.path.exists(f"{dataset_name}.csv"):
+        return read_series(f"{dataset_name}.csv")
+    return None
+
+
+# Newest artifact of a model in one of the formats, None if there is none
+def find_artifact(model_dir, model_name, extension):
+    return find_artifacts(model_dir, [extension]).get(model_name)
+
+
+# Write artifact under a temporary name first, the server never sees a partly written file
+def save_artifact(model_dir, model_name, extension, version, write):
+    path = os.path.join(model_dir, artifact_file_name(model_name, extension, version))
+    temporary_path = os.path.join(model_dir, f".{model_name}.tmp{extension}")
+    write(temporary_path)
+    os.replace(temporary_path, path)
+    print(f"Saved {path}")
+    return path
+
+
+# Extend sarima results with the new training observations, returns the predictions over the data
+def update_sarima(model_dir, dataset_name, data, version):
+    model_name = f"{dataset_name}_sarima"
+    path = find_artifact(model_dir, model_name, ".pkl")
+    if path is None:
+        return None
+    results = joblib.load(path)
+    train = data[:-TEST_SIZE_SAMPLES_SARIMA]
+    trained = len(results.model.endog)
+    if len(train) > trained:
+        results = results.append(train[trained:])
+    predictions = results.forecast(steps=TEST_SIZE_SAMPLES_SARIMA)
+    train_forecast = results.predict(start=0, end=len(train) - 1, typ='levels')
+    save_artifact(model_dir, model_name, ".pkl", version, lambda path: joblib.dump(results, path))
+    save_artifact(model_dir, model_name, ".npz", version,
+                  lambda path: save_sarima_snapshot(path, results, train_forecast, predictions))
+    return np.concatenate((train_forecast, predictions))
+
+
+# Refit svr with its parameters on the windows that are support vectors of the model and the windows the new
+# observations add, on lag windows of the sarima predictions for sarima svr models. Windows that aren't support
+# vectors don't shape the fitted model, so the refit costs the support vectors plus the new windows instead of
+# every window. The windows the model was fitted on are saved with it for the next update.
+def update_svr(model_dir, dataset_name, data, base_length, version, arima_forecasts=None, processes=None):
+    model_name = f"{dataset_name}_svr" if arima_forecasts is None else f"{dataset_name}_sarima_svr"
+    path = find_artifact(model_dir, model_name, ".pkl")
+    if path is None:
+        return
+    model = joblib.load(path)
+    scaler = MinMaxScaler()
+    if arima_forecasts is None:
+        X, Y = preprocess_data(scaler.fit_transform(data.reshape(-1, 1)))
+    else:
+        # Data and sarima predictions are scaled together, like in training
+        scaler.fit(np.concatenate((data, arima_forecasts)).reshape(-1, 1))
+        _, Y = preprocess_data(scaler.transform(data.reshape(-1, 1)))
+        X = create_lag_features(scaler.transform(arima_forecasts.reshape(-1, 1)).flatten())
+    train_X, train_Y = X[:-TEST_SIZE_SAMPLES], Y[:-TEST_SIZE_SAMPLES]
+    # Windows start at the beginning of the series, so the windows of the old data keep their positions
+    trained = len(preprocess_data(data[:base_length].reshape(-1, 1))[1]) - TEST_SIZE_SAMPLES
+    # Models of a training run were fitted on every training window
+    rows = getattr(model, "training_rows_", np.arange(trained))
+    support = np.unique(np.concatenate([estimator.support_ for estimator in model.estimators_]))
+    rows = np.concatenate((rows[support], np.arange(trained, len(train_X))))
+    # Fit uses the cores of the budget instead of the ones the model was trained with
+    svr = clone(model).set_params(n_jobs=processes or -1)
+    svr.fit(train_X[rows], train_Y[rows])
+    svr.training_rows_ = rows
+    print(f"Refitted {model_name} on {len(rows)} of {len(train_X)} windows")
+    save_artifact(model_dir, model_name, ".pkl", version, lambda path: joblib.dump(svr, path))
+
+
+# Fine tune lstm weights on the windows of the new data
+def update_lstm(model_dir, dataset_name, data, version):
+    model_name = f"{dataset_name}_lstm"
+    path = find_artifact(model_dir, model_name, ".h5")
+    if path is None:
+        return
+    tf.get_logger().setLevel('ERROR')
+    set_random_seed(SEED)
+    model = load_model(path)
+    scaler = MinMaxScaler(feature_range=(-1, 1))
+    X, Y = preprocess_data(scaler.fit_transform(data.reshape(-1, 1)))
+    train_X, train_Y = X[:-TEST_SIZE_SAMPLES], Y[:-TEST_SIZE_SAMPLES]
+    model.fit(train_X.reshape(train_X.shape[0], train_X.shape[1], 1), train_Y,
+              epochs=UPDATE_LSTM_EPOCHS, batch_size=1, verbose=0)
+    save_artifact(model_dir, model_name, ".h5", version, model.save)
+
+
+# Update every model of the dataset on at most the given number of processes, returns False if the data doesn't
+# extend the data the models know of
+def update_models(dataset_name, file_path, model_dir="../models", processes=None):
+    warnings.filterwarnings("ignore")
+    if processes is not None:
+        limit_threads(processes)
+    data = read_series(file_path)
+    base = load_base_series(model_dir, dataset_name)
+    if base is not None and np.array_equal(data, base):
+        print(f"'{dataset_name}' models are up to date")
+        return True
+    if base is None or len(data) < len(base) or not np.array_equal(data[:len(base)], base):
+        print(f"'{file_path}' doesn't add observations to the data of the '{dataset_name}' models, a full retrain is needed")
+        return False
+    print(f"Updating '{dataset_name}' models with {len(data) - len(base)} new observations")
+    # All models of the dataset move to the same next version
+    version = 1 + max(latest_version(model_dir, f"{dataset_name}_{method}")
+                      for method in ["sarima", "svr", "sarima_svr", "lstm"])
+    arima_forecasts = update_sarima(model_dir, dataset_name, data, version)
+    update_svr(model_dir, dataset_name, data, len(base), version, processes=processes)
+    if arima_forecasts is not None:
+        update_svr(model_dir, dataset_name, data, len(base), version, arima_forecasts, processes)
+    update_lstm(model_dir, dataset_name, data, version)
+    np.save(series_path(model_dir, dataset_name), data)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dataset_name")
+    parser.add_argument("file_path")
+    parser.add_argument("model_dir", nargs="?", default="../models")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    sys.exit(0 if update_models(args.dataset_name, args.file_path, args.model_dir, args.processes) else 1)
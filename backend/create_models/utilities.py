@@ -1,35 +1,33 @@
-from dependencies import np, mean_absolute_percentage_error, mean_absolute_error, mean_squared_error, pd, plt, os, r2_score
+from dependencies import np, mean_absolute_percentage_error, mean_absolute_error, mean_squared_error, pd, plt, os, r2_score, tf
 from constants import SLIDING_WINDOW_SIZE, LAG_COUNT, FORECASTING_PERIOD, INTERPOLATION_SIZE
+from windowing import make_windows, lag_matrix
+from resampling import upsample, downsample
+from threadpoolctl import threadpool_limits
+
+# Keep the thread pools of numpy, scikit-learn and TensorFlow within the given number of cores
+def limit_threads(processes):
+    threadpool_limits(processes)
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(processes)
+        tf.config.threading.set_inter_op_parallelism_threads(processes)
+    except RuntimeError:
+        pass
 
 # Function that interpolates num_interpolations times between two adjacent points
 def interpolate_data(df, num_interpolations, endpoint=False):
-    interpolated_values = []
-
-    for i in range(len(df) - 1):
-        interpolated = np.linspace(
-            df[i], df[i + 1], num=num_interpolations, endpoint=endpoint)
-        interpolated_values.extend(interpolated)
+    return upsample(df, num_interpolations, endpoint)
 
-    return np.array(interpolated_values)
-
-# Undo interpolation effect
+# Undo interpolation effect, returns an array
 def undo_interpolation(df):
-    array = []
-    for i in range(0, len(df), INTERPOLATION_SIZE):
-        array.append(df[i])
-    return array
+    return downsample(df, INTERPOLATION_SIZE)
 
 def preprocess_data(data):
-    X = []
-    Y = []
     # Create lagged feature array X and target array Y
-    for i in range(0, len(data)-LAG_COUNT, SLIDING_WINDOW_SIZE):
-        X.append(data[i:i + LAG_COUNT])
-        Y.append(data[i + LAG_COUNT:i + LAG_COUNT+FORECASTING_PERIOD])
-    # Reshape the arrays into correct form
-    X = np.array(X).reshape(-1, LAG_COUNT)
-    Y = np.array(Y).reshape(-1, FORECASTING_PERIOD)
-    return X, Y
+    return make_windows(data, LAG_COUNT, FORECASTING_PERIOD, SLIDING_WINDOW_SIZE)
+
+# Create lagged feature array without targets
+def create_lag_features(data):
+    return lag_matrix(data, LAG_COUNT, SLIDING_WINDOW_SIZE)
 
 # Calculate error metrics
 def evaluate_performance(forecast, real):
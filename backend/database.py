@@ -0,0 +1,80 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from constants import MONGO_URL, DB_POOL_SIZE
+
+# Thread pool running the blocking pymongo calls, one thread per pooled connection
+db_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="mongo")
+
+
+# Awaitable wrapper around a pymongo collection, every call runs on the database thread pool
+class AsyncCollection:
+    def __init__(self, collection):
+        self.sync = collection
+
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(db_executor, partial(method, *args, **kwargs))
+
+    async def find_one(self, *args, **kwargs):
+        return await self._run(self.sync.find_one, *args, **kwargs)
+
+    async def find(self, *args, **kwargs):
+        # Cursor is consumed on the pool as well, since iterating it does network I/O
+        return await self._run(lambda: list(self.sync.find(*args, **kwargs)))
+
+    async def insert_one(self, *args, **kwargs):
+        return await self._run(self.sync.insert_one, *args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return await self._run(self.sync.update_one, *args, **kwargs)
+
+    async def find_one_and_update(self, *args, **kwargs):
+        return await self._run(self.sync.find_one_and_update, *args, **kwargs)
+
+    async def update_many(self, *args, **kwargs):
+        return await self._run(self.sync.update_many, *args, **kwargs)
+
+    async def delete_one(self, *args, **kwargs):
+        return await self._run(self.sync.delete_one, *args, **kwargs)
+
+    async def delete_many(self, *args, **kwargs):
+        return await self._run(self.sync.delete_many, *args, **kwargs)
+
+
+# Connect to mongoDB, the MONGO_URL environment variable overrides the configured server
+client = MongoClient(os.environ.get("MONGO_URL", MONGO_URL), maxPoolSize=DB_POOL_SIZE)
+db = client["forecastDB"]
+collection = AsyncCollection(db["Users"])
+# Training and model update jobs
+jobs_collection = AsyncCollection(db["Jobs"])
+# Metadata of uploaded files, one document per file: {_id: file id, user_id, name, path, uploaded}
+files_collection = AsyncCollection(db["Files"])
+
+
+# Create the indexes of the collections, existing indexes are left as they are.
+# A unique index can't be built while documents break it, those are reported and skipped.
+def create_indexes():
+    indexes = [
+        (collection, [("email", ASCENDING)], True),
+        (collection, [("username", ASCENDING)], True),
+        # Lookups of a user's file by id and listings of a user's files in upload order
+        (files_collection, [("user_id", ASCENDING), ("_id", ASCENDING)], True),
+        # A user has one document per file name, uploads of the same name replace the file
+        (files_collection, [("user_id", ASCENDING), ("name", ASCENDING)], True),
+        (jobs_collection, [("user_id", ASCENDING), ("created", DESCENDING)], False),
+    ]
+    for async_collection, keys, unique in indexes:
+        try:
+            async_collection.sync.create_index(keys, unique=unique)
+        except OperationFailure as error:
+            print(f"Couldn't create index {keys} on {async_collection.sync.name}: {error}")
+
+
+# Create the indexes on the database thread pool
+async def ensure_indexes():
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(db_executor, create_indexes)
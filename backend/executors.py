@@ -0,0 +1,39 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from constants import IO_WORKERS
+
+
+# Thread pool executor that limits how many calls may be running or waiting at once
+class BoundedExecutor:
+    def __init__(self, max_workers, queue_size, thread_name_prefix):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._semaphore = None
+        self.pending = 0
+
+    # Run function in the pool, waiting for a free slot if the pool is full
+    async def run(self, func, *args, **kwargs):
+        # Semaphore is created lazily so it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers + self.queue_size)
+        async with self._semaphore:
+            self.pending += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+            finally:
+                self.pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Executor for blocking file system calls
+io_executor = BoundedExecutor(IO_WORKERS, IO_WORKERS * 4, "io")
+
+
+# Run blocking file system call off the event loop
+async def run_io(func, *args, **kwargs):
+    return await io_executor.run(func, *args, **kwargs)
@@ -0,0 +1,225 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.preprocessing import MinMaxScaler
+from functions import preprocess_data
+from registry import sarima_model_name
+from rollout import recursive_forecast, lstm_recursive_forecast
+from storage import load_series_values
+from metrics import StageTimer
+from constants import TEST_SIZE_SAMPLES_ARIMA,LAG_COUNT,TEST_FORECAST_STEP_SIZE,FORECASTING_PERIOD
+
+# Read the numeric columns of a file as one flat series, memory mapped from the binary store of the upload
+def read_series(file_path: str):
+    # Flattening the contiguous (rows, columns) array is a view, nothing is parsed or copied
+    return load_series_values(file_path).reshape(-1)
+
+# Data of the files in one forecast batch, each file is read and preprocessed only once.
+# Time spent on the data and the models is recorded by the timer under the method being forecasted.
+class BatchData:
+    def __init__(self, timer=None):
+        self._series = {}
+        self._prepared = {}
+        self.timer = timer or StageTimer()
+        self.method_name = None
+
+    def stage(self, stage):
+        return self.timer.stage(stage, self.method_name)
+
+    def series(self, file_path: str):
+        if file_path not in self._series:
+            with self.stage("read"):
+                self._series[file_path] = read_series(file_path)
+        return self._series[file_path]
+
+    # Scaler, scaled series and lagged feature array of a file for the given scaling interval
+    def prepared(self, file_path: str, feature_range):
+        key = (file_path, feature_range)
+        if key not in self._prepared:
+            series = self.series(file_path)
+            with self.stage("scale"):
+                scaler = MinMaxScaler(feature_range=feature_range)
+                df = scaler.fit_transform(series.reshape(-1, 1))
+            # Get feature and target arrays from data
+            with self.stage("preprocess"):
+                X, _ = preprocess_data(df)
+            self._prepared[key] = (scaler, df, X)
+        return self._prepared[key]
+
+# Get the forecasting branch handling the method
+def method_family(method_name: str):
+    if method_name.endswith("sarima_svr"):
+        return "sarima_svr"
+    elif method_name.endswith("svr"):
+        return "svr"
+    elif method_name.endswith("sarima"):
+        return "sarima"
+    elif method_name.endswith("lstm"):
+        return "lstm"
+    return None
+
+# Forecast file data with the given model
+def compute_forecast(model, method_name: str, file_path: str, steps: int):
+    return compute_forecasts(lambda model_name: model if model_name is None else None,
+                             [(None, method_name, file_path, steps)])[0]
+
+# Forecast a batch of (model name, method name, file path, steps) requests.
+# Requests for the same model are grouped so their inputs go through one predict call.
+def compute_forecasts(get_model, requests, timer=None):
+    data = BatchData(timer)
+    results = [None] * len(requests)
+    groups = {}
+    models = {}
+    for index, (model_name, method_name, file_path, steps) in enumerate(requests):
+        data.method_name = method_name
+        if model_name not in models:
+            with data.stage("model"):
+                models[model_name] = get_model(model_name)
+        model = models[model_name]
+        if model is None:
+            results[index] = []
+            continue
+        family = method_family(method_name)
+        if family is None:
+            results[index] = {"error": "Invalid model name"}
+            continue
+        if family == "sarima_svr":
+            sarima_name = None if model_name is None else sarima_model_name(model_name)
+            if sarima_name not in models:
+                with data.stage("model"):
+                    models[sarima_name] = None if sarima_name is None else get_model(sarima_name)
+            # Without the sarima model it is stacked on there is no forecast, the error isn't cached
+            if models[sarima_name] is None:
+                results[index] = {"error": "Sarima model of the sarima svr model not found"}
+                continue
+        groups.setdefault((family, model_name), []).append((index, file_path, steps))
+    for (family, model_name), items in groups.items():
+        model = models[model_name]
+        data.method_name = requests[items[0][0]][1]
+        if family == "svr":
+            forecasts = forecast_window_model(model, items, data, (0, 1), lstm=False)
+        elif family == "lstm":
+            forecasts = forecast_window_model(model, items, data, (-1, 1), lstm=True)
+        elif family == "sarima":
+            forecasts = forecast_sarima(model, items, data)
+        else:
+            forecasts = forecast_sarima_svr(model, models[sarima_model_name(model_name)], items, data)
+        for (index, _, _), forecast in zip(items, forecasts):
+            results[index] = forecast.tolist()
+    return results
+
+# Svr and lstm forecasts from lagged feature windows
+def forecast_window_model(model, items, data, feature_range, lstm):
+    prepared = [data.prepared(file_path, feature_range) for _, file_path, _ in items]
+    forecasts = [None] * len(items)
+    validation = [i for i, (_, _, steps) in enumerate(items) if steps == TEST_FORECAST_STEP_SIZE]
+    extrapolation = [i for i, (_, _, steps) in enumerate(items) if steps != TEST_FORECAST_STEP_SIZE]
+
+    # Validation forecast
+    if validation:
+        # Forecast every feature window of all requests with one call
+        inputs = [prepared[i][2] for i in validation]
+        stacked = np.concatenate(inputs)
+        with data.stage("predict"):
+            if lstm:
+                # Reshape feature array into correct form
+                stacked = stacked.reshape(stacked.shape[0], stacked.shape[1], 1)
+                outputs = model.predict(stacked, verbose=0)
+            else:
+                outputs = model.predict(stacked)
+        outputs = np.split(outputs, np.cumsum([len(X) for X in inputs])[:-1])
+        for i, forecast in zip(validation, outputs):
+            steps = items[i][2]
+            scaler, df, _ = prepared[i]
+            # Rescale back
+            forecast = scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()[-steps:]
+            # Return the difference between real values and forecasts
+            forecasts[i] = np.subtract(forecast.flatten(), df[-steps:].flatten())
+
+    # Extrapolation forecast
+    if extrapolation:
+        # Roll forward from the last feature window of every request together
+        windows = np.concatenate([prepared[i][2][-1:] for i in extrapolation])
+        steps = max(items[i][2] for i in extrapolation)
+        with data.stage("predict"):
+            if lstm:
+                outputs = lstm_recursive_forecast(model, windows, steps)
+            else:
+                outputs = recursive_forecast(model.predict, windows, steps)
+        for i, forecast in zip(extrapolation, outputs):
+            scaler = prepared[i][0]
+            # Rescale back
+            forecasts[i] = scaler.inverse_transform(forecast[:items[i][2]].reshape(-1, 1)).flatten()
+    return forecasts
+
+# Sarima forecasts, the model forecast and in-sample prediction are computed once for all requests
+def forecast_sarima(model, items, data):
+    series = [data.series(file_path) for _, file_path, _ in items]
+    validation = [steps == TEST_FORECAST_STEP_SIZE for _, _, steps in items]
+    # Longest horizon needed by any request, shorter forecasts are its prefixes
+    horizon = max(TEST_SIZE_SAMPLES_ARIMA if is_validation else steps
+                  for (_, _, steps), is_validation in zip(items, validation))
+    with data.stage("predict"):
+        full_forecast = np.asarray(model.forecast(steps=horizon))
+        train_forecast = None
+        if any(validation):
+            # In-sample prediction over the longest train set
+            train_end = max(len(df) - TEST_SIZE_SAMPLES_ARIMA for df, is_validation in zip(series, validation) if is_validation)
+            train_forecast = np.asarray(model.predict(start=0, end=train_end - 1, typ='levels'))
+    forecasts = []
+    for (_, _, steps), df, is_validation in zip(items, series, validation):
+        # Extrapolation forecast
+        if not is_validation:
+            forecasts.append(full_forecast[:steps])
+        # Validation forecast
+        else:
+            # Create train set
+            train = df[:-TEST_SIZE_SAMPLES_ARIMA]
+            test_forecast = full_forecast[:TEST_SIZE_SAMPLES_ARIMA]
+            forecast = np.concatenate((train_forecast[:len(train)], test_forecast)).flatten()[-steps:]
+            # Return the difference between real values and forecasts
+            forecasts.append(np.subtract(forecast.flatten(), df[-steps:].flatten()))
+    return forecasts
+
+# Sarima svr forecasts, the svr model forecasts the data from lag windows of sarima predictions
+def forecast_sarima_svr(model, sarima_model, items, data):
+    scalers, inputs = [], []
+    for _, file_path, steps in items:
+        df = data.series(file_path)
+        train = df[:-TEST_SIZE_SAMPLES_ARIMA]
+        # Sarima predictions of the train set, the test set and the blocks after the data
+        blocks = 1 if steps == TEST_FORECAST_STEP_SIZE else -(-steps // FORECASTING_PERIOD)
+        with data.stage("predict"):
+            train_forecast = np.asarray(sarima_model.predict(start=0, end=len(train) - 1, typ='levels'))
+            test_forecast = np.asarray(sarima_model.forecast(steps=TEST_SIZE_SAMPLES_ARIMA + (blocks - 1) * FORECASTING_PERIOD))
+        arima_forecasts = np.concatenate((train_forecast, test_forecast))
+        end = len(train_forecast) + TEST_SIZE_SAMPLES_ARIMA
+        # Scale the data and sarima predictions into [0,1] interval together, like in training
+        with data.stage("scale"):
+            scaler = MinMaxScaler()
+            scaler.fit(np.concatenate((df, arima_forecasts[:end])).reshape(-1, 1))
+            arima_forecasts = scaler.transform(arima_forecasts.reshape(-1, 1)).flatten()
+        with data.stage("preprocess"):
+            # Validation forecast
+            if steps == TEST_FORECAST_STEP_SIZE:
+                # Get feature array of the sarima predictions over the data
+                X, _ = preprocess_data(arima_forecasts[:end])
+            # Extrapolation forecast
+            else:
+                # Lag window ending at the end of the data and every block after it
+                X = sliding_window_view(arima_forecasts[end - LAG_COUNT:], LAG_COUNT)[::FORECASTING_PERIOD]
+        scalers.append(scaler)
+        inputs.append(X)
+    # Forecast the windows of all requests with one call
+    with data.stage("predict"):
+        outputs = np.split(model.predict(np.concatenate(inputs)), np.cumsum([len(X) for X in inputs])[:-1])
+    forecasts = []
+    for (_, file_path, steps), scaler, forecast in zip(items, scalers, outputs):
+        # Rescale back
+        forecast = scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()
+        if steps == TEST_FORECAST_STEP_SIZE:
+            df = data.series(file_path)
+            # Return the difference between real values and forecasts
+            forecasts.append(np.subtract(forecast[-steps:], df[-steps:]))
+        else:
+            forecasts.append(forecast[:steps])
+    return forecasts
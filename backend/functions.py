@@ -1,19 +1,12 @@
 from constants import SLIDING_WINDOW_SIZE, LAG_COUNT, FORECASTING_PERIOD
-import numpy as np
+from windowing import make_windows
 import os
 import pandas as pd
 
 def preprocess_data(data):
-    X = []
-    Y = []
+    # Windows are aligned so the last target window ends at the last data point
     start_index = len(data) % LAG_COUNT
-    for i in range(start_index, len(data)-LAG_COUNT, SLIDING_WINDOW_SIZE):
-        X.append(data[i:i + LAG_COUNT])
-        Y.append(data[i + LAG_COUNT:i + LAG_COUNT+FORECASTING_PERIOD])
-
-    X = np.array(X).reshape(-1, LAG_COUNT)
-    Y = np.array(Y).reshape(-1, FORECASTING_PERIOD)
-    return X, Y
+    return make_windows(data, LAG_COUNT, FORECASTING_PERIOD, SLIDING_WINDOW_SIZE, start_index)
 
 def read_data(file_name):
     if os.path.exists(file_name):
@@ -0,0 +1,56 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from argon2 import PasswordHasher
+from argon2.exceptions import VerifyMismatchError, InvalidHashError
+
+
+# Raised when the password hashing queue is full
+class HashingSaturated(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+# Argon2 hashing on a few dedicated threads, argon2 releases the GIL while hashing so the event loop keeps
+# running. Every hash takes memory_cost KiB, so the threads cap the memory used by hashing and requests
+# beyond the queue size are rejected instead of piling up.
+# Hashes store their own cost parameters, hashes made with other parameters are verified with them and
+# rehashed with the current ones on login.
+class PasswordHashing:
+    def __init__(self, workers, queue_size, retry_after, time_cost, memory_cost, parallelism):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+        self.hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hashing")
+
+    async def _run(self, func, *args):
+        if self.pending >= self.workers + self.queue_size:
+            raise HashingSaturated(self.retry_after)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password):
+        return await self._run(self.hasher.hash, password)
+
+    # Check password against the hash, returns whether it matches and the new hash when the
+    # stored one was made with other cost parameters
+    def _verify(self, hashed_password, password):
+        try:
+            self.hasher.verify(hashed_password, password)
+        except (VerifyMismatchError, InvalidHashError):
+            return False, None
+        if self.hasher.check_needs_rehash(hashed_password):
+            return True, self.hasher.hash(password)
+        return True, None
+
+    async def verify(self, hashed_password, password):
+        return await self._run(self._verify, hashed_password, password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,132 @@
+import asyncio
+import multiprocessing
+import os
+from contextlib import AsyncExitStack
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threadpoolctl import threadpool_limits
+from registry import ModelRegistry
+from metrics import StageTimer, forecast_stage_seconds
+
+# Models of the current worker process
+registry = None
+
+
+# Worker process initializer
+def _init_worker(model_dir, memory_budget, pin_after, pinned, pin_window):
+    global registry
+    # Each worker runs one forecast at a time, so library thread pools are limited to one thread
+    threadpool_limits(1)
+    # Models are loaded when they are first used
+    registry = ModelRegistry(model_dir, memory_budget, pin_after, pinned, pin_window)
+    registry.discover()
+
+
+# Forecast (model name, method name, file path, steps) requests with the models of the worker process,
+# the stage timings are returned to the server
+def _run_forecasts(requests):
+    from forecasting import compute_forecasts
+    timer = StageTimer()
+    forecasts = compute_forecasts(registry.get, requests, timer)
+    return os.getpid(), forecasts, registry.stats(), timer.timings
+
+
+# Used to start the worker processes
+def _ping():
+    return os.getpid()
+
+
+# Raised when the inference queue is full
+class PoolSaturated(Exception):
+    def __init__(self, retry_after):
+        super().__init__("Inference queue is full")
+        self.retry_after = retry_after
+
+
+# Pool of worker processes, each holding its own registry of models
+class InferencePool:
+    def __init__(self, processes, queue_size, method_limits, retry_after, model_dir="models",
+                 memory_budget=None, pin_after=None, pinned=(), pin_window=None):
+        self.processes = processes
+        self.queue_size = queue_size
+        self.method_limits = method_limits
+        self.retry_after = retry_after
+        self.registry_options = (model_dir, memory_budget, pin_after, list(pinned), pin_window)
+        self.pending = 0
+        # Latest model registry stats reported by each worker process
+        self.worker_stats = {}
+        self._executor = None
+        self._semaphores = {}
+        self._warmup = None
+        self._restart_lock = asyncio.Lock()
+
+    # Start worker processes in the background, the server doesn't wait for them
+    def start(self):
+        # Spawned workers don't inherit TensorFlow state from the server process
+        self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                             mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=self.registry_options)
+        loop = asyncio.get_running_loop()
+        self._warmup = asyncio.gather(*[loop.run_in_executor(self._executor, _ping) for _ in range(self.processes)])
+
+    # Replace the pool after one of its worker processes died, the broken pool fails every task it is given.
+    # Tasks that saw the same pool break restart it only once.
+    async def _restart(self, broken):
+        async with self._restart_lock:
+            if self._executor is not broken:
+                return
+            print("Inference worker process died, restarting the inference pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.worker_stats.clear()
+            self.start()
+
+    # Run batch on a worker process, retried once on a new pool when a worker process died. Rejected like a full
+    # queue when the new pool breaks as well.
+    async def _run(self, requests):
+        loop = asyncio.get_running_loop()
+        for _ in range(2):
+            executor = self._executor
+            try:
+                return await loop.run_in_executor(executor, _run_forecasts, requests)
+            except BrokenProcessPool:
+                await self._restart(executor)
+        raise PoolSaturated(self.retry_after)
+
+    # Wait until every worker process is running
+    async def wait_ready(self):
+        if self._warmup is not None:
+            await self._warmup
+
+    # Concurrency limit of a forecasting method
+    def _semaphore(self, method_name):
+        if method_name not in self._semaphores:
+            self._semaphores[method_name] = asyncio.Semaphore(self.method_limits.get(method_name, self.processes))
+        return self._semaphores[method_name]
+
+    # Queue forecast on the worker processes, rejecting it when the queue is full
+    async def forecast(self, model_name, method_name, file_path, steps):
+        forecasts = await self.forecast_batch([(model_name, method_name, file_path, steps)])
+        return forecasts[0]
+
+    # Queue batch of (model name, method name, file path, steps) requests as one task of a worker process
+    async def forecast_batch(self, requests):
+        if self.pending >= self.processes + self.queue_size:
+            raise PoolSaturated(self.retry_after)
+        self.pending += 1
+        try:
+            async with AsyncExitStack() as stack:
+                # Batch holds a slot of every method it uses, taken in the same order to avoid deadlocks
+                for method_name in sorted({request[1] for request in requests}):
+                    await stack.enter_async_context(self._semaphore(method_name))
+                pid, forecasts, stats, timings = await self._run(requests)
+            self.worker_stats[pid] = stats
+            for stage, method_name, seconds in timings:
+                forecast_stage_seconds.observe(seconds, stage=stage, method_name=method_name)
+            return forecasts
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
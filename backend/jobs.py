@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+from collections import deque
+from bson import ObjectId
+
+# Training scripts run from their own directory
+CREATE_MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "create_models")
+# Lines of the job output kept in its record
+OUTPUT_LINES = 20
+# Longest output line read from a job, keras progress bars redraw one line many times
+MAX_LINE_LENGTH = 1024 * 1024
+
+
+# Queue of training and model update jobs. Every job runs a script of create_models in a subprocess at a lower
+# priority, so training never runs in the server process, and only max_jobs run at once, each using at most
+# processes cores for its searches, model fits and library threads, so inference keeps its share of the cores. Jobs of the same models run one at a time,
+# in the order they were submitted.
+# Job records are kept in MongoDB with their state, progress and the tail of their output.
+class JobQueue:
+    def __init__(self, collection, model_dir, max_jobs, time_budget, time_limit, niceness, processes):
+        self.collection = collection
+        self.model_dir = model_dir
+        self.max_jobs = max_jobs
+        self.time_budget = time_budget
+        self.time_limit = time_limit
+        self.niceness = niceness
+        self.processes = processes
+        self._semaphore = None
+        self._locks = {}
+        self._tasks = set()
+        self._processes = set()
+
+    # Jobs that were queued or running when the server stopped won't finish, staging directories they
+    # left behind are removed
+    async def recover(self):
+        await self.collection.update_many({"state": {"$in": ["queued", "running"]}},
+                                          {"$set": {"state": "interrupted", "finished": time.time()}})
+        if os.path.isdir(self.model_dir):
+            for name in os.listdir(self.model_dir):
+                if name.startswith(".staging-"):
+                    shutil.rmtree(os.path.join(self.model_dir, name), ignore_errors=True)
+
+    # Queue job of the given kind, "train" or "update", for the models named with the prefix
+    async def submit(self, kind, prefix, file_path, user_id=None, file_id=None, methods=None):
+        job = {"_id": ObjectId(), "kind": kind, "models": prefix, "file": file_path, "user_id": user_id,
+               "file_id": file_id, "methods": methods, "state": "queued", "progress": None, "result": None,
+               "created": time.time(), "started": None, "finished": None, "returncode": None, "output": []}
+        await self.collection.insert_one(job)
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _command(self, job):
+        file_path, model_dir = os.path.abspath(job["file"]), os.path.abspath(self.model_dir)
+        if job["kind"] == "update":
+            return ["update.py", job["models"], file_path, model_dir, "--processes", str(self.processes)]
+        command = ["train.py", job["models"], file_path, model_dir, "--time-budget", str(self.time_budget),
+                   "--processes", str(self.processes)]
+        if job["methods"]:
+            command += ["--methods", *job["methods"]]
+        return command
+
+    async def _set(self, job, **fields):
+        job.update(fields)
+        await self.collection.update_one({"_id": job["_id"]}, {"$set": fields})
+
+    def _lower_priority(self):
+        os.nice(self.niceness)
+
+    async def _run(self, job):
+        # Semaphore is created lazily so it belongs to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_jobs)
+        lock = self._locks.setdefault(job["models"], asyncio.Lock())
+        async with lock, self._semaphore:
+            await self._set(job, state="running", started=time.time())
+            output = deque(maxlen=OUTPUT_LINES)
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, *self._command(job), cwd=CREATE_MODELS_DIR, limit=MAX_LINE_LENGTH,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT,
+                env={**os.environ, "PYTHONUNBUFFERED": "1", "TF_CPP_MIN_LOG_LEVEL": "2"},
+                preexec_fn=self._lower_priority if hasattr(os, "nice") else None)
+            self._processes.add(process)
+            try:
+                await asyncio.wait_for(self._read_output(job, process, output), self.time_limit)
+                await process.wait()
+                state = "done" if process.returncode == 0 else "failed"
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                state = "timed out"
+            finally:
+                self._processes.discard(process)
+            await self._set(job, state=state, returncode=process.returncode, finished=time.time(), output=list(output))
+            print(f"Job {job['_id']} ({job['kind']} {job['models']}): {state}")
+
+    # Follow the output of the job, PROGRESS and RESULT lines update its record
+    async def _read_output(self, job, process, output):
+        async for line in process.stdout:
+            line = line.decode(errors="replace").rstrip()
+            kind, _, values = line.partition(" ")
+            if kind == "PROGRESS":
+                await self._set(job, progress=json.loads(values))
+            elif kind == "RESULT":
+                await self._set(job, result=json.loads(values))
+            elif line:
+                output.append(line)
+
+    # Stop running jobs, their artifacts are only moved into place once complete
+    def shutdown(self):
+        for process in list(self._processes):
+            process.kill()
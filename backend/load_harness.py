@@ -0,0 +1,275 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Offline load test of the whole server. Starts the app against a local Mongo stand-in, seeds users and uploads,
+# replays a traffic mix at a target rate and reports throughput and latency percentiles per endpoint.
+# Run from the backend directory:
+#   python load_harness.py --rate 20 --duration 60 --mix login=1 files=2 file_data=2 forecast=2 forecast_batch=2
+# Mongo is mongomock by default, --mongo-url uses a temporary database on a local mongod instead. The app runs on
+# its own event loop thread in this process, or under uvicorn with --server uvicorn. Uploads go to a temporary
+# directory and model updates on upload are off, the models are only read. Exits with 1 when a --max-p99 or
+# --max-error-rate limit is exceeded.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASETS = ["cheese.csv", "notebooks.csv", "snow_cleaners.csv"]
+METHODS = ["svr", "lstm", "sarima", "sarima_svr"]
+DEFAULT_MIX = {"login": 1, "files": 2, "file_data": 2, "forecast": 2, "forecast_batch": 2}
+PASSWORD = "load-test-password"
+
+
+# Point the collections at the given database, before the server is imported
+def use_database(db):
+    import database
+    database.collection = database.AsyncCollection(db["Users"])
+    database.files_collection = database.AsyncCollection(db["Files"])
+    database.jobs_collection = database.AsyncCollection(db["Jobs"])
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Client posting to the in-process app, requests are run on the event loop thread of the app
+class InProcessServer:
+    def __init__(self, app):
+        from fastapi.testclient import TestClient
+        self.client = TestClient(app)
+
+    def __enter__(self):
+        self.client.__enter__()
+        return self
+
+    def __exit__(self, *args):
+        self.client.__exit__(*args)
+
+    def request(self, method, path, **kwargs):
+        return self.client.request(method, path, **kwargs)
+
+
+# Uvicorn serving the app on a local port from a background thread, every client thread has its own session
+class UvicornServer:
+    def __init__(self, app):
+        import uvicorn
+        self.port = free_port()
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.local = threading.local()
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("Uvicorn failed to start")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *args):
+        self.server.should_exit = True
+        self.thread.join()
+
+    def request(self, method, path, **kwargs):
+        import requests
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session.request(method, f"http://127.0.0.1:{self.port}{path}", **kwargs)
+
+
+# Register users and upload the bundled datasets for each of them, returns [(email, user id, [file ids])]
+def seed(server, users):
+    seeded = []
+    for i in range(users):
+        email = f"load{i}@test.local"
+        response = server.request("POST", "/register", json={"user_name": f"load{i}", "email": email,
+                                                              "password": PASSWORD})
+        response.raise_for_status()
+        user_id = response.json()["_id"]
+        file_ids = []
+        for dataset in DATASETS:
+            with open(os.path.join(BACKEND_DIR, "create_models", dataset), "rb") as f:
+                response = server.request("POST", "/file/upload", files={"file": (dataset, f, "text/csv")},
+                                          data={"user_id": user_id})
+            response.raise_for_status()
+            file_ids.append(response.json()["_id"])
+        seeded.append((email, user_id, file_ids))
+    return seeded
+
+
+# Requests of one scenario as (endpoint label, method, path, json body), run one after another like the frontend
+def scenario_requests(name, user, steps):
+    email, user_id, file_ids = user
+    file_id = random.choice(file_ids)
+    if name == "login":
+        return [("/login", "POST", "/login", {"email": email, "password": PASSWORD})]
+    if name == "files":
+        return [("/file/", "POST", "/file/", {"user_id": user_id})]
+    if name == "file_data":
+        return [("/file/data", "POST", "/file/data", {"user_id": user_id, "file_id": file_id, "shape": "columns"})]
+    step = random.choice(steps)
+    if name == "forecast":
+        # Home page forecasts of the four methods, one request at a time
+        return [(f"/forecast {method}", "POST", "/forecast", {"user_id": user_id, "file_id": file_id,
+                                                              "method_name": method, "steps": step})
+                for method in METHODS]
+    if name == "forecast_batch":
+        return [("/forecast/batch", "POST", "/forecast/batch",
+                 {"user_id": user_id, "forecasts": [{"file_id": file_id, "method_name": method, "steps": step}
+                                                    for method in METHODS]})]
+    raise ValueError(f"Unknown scenario '{name}'")
+
+
+# Start scenarios at the target rate for the duration, whatever the server's response times are, so slow responses
+# show up as latency instead of a lower request rate. Latency of a scenario's first request counts from the time
+# it was scheduled. Returns {endpoint: [(latency, status)]} and the seconds the run took.
+def replay(server, users, mix, rate, duration, steps, concurrency):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {}
+    lock = threading.Lock()
+
+    def run_scenario(name, user, scheduled):
+        start = scheduled
+        for endpoint, method, path, body in scenario_requests(name, user, steps):
+            try:
+                status = server.request(method, path, json=body).status_code
+            except Exception:
+                status = None
+            end = time.perf_counter()
+            with lock:
+                results.setdefault(endpoint, []).append((end - start, status))
+            start = end
+
+    begin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(int(rate * duration)):
+            scheduled = begin + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run_scenario, random.choices(names, weights)[0], random.choice(users), scheduled)
+    return results, time.perf_counter() - begin
+
+
+def summarize(results, elapsed):
+    summary = {}
+    for endpoint, samples in sorted(results.items()):
+        latencies = np.array([latency for latency, _ in samples]) * 1000
+        errors = sum(status is None or status >= 400 for _, status in samples)
+        summary[endpoint] = {
+            "requests": len(samples),
+            "errors": errors,
+            "error_rate": errors / len(samples),
+            "throughput": len(samples) / elapsed,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        }
+    return summary
+
+
+def print_summary(summary, elapsed):
+    total = sum(item["requests"] for item in summary.values())
+    print(f"{total} requests in {elapsed:.1f}s, {total / elapsed:.1f} requests/s")
+    print(f"{'endpoint':22} {'requests':>8} {'errors':>7} {'req/s':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for endpoint, item in summary.items():
+        print(f"{endpoint:22} {item['requests']:8} {item['errors']:7} {item['throughput']:7.1f} "
+              f"{item['p50_ms']:7.1f}ms {item['p95_ms']:7.1f}ms {item['p99_ms']:7.1f}ms")
+
+
+# Limits the run broke, endpoint limits apply to every endpoint label starting with the given path
+def check_limits(summary, max_p99, max_error_rate):
+    failures = []
+    for prefix, limit in max_p99.items():
+        for endpoint, item in summary.items():
+            if endpoint.split(" ")[0] == prefix and item["p99_ms"] > limit:
+                failures.append(f"{endpoint} p99 {item['p99_ms']:.1f}ms is over {limit:.1f}ms")
+    if max_error_rate is not None:
+        for endpoint, item in summary.items():
+            if item["error_rate"] > max_error_rate:
+                failures.append(f"{endpoint} error rate {item['error_rate']:.1%} is over {max_error_rate:.1%}")
+    return failures
+
+
+# Parse name=value arguments
+def parse_pairs(values, convert):
+    pairs = {}
+    for value in values:
+        name, _, number = value.rpartition("=")
+        if not name:
+            raise argparse.ArgumentTypeError(f"Expected name=value, got '{value}'")
+        pairs[name] = convert(number)
+    return pairs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--server", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--mongo-url", default=None)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=10, help="scenarios started per second")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5, help="seconds of traffic before measuring")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--mix", nargs="+", default=[f"{name}={weight}" for name, weight in DEFAULT_MIX.items()])
+    parser.add_argument("--steps", type=int, nargs="+", default=[12], help="forecast steps, picked at random")
+    parser.add_argument("--max-p99", nargs="+", default=[], help="endpoint=milliseconds limits, e.g. /forecast=2000")
+    parser.add_argument("--max-error-rate", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+    mix = parse_pairs(args.mix, float)
+    for name in mix:
+        scenario_requests(name, ("", "", [""]), args.steps)
+    max_p99 = parse_pairs(args.max_p99, float)
+    random.seed(args.seed)
+
+    # The server reads and writes models and uploads relative to its working directory
+    sys.path.insert(0, BACKEND_DIR)
+    work_dir = tempfile.mkdtemp(prefix="load-harness-")
+    os.symlink(os.path.join(BACKEND_DIR, "models"), os.path.join(work_dir, "models"))
+    os.chdir(work_dir)
+    # Users and files are seeded into a database of this run, which is dropped afterwards
+    if args.mongo_url is not None:
+        os.environ["MONGO_URL"] = args.mongo_url
+        import database
+        client = database.client
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    db_name = f"forecastDB_load_{uuid.uuid4().hex}"
+    use_database(client[db_name])
+    import server as app_server
+    app_server.UPDATE_MODELS_ON_UPLOAD = False
+
+    try:
+        with (UvicornServer if args.server == "uvicorn" else InProcessServer)(app_server.app) as server:
+            users = seed(server, args.users)
+            # Inference workers load their models during the warmup
+            replay(server, users, mix, args.rate, args.warmup, args.steps, args.concurrency)
+            results, elapsed = replay(server, users, mix, args.rate, args.duration, args.steps, args.concurrency)
+    finally:
+        client.drop_database(db_name)
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = summarize(results, elapsed)
+    print_summary(summary, elapsed)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"options": vars(args), "elapsed": elapsed, "endpoints": summary}, f, indent=2)
+    failures = check_limits(summary, max_p99, args.max_error_rate)
+    for failure in failures:
+        print(failure)
+    sys.exit(1 if failures else 0)
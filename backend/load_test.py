@@ -0,0 +1,148 @@
+import argparse
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+from constants import TEST_FORECAST_STEP_SIZE
+
+# Load test showing how /login and /file/ latency behaves while /forecast is saturated, and how /file/ and
+# /forecast behave during a storm of logins.
+# Requires a running server with an existing user that has at least one uploaded file:
+#   python load_test.py --email user@mail.com --password secret --file-id <file id>
+
+METHODS = ["svr", "lstm", "sarima", "sarima_svr"]
+# Saturating forecasts cycle through the methods and this many step counts, giving more distinct requests than the
+# forecast cache holds so every one of them misses it
+SATURATE_STEP_COUNTS = 512
+
+
+# Measure latency of light endpoints for the given duration
+def measure_light_endpoints(url, email, password, user_id, duration, clients):
+    latencies = {"/login": [], "/file/": []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            for endpoint, payload in [("/login", {"email": email, "password": password}),
+                                      ("/file/", {"user_id": user_id})]:
+                start = time.perf_counter()
+                session.post(url + endpoint, json=payload).raise_for_status()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies[endpoint].append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(lambda _: client(), range(clients)))
+    return latencies
+
+
+# Keep /forecast saturated until stop event is set. Requests are numbered by the shared counter, the number picks
+# the method and steps, and a request repeats only after more distinct ones than the forecast cache holds, so the
+# LRU cache has always evicted it and every request does model work.
+def saturate_forecast(url, user_id, file_id, stop, counter, forecasts):
+    session = requests.Session()
+    while not stop.is_set():
+        number = next(counter)
+        method = METHODS[number % len(METHODS)]
+        steps = TEST_FORECAST_STEP_SIZE + number // len(METHODS) % SATURATE_STEP_COUNTS
+        session.post(url + "/forecast", json={"user_id": user_id, "file_id": file_id, "method_name": method,
+                                              "steps": steps})
+        forecasts.append(1)
+
+
+# Keep logging in until stop event is set, counting responses by status code
+def storm_login(url, email, password, stop, statuses):
+    session = requests.Session()
+    while not stop.is_set():
+        response = session.post(url + "/login", json={"email": email, "password": password})
+        statuses.append(response.status_code)
+
+
+# Measure latency of /file/ and cached /forecast requests for the given duration
+def measure_other_endpoints(url, user_id, file_id, duration, clients):
+    latencies = {"/file/": [], "/forecast": []}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < deadline:
+            for endpoint, payload in [("/file/", {"user_id": user_id}),
+                                      ("/forecast", {"user_id": user_id, "file_id": file_id, "method_name": "svr",
+                                                     "steps": 12})]:
+                start = time.perf_counter()
+                session.post(url + endpoint, json=payload).raise_for_status()
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies[endpoint].append(elapsed)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(lambda _: client(), range(clients)))
+    return latencies
+
+
+def print_latencies(title, latencies):
+    print(title)
+    for endpoint, values in latencies.items():
+        values = np.array(values) * 1000
+        print(f"  {endpoint:8} n={len(values):5}  p50={np.percentile(values, 50):8.1f}ms  "
+              f"p95={np.percentile(values, 95):8.1f}ms  p99={np.percentile(values, 99):8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--file-id", required=True)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--forecast-clients", type=int, default=32)
+    parser.add_argument("--login-clients", type=int, default=32)
+    args = parser.parse_args()
+
+    response = requests.post(args.url + "/login", json={"email": args.email, "password": args.password})
+    response.raise_for_status()
+    user_id = response.json()["_id"]
+
+    # Latency without forecasting load
+    baseline = measure_light_endpoints(args.url, args.email, args.password, user_id, args.duration, args.clients)
+    print_latencies("Idle server:", baseline)
+
+    # Latency while forecasting clients keep the server busy
+    stop = threading.Event()
+    counter = itertools.count()
+    forecasts = []
+    cache_before = requests.get(args.url + "/forecast/cache").json()
+    threads = [threading.Thread(target=saturate_forecast,
+                                args=(args.url, user_id, args.file_id, stop, counter, forecasts))
+               for _ in range(args.forecast_clients)]
+    for thread in threads:
+        thread.start()
+    loaded = measure_light_endpoints(args.url, args.email, args.password, user_id, args.duration, args.clients)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    cache_after = requests.get(args.url + "/forecast/cache").json()
+    print_latencies(f"Saturated /forecast ({len(forecasts) / args.duration:.1f} forecasts/s, "
+                    f"{cache_after['hits'] - cache_before['hits']} cache hits):", loaded)
+
+    # Latency of other endpoints while many clients log in at once, rejected logins are answered with 503
+    baseline = measure_other_endpoints(args.url, user_id, args.file_id, args.duration, args.clients)
+    print_latencies("No logins:", baseline)
+    stop = threading.Event()
+    statuses = []
+    threads = [threading.Thread(target=storm_login, args=(args.url, args.email, args.password, stop, statuses))
+               for _ in range(args.login_clients)]
+    for thread in threads:
+        thread.start()
+    loaded = measure_other_endpoints(args.url, user_id, args.file_id, args.duration, args.clients)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    print_latencies(f"Login storm ({statuses.count(200) / args.duration:.1f} logins/s, "
+                    f"{statuses.count(503) / args.duration:.1f} rejected/s):", loaded)
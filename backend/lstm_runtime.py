@@ -0,0 +1,79 @@
+import numpy as np
+from rollout import build_lstm_rollout
+
+# Runtimes serving lstm models: "keras" calls Model.predict, "tf_function" calls a traced graph function
+# with a fixed input signature and "tflite" runs the model in the TFLite CPU interpreter
+LSTM_RUNTIMES = ["keras", "tf_function", "tflite"]
+
+
+# Lstm model traced into graph functions with a fixed input signature, so a forecast skips the data
+# adapter and callbacks Model.predict sets up on every call
+class CompiledLSTM:
+    def __init__(self, model):
+        import tensorflow as tf
+        self.model = model
+        self.input_shape = model.input_shape
+        lag, features = self.input_shape[1], self.input_shape[2]
+        self._forward = tf.function(lambda windows: model(windows, training=False),
+                                    input_signature=[tf.TensorSpec([None, lag, features], tf.float32)])
+        self.rollout = build_lstm_rollout(model)
+        # Trace both functions now so the first forecast doesn't pay for it
+        windows = np.zeros((1, lag, features), dtype=np.float32)
+        self._forward(windows)
+        self.rollout(windows, np.int32(1))
+
+    # Same call as keras Model.predict, verbose is accepted and ignored
+    def predict(self, X, verbose=0):
+        return self._forward(np.asarray(X, dtype=np.float32)).numpy()
+
+    def get_weights(self):
+        return self.model.get_weights()
+
+
+# Lstm model converted to TFLite and run in the CPU interpreter
+class TFLiteLSTM:
+    def __init__(self, model):
+        import tensorflow as tf
+        self.input_shape = model.input_shape
+        lag, features = self.input_shape[1], self.input_shape[2]
+        forward = tf.function(lambda windows: model(windows, training=False),
+                              input_signature=[tf.TensorSpec([1, lag, features], tf.float32)])
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([forward.get_concrete_function()], model)
+        self.flatbuffer = converter.convert()
+        self.interpreter = tf.lite.Interpreter(model_content=self.flatbuffer, num_threads=1)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]["index"]
+        self._output = self.interpreter.get_output_details()[0]["index"]
+        # Run once so the first forecast doesn't pay for the interpreter setup
+        self.predict(np.zeros((1, lag, features), dtype=np.float32))
+
+    # Same call as keras Model.predict, verbose is accepted and ignored.
+    # The converted lstm keeps its state for a batch of one, so windows are run one at a time.
+    def predict(self, X, verbose=0):
+        X = np.asarray(X, dtype=np.float32)
+        outputs = []
+        for window in X:
+            # Lstm state tensors persist between invocations, every window starts from zero state
+            self.interpreter.reset_all_variables()
+            self.interpreter.set_tensor(self._input, window[np.newaxis])
+            self.interpreter.invoke()
+            outputs.append(self.interpreter.get_tensor(self._output)[0].copy())
+        return np.array(outputs)
+
+    # Size of the converted model
+    def size_bytes(self):
+        return len(self.flatbuffer)
+
+
+# Wrap loaded keras lstm model for serving with the given runtime.
+# Falls back to the keras model when the runtime can't be built for it.
+def compile_lstm(model, runtime="tf_function"):
+    if runtime == "keras":
+        return model
+    try:
+        if runtime == "tflite":
+            return TFLiteLSTM(model)
+        return CompiledLSTM(model)
+    except Exception as error:
+        print(f"Failed to build {runtime} runtime, using keras predict: {error!r}")
+        return model
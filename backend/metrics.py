@@ -0,0 +1,171 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Counters, gauges and histograms served in the Prometheus text format on /metrics.
+# Values are kept by the server process, the inference workers report their stage timings with every batch.
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Metric '{self.name}' has labels {self.labels}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+# Metric whose samples are read when /metrics is requested, func returns {label values: value}
+class CallbackMetric(Metric):
+    def __init__(self, name, documentation, kind, func, labels=()):
+        super().__init__(name, documentation, labels)
+        self.kind = kind
+        self.func = func
+
+    def samples(self):
+        values = self.func()
+        return [(self.name, tuple(str(value) for value in key), values[key]) for key in sorted(values)]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = list(buckets) + [math.inf]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            # Rendering may hold the previous counts
+            counts = list(counts)
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for _, key, (counts, total) in self.samples():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labels, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def callback(self, name, documentation, kind, func, labels=()):
+        return self.register(CallbackMetric(name, documentation, kind, func, labels))
+
+    # Every metric in the Prometheus text exposition format
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Seconds spent in each stage of a forecast batch as (stage, method name, seconds), collected on an
+# inference worker and recorded by the server
+class StageTimer:
+    def __init__(self):
+        self.timings = []
+
+    @contextmanager
+    def stage(self, stage, method_name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append((stage, method_name, time.perf_counter() - start))
+
+
+# Metrics of the server process
+metrics_registry = MetricsRegistry()
+request_seconds = metrics_registry.histogram("http_request_duration_seconds", "Latency of HTTP requests by route",
+                                             ["path", "method", "status"])
+forecast_stage_seconds = metrics_registry.histogram("forecast_stage_duration_seconds",
+                                                    "Latency of the stages of forecasts by forecasting method",
+                                                    ["stage", "method_name"])
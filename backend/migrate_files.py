@@ -0,0 +1,57 @@
+import argparse
+from pymongo import UpdateOne
+from database import collection, files_collection, create_indexes
+
+# Move the files arrays embedded in Users documents into the Files collection and create the indexes.
+# Safe to run again, files already moved are left as they are:
+#   python migrate_files.py [--dry-run]
+
+
+# Report values of fields shared by several documents, the unique index on them can't be built until they are fixed
+def report_duplicates(documents, fields, kind):
+    duplicates = list(documents.aggregate([
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}, "ids": {"$push": "$_id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]))
+    for duplicate in duplicates:
+        values = ", ".join(f"{field} '{duplicate['_id'][field]}'" for field in fields)
+        print(f"{len(duplicate['ids'])} {kind} share {values}: "
+              f"{', '.join(str(document_id) for document_id in duplicate['ids'])}")
+    return len(duplicates)
+
+
+def migrate(dry_run=False):
+    users = collection.sync
+    files = files_collection.sync
+    moved_users, moved_files = 0, 0
+    for user in users.find({"files": {"$exists": True}}, {"files": 1}):
+        # Upload time of files uploaded before the migration is the creation time of their id
+        operations = [UpdateOne({"_id": file["_id"]},
+                                {"$setOnInsert": {"user_id": user["_id"], "name": file["name"],
+                                                  "path": file.get("path", f"uploads/{user['_id']}/{file['name']}"),
+                                                  "uploaded": file["_id"].generation_time.timestamp()}},
+                                upsert=True)
+                      for file in user["files"]]
+        if not dry_run:
+            if operations:
+                files.bulk_write(operations, ordered=False)
+            # The array is only removed once all of its files are in the Files collection
+            users.update_one({"_id": user["_id"]}, {"$unset": {"files": ""}})
+        moved_users += 1
+        moved_files += len(operations)
+    print(f"{'Would move' if dry_run else 'Moved'} {moved_files} files of {moved_users} users")
+    duplicates = report_duplicates(users, ["email"], "users") + report_duplicates(users, ["username"], "users")
+    # Files uploaded again under the same name used to be added as new files
+    if not dry_run:
+        duplicates += report_duplicates(files, ["user_id", "name"], "files")
+    if duplicates:
+        print("Unique indexes on the duplicated fields are skipped until the documents are merged or renamed")
+    if not dry_run:
+        create_indexes()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    migrate(args.dry_run)
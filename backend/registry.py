@@ -0,0 +1,248 @@
+import os
+import pickle
+import threading
+import time
+from collections import deque
+from artifacts import find_artifacts, parse_artifact_name
+from cache import model_version
+from constants import LSTM_RUNTIME
+from lstm_runtime import compile_lstm
+from sarima_snapshot import SarimaSnapshot
+
+# Load pickled model
+def load_pickle_model(path):
+    import joblib
+    return joblib.load(path)
+
+
+# Load keras model, lstm models are wrapped for the configured serving runtime
+def load_keras_model(path):
+    import tensorflow as tf
+    from keras.models import load_model
+    tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
+    model = load_model(path)
+    parsed = parse_artifact_name(os.path.basename(path))
+    if parsed is not None and parsed[0].endswith("_lstm"):
+        return compile_lstm(model, LSTM_RUNTIME)
+    return model
+
+
+LOADERS = {".npz": SarimaSnapshot, ".pkl": load_pickle_model, ".h5": load_keras_model}
+
+
+# Name of the sarima model a sarima svr model is stacked on
+def sarima_model_name(model_name):
+    return model_name[:-len("_svr")]
+
+
+# Names of the models a forecast with the model uses
+def model_dependencies(model_name):
+    if model_name.endswith("_sarima_svr"):
+        return [model_name, sarima_model_name(model_name)]
+    return [model_name]
+
+
+# Approximate memory used by a loaded model
+def estimate_model_size(model):
+    # Converted models report their own size, keras models are measured by their weights,
+    # other models by their pickled size
+    if hasattr(model, "size_bytes"):
+        return model.size_bytes()
+    if hasattr(model, "get_weights"):
+        return sum(weight.nbytes for weight in model.get_weights())
+    try:
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class ModelEntry:
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.version = model_version(path)
+        self.model = None
+        self.size_bytes = 0
+        self.load_time = None
+        self.loads = 0
+        self.hits = 0
+        # Times of the latest hits, as many as a model needs to be hot
+        self.recent_hits = deque()
+        self.pinned = False
+        self.last_used = 0.0
+        self.error = None
+
+    def stats(self, hot):
+        return {
+            "path": self.path,
+            "version": self.version,
+            "loaded": self.model is not None,
+            "pinned": self.pinned,
+            "hot": hot,
+            "size_bytes": self.size_bytes,
+            "load_time": self.load_time,
+            "loads": self.loads,
+            "hits": self.hits,
+            "error": self.error,
+        }
+
+
+# Registry of the model artifacts on disk, loading each model when it is first requested and
+# evicting models when resident models exceed the memory budget. Models used pin_after times within the last
+# pin_window seconds are hot and evicted only after the other models. Pinned models are never evicted.
+class ModelRegistry:
+    def __init__(self, model_dir="models", memory_budget=None, pin_after=None, pinned=(), pin_window=None):
+        self.model_dir = model_dir
+        self.memory_budget = memory_budget
+        self.pin_after = pin_after
+        self.pin_window = pin_window
+        self.always_pinned = set(pinned)
+        self.entries = {}
+        self.evictions = 0
+        self._lock = threading.RLock()
+        self._scanned = None
+
+    # Modification time of the model directory, changes when artifacts are added or removed
+    def _directory_version(self):
+        try:
+            return os.stat(self.model_dir).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    # Find model artifacts in the model directory
+    def discover(self):
+        scanned = self._directory_version()
+        found = find_artifacts(self.model_dir)
+        with self._lock:
+            self._scanned = scanned
+            for name, path in found.items():
+                entry = self.entries.get(name)
+                if entry is None or entry.path != path:
+                    entry = ModelEntry(name, path)
+                    entry.pinned = name in self.always_pinned
+                    self.entries[name] = entry
+            # Forget artifacts that were removed from disk
+            for name in list(self.entries):
+                if name not in found:
+                    del self.entries[name]
+        return sorted(found)
+
+    def _entry(self, name):
+        # Adding, replacing or removing an artifact changes the directory, models missing from an unchanged
+        # directory are still missing without scanning it again
+        if self._directory_version() != self._scanned:
+            self.discover()
+        with self._lock:
+            return self.entries.get(name)
+
+    # Current version of a model artifact, None if the artifact doesn't exist
+    def version(self, name):
+        entry = self._entry(name)
+        if entry is None:
+            return None
+        version = model_version(entry.path)
+        if version is None:
+            self.discover()
+        return version
+
+    # Names of the available models
+    def available(self):
+        with self._lock:
+            return sorted(self.entries)
+
+    # Get model, loading it if it isn't resident, None if it doesn't exist or can't be loaded
+    def get(self, name):
+        entry = self._entry(name)
+        if entry is None:
+            return None
+        with self._lock:
+            version = model_version(entry.path)
+            if version is None:
+                self.discover()
+                return None
+            # Reload models whose artifact was replaced on disk
+            if entry.model is not None and version != entry.version:
+                self._unload(entry)
+            if entry.model is None:
+                self._load(entry, version)
+                if entry.model is None:
+                    return None
+            now = time.monotonic()
+            entry.hits += 1
+            entry.last_used = now
+            if self.pin_after is not None:
+                entry.recent_hits.append(now)
+                if len(entry.recent_hits) > self.pin_after:
+                    entry.recent_hits.popleft()
+            self._evict(keep=entry)
+            return entry.model
+
+    def _load(self, entry, version):
+        start = time.perf_counter()
+        try:
+            entry.model = LOADERS[os.path.splitext(entry.path)[1]](entry.path)
+        except Exception as error:
+            entry.error = repr(error)
+            print(f"Failed to load model '{entry.name}': {entry.error}")
+            return
+        entry.load_time = time.perf_counter() - start
+        entry.version = version
+        entry.size_bytes = estimate_model_size(entry.model)
+        entry.loads += 1
+        entry.error = None
+
+    def _unload(self, entry):
+        entry.model = None
+        entry.size_bytes = 0
+
+    # Total memory of resident models
+    def resident_bytes(self):
+        with self._lock:
+            return sum(entry.size_bytes for entry in self.entries.values() if entry.model is not None)
+
+    # Model was used pin_after times within the window, any pin_after times without one
+    def _hot(self, entry, now):
+        if self.pin_after is None or len(entry.recent_hits) < self.pin_after:
+            return False
+        return self.pin_window is None or now - entry.recent_hits[0] <= self.pin_window
+
+    # Evict models until resident models fit the memory budget, least recently used models first,
+    # then the hot models, least recently used first
+    def _evict(self, keep=None):
+        if self.memory_budget is None:
+            return
+        now = time.monotonic()
+        resident = self.resident_bytes()
+        candidates = [entry for entry in self.entries.values()
+                      if entry.model is not None and not entry.pinned and entry is not keep]
+        cold = sorted((entry for entry in candidates if not self._hot(entry, now)), key=lambda entry: entry.last_used)
+        hot = sorted((entry for entry in candidates if self._hot(entry, now)), key=lambda entry: entry.last_used)
+        for entry in cold + hot:
+            if resident <= self.memory_budget:
+                break
+            resident -= entry.size_bytes
+            self._unload(entry)
+            self.evictions += 1
+
+    def pin(self, name):
+        entry = self._entry(name)
+        if entry is not None:
+            entry.pinned = True
+
+    def unpin(self, name):
+        entry = self._entry(name)
+        if entry is not None:
+            entry.pinned = name in self.always_pinned
+            with self._lock:
+                self._evict()
+
+    # Load times, resident sizes and usage of every model
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "memory_budget": self.memory_budget,
+                "resident_bytes": self.resident_bytes(),
+                "evictions": self.evictions,
+                "models": {name: entry.stats(self._hot(entry, now)) for name, entry in self.entries.items()},
+            }
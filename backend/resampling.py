@@ -0,0 +1,59 @@
+import numpy as np
+from scipy.interpolate import CubicSpline
+
+# Dense resampling of series, importable by the server and the training pipeline in create_models.
+# Upsampling puts size points on every interval between adjacent observations, starting at the left observation,
+# and downsampling keeps every size-th point, which gives back the observations.
+# The current models are trained on the observations themselves, so neither training nor serving resamples yet,
+# interpolate_data and undo_interpolation of create_models/utilities.py are the entry points for models that will.
+MODES = ["linear", "spline"]
+
+
+# Positions of the points inside an interval as fractions of it
+def _fractions(size, endpoint):
+    div = size - 1 if endpoint else size
+    return np.arange(size) / max(div, 1)
+
+
+# Upsample the series, for data of shape (length, ...) returns shape ((length - 1) * size, ...).
+# Linear mode gives the same values as np.linspace between every pair of adjacent points,
+# spline mode evaluates a cubic spline through the points.
+def upsample(data, size, endpoint=False, mode="linear"):
+    if mode not in MODES:
+        raise ValueError(f"Unknown resampling mode '{mode}', use one of {MODES}")
+    series = np.asarray(data, dtype=np.float64)
+    if len(series) < 2:
+        return np.empty((0,) + series.shape[1:])
+    if mode == "spline":
+        positions = (np.arange(len(series) - 1)[:, np.newaxis] + _fractions(size, endpoint)).ravel()
+        return CubicSpline(np.arange(len(series)), series, axis=0)(positions)
+    # Shape (intervals, 1, ...) against steps of shape (size, 1, ...)
+    start = series[:-1, np.newaxis]
+    div = size - 1 if endpoint else size
+    step = (series[1:] - series[:-1])[:, np.newaxis] / max(div, 1)
+    steps = np.arange(size).reshape((size,) + (1,) * (series.ndim - 1))
+    values = steps * step + start
+    if endpoint and size > 1:
+        values[:, -1] = series[1:]
+    return values.reshape((-1,) + series.shape[1:])
+
+
+# Undo upsample, keeps the first point of every interval
+def downsample(data, size):
+    return np.asarray(data)[::size]
+
+
+# Resampling as a preprocessing stage, in the transform / inverse_transform form of the scalers
+class Resampler:
+    def __init__(self, size, mode="linear", endpoint=False):
+        if mode not in MODES:
+            raise ValueError(f"Unknown resampling mode '{mode}', use one of {MODES}")
+        self.size = size
+        self.mode = mode
+        self.endpoint = endpoint
+
+    def transform(self, data):
+        return upsample(data, self.size, self.endpoint, self.mode)
+
+    def inverse_transform(self, data):
+        return downsample(data, self.size)
@@ -0,0 +1,60 @@
+import weakref
+import numpy as np
+from constants import FORECASTING_PERIOD
+
+# Compiled lstm rollouts of each loaded keras model
+_lstm_rollouts = weakref.WeakKeyDictionary()
+
+
+# Recursive multi-step forecast for a batch of lag windows of shape (batch, lag).
+# Every predict call forecasts the next block of values for all windows at once, the windows then move
+# forward by one block. Windows are views into one preallocated buffer holding the whole horizon, so
+# nothing is appended or copied between calls. Returns scaled forecasts of shape (batch, steps).
+def recursive_forecast(predict, windows, steps, block=FORECASTING_PERIOD):
+    batch, lag = windows.shape
+    blocks = -(-steps // block)
+    buffer = np.empty((batch, lag + blocks * block))
+    buffer[:, :lag] = windows
+    for i in range(blocks):
+        start = lag + i * block
+        buffer[:, start:start + block] = np.asarray(predict(buffer[:, start - lag:start])).reshape(batch, block)
+    return buffer[:, lag:lag + steps]
+
+
+# Build graph function running the whole lstm rollout with one call
+def build_lstm_rollout(model, block=FORECASTING_PERIOD):
+    import tensorflow as tf
+    lag, features = model.input_shape[1], model.input_shape[2]
+
+    @tf.function(input_signature=[tf.TensorSpec([None, lag, features], tf.float32), tf.TensorSpec([], tf.int32)])
+    def rollout(windows, blocks):
+        outputs = tf.TensorArray(tf.float32, size=blocks)
+
+        def step(i, window, outputs):
+            forecast = model(window, training=False)
+            outputs = outputs.write(i, forecast)
+            # Remove first block of values and append the forecasted block
+            window = tf.concat([window[:, block:, :], tf.expand_dims(forecast, -1)], axis=1)
+            return i + 1, window, outputs
+
+        _, _, outputs = tf.while_loop(lambda i, window, outputs: i < blocks, step, (tf.constant(0), windows, outputs))
+        # Shape (blocks, batch, block) into (batch, blocks * block)
+        forecasts = tf.transpose(outputs.stack(), [1, 0, 2])
+        return tf.reshape(forecasts, [tf.shape(windows)[0], -1])
+
+    return rollout
+
+
+# Recursive multi-step lstm forecast for a batch of lag windows of shape (batch, lag), run as one graph call
+def lstm_recursive_forecast(model, windows, steps, block=FORECASTING_PERIOD):
+    # Interpreter backed models have no graph to loop in, they are rolled forward one predict call per block
+    if getattr(model, "interpreter", None) is not None:
+        return recursive_forecast(lambda X: model.predict(X[:, :, np.newaxis]), windows, steps, block)
+    # Compiled models carry their rollout, keras models get one built on first use
+    rollout = getattr(model, "rollout", None) or _lstm_rollouts.get(model)
+    if rollout is None:
+        rollout = build_lstm_rollout(model, block)
+        _lstm_rollouts[model] = rollout
+    blocks = -(-steps // block)
+    windows = np.asarray(windows, dtype=np.float32).reshape(windows.shape[0], windows.shape[1], 1)
+    return rollout(windows, np.int32(blocks)).numpy()[:, :steps]
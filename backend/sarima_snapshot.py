@@ -0,0 +1,62 @@
+import numpy as np
+
+# Side-car of a fitted sarima model holding its in-sample predictions, its test horizon forecast and the
+# state space matrices with the predicted state after the last training point. Forecasts read the stored
+# predictions and extend them by iterating the state, so the Kalman filter isn't run per request.
+
+
+# Save side-car of fitted SARIMAX results next to the model artifact
+def save_sarima_snapshot(path, results, train_forecast, test_forecast):
+    ssm = results.model.ssm
+    np.savez(path,
+             train_forecast=np.asarray(train_forecast, dtype=np.float64),
+             test_forecast=np.asarray(test_forecast, dtype=np.float64),
+             design=np.asarray(ssm["design"], dtype=np.float64),
+             transition=np.asarray(ssm["transition"], dtype=np.float64),
+             obs_intercept=np.asarray(ssm["obs_intercept"], dtype=np.float64),
+             state_intercept=np.asarray(ssm["state_intercept"], dtype=np.float64),
+             state=np.asarray(results.predicted_state[:, -1], dtype=np.float64))
+
+
+# Stored sarima predictions with the forecast and predict calls the server uses on SARIMAX results
+class SarimaSnapshot:
+    def __init__(self, path):
+        with np.load(path) as snapshot:
+            self.train_forecast = snapshot["train_forecast"]
+            self.test_forecast = snapshot["test_forecast"]
+            self.design = snapshot["design"]
+            self.transition = snapshot["transition"]
+            self.obs_intercept = snapshot["obs_intercept"]
+            self.state_intercept = snapshot["state_intercept"]
+            self.state = snapshot["state"]
+        # State after the stored forecast horizon, longer forecasts continue from it
+        self.horizon_state = self._advance(self.state, len(self.test_forecast))[1]
+
+    # Iterate the state for the given number of steps, returns the forecasts and the state after them
+    def _advance(self, state, steps):
+        forecasts = np.empty(steps)
+        for i in range(steps):
+            forecasts[i] = (self.design @ state + self.obs_intercept)[0]
+            state = self.transition @ state + self.state_intercept
+        return forecasts, state
+
+    # Forecast the steps after the training data
+    def forecast(self, steps):
+        if steps <= len(self.test_forecast):
+            return self.test_forecast[:steps].copy()
+        extension, _ = self._advance(self.horizon_state, steps - len(self.test_forecast))
+        return np.concatenate((self.test_forecast, extension))
+
+    # Prediction of points start to end inclusive, like SARIMAX points after the training data are forecasted
+    def predict(self, start, end, typ="levels"):
+        if start < 0 or end < start:
+            raise ValueError(f"Can't predict points {start} to {end}")
+        nobs = len(self.train_forecast)
+        if end < nobs:
+            return self.train_forecast[start:end + 1].copy()
+        forecasts = self.forecast(end + 1 - nobs)
+        return np.concatenate((self.train_forecast[start:], forecasts[max(0, start - nobs):]))
+
+    def size_bytes(self):
+        return sum(array.nbytes for array in [self.train_forecast, self.test_forecast, self.design, self.transition,
+                                              self.obs_intercept, self.state_intercept, self.state])
@@ -1,40 +1,56 @@
-from fastapi import Body, FastAPI, UploadFile, File,HTTPException
+from fastapi import Body, FastAPI, UploadFile, File,HTTPException,Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from keras.models import load_model
-import joblib
-import pandas as pd
-import tensorflow as tf
-from functions import preprocess_data
-import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-from constants import TEST_SIZE_SAMPLES_ARIMA,LAG_COUNT
-from pymongo import MongoClient
+from pydantic import BaseModel
+from typing import List, Optional
+from constants import FORECAST_CACHE_MAX_ENTRIES,FORECAST_CACHE_MAX_BYTES,INFERENCE_PROCESSES,INFERENCE_QUEUE_SIZE,INFERENCE_METHOD_LIMITS,INFERENCE_RETRY_AFTER,TEST_FORECAST_STEP_SIZE,MODEL_MEMORY_BUDGET,MODEL_PIN_AFTER_HITS,MODEL_PIN_WINDOW,MODEL_PINNED,MAX_FORECAST_BATCH_SIZE,MIN_DATASET_ROWS,UPDATE_MODELS_ON_UPLOAD,TRAINING_JOBS,TRAINING_PROCESSES,TRAINING_TIME_BUDGET,TRAINING_TIME_LIMIT,TRAINING_NICENESS,PASSWORD_HASHING_WORKERS,PASSWORD_HASHING_QUEUE_SIZE,PASSWORD_HASHING_RETRY_AFTER,PASSWORD_TIME_COST,PASSWORD_MEMORY_COST,PASSWORD_PARALLELISM,PROFILING_ENABLED,PROFILE_DIR
+from cache import ForecastCache, file_content_hash
+from database import collection, files_collection, jobs_collection, ensure_indexes
+from executors import run_io, io_executor
+from inference import InferencePool, PoolSaturated
+from artifacts import METHODS
+from registry import ModelRegistry, model_dependencies
+from jobs import JobQueue
+from hashing import PasswordHashing, HashingSaturated
+from storage import save_upload, build_derived, read_rows, remove_derived
+from metrics import metrics_registry, request_seconds, forecast_stage_seconds
+import cProfile
+import pstats
+import threading
 import os
 import csv
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+import time
 from fastapi.middleware.cors import CORSMiddleware
-tf.compat.v1.logging.set_verbosity(tf.compat.v1.logging.ERROR)
-import argon2
-from argon2.exceptions import VerifyMismatchError
-
-# Connect to mongoDB
-client = MongoClient("mongodb://localhost:27017")
-db = client["forecastDB"]
-collection = db["Users"]
-models = {}
-dataset_names = ['snow_cleaners', 'notebooks', 'cheese']
-
-# Load models before server starts
+
+# Model artifacts available on disk, models themselves are only loaded by the inference workers
+model_registry = ModelRegistry("models")
+# Worker processes running the forecasts
+inference_pool = InferencePool(INFERENCE_PROCESSES, INFERENCE_QUEUE_SIZE, INFERENCE_METHOD_LIMITS, INFERENCE_RETRY_AFTER,
+                               "models", MODEL_MEMORY_BUDGET, MODEL_PIN_AFTER_HITS, MODEL_PINNED, MODEL_PIN_WINDOW)
+# Cache of forecast results
+forecast_cache = ForecastCache(FORECAST_CACHE_MAX_ENTRIES, FORECAST_CACHE_MAX_BYTES)
+# Training and model update jobs, run as subprocesses next to the inference workers
+job_queue = JobQueue(jobs_collection, "models", TRAINING_JOBS, TRAINING_TIME_BUDGET, TRAINING_TIME_LIMIT, TRAINING_NICENESS,
+                     TRAINING_PROCESSES)
+# Password hashing threads, capped so a burst of logins can't take the memory and cores of forecasts
+password_hashing = PasswordHashing(PASSWORD_HASHING_WORKERS, PASSWORD_HASHING_QUEUE_SIZE, PASSWORD_HASHING_RETRY_AFTER,
+                                   PASSWORD_TIME_COST, PASSWORD_MEMORY_COST, PASSWORD_PARALLELISM)
+
+# Find model artifacts and start inference workers before server starts
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Load the models
-    for i in range(len(dataset_names)):
-        models[f"{dataset_names[i]}_sarima"] = joblib.load(f'models/{dataset_names[i]}_sarima.pkl')
-        models[f"{dataset_names[i]}_svr"] = joblib.load(f'models/{dataset_names[i]}_svr.pkl') 
-        models[f"{dataset_names[i]}_lstm"] = load_model(f'models/{dataset_names[i]}_lstm.h5')
-        models[f"{dataset_names[i]}_sarima_svr"] = joblib.load(f'models/{dataset_names[i]}_sarima_svr.pkl') 
+    await ensure_indexes()
+    model_registry.discover()
+    inference_pool.start()
+    await job_queue.recover()
     yield
-    models.clear()  
+    job_queue.shutdown()
+    password_hashing.shutdown()
+    inference_pool.shutdown()
+    io_executor.shutdown()
 
 app = FastAPI(lifespan=lifespan)
 # Allow all cross origin requests
@@ -46,141 +62,229 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Queue depths of the executors, cache events and model loads of the inference workers, read when /metrics is requested
+metrics_registry.callback("executor_pending_tasks", "Tasks running or waiting on an executor", "gauge",
+                          lambda: {("inference",): inference_pool.pending, ("io",): io_executor.pending,
+                                   ("password_hashing",): password_hashing.pending}, ["executor"])
+metrics_registry.callback("forecast_cache_events_total", "Forecast cache lookups and removals", "counter",
+                          lambda: {(event,): forecast_cache.stats()[key] for event, key in
+                                   [("hit", "hits"), ("miss", "misses"), ("eviction", "evictions"),
+                                    ("invalidation", "invalidations")]}, ["event"])
+metrics_registry.callback("forecast_cache_bytes", "Approximate size of the cached forecasts", "gauge",
+                          lambda: {(): forecast_cache.stats()["size_bytes"]})
+
+# Loads of every model summed over the inference workers
+def model_loads():
+    loads = {}
+    for stats in list(inference_pool.worker_stats.values()):
+        for name, model in stats["models"].items():
+            loads[(name,)] = loads.get((name,), 0) + model["loads"]
+    return loads
+
+metrics_registry.callback("model_loads_total", "Model loads by the inference workers", "counter", model_loads, ["model"])
+metrics_registry.callback("model_evictions_total", "Models evicted by the inference workers", "counter",
+                          lambda: {(): sum(stats["evictions"] for stats in list(inference_pool.worker_stats.values()))})
+
+# Request profiling, the PROFILING_ENABLED and PROFILE_DIR environment variables override the configured settings
+profiling_enabled = os.environ.get("PROFILING_ENABLED", str(PROFILING_ENABLED)).lower() in ["1", "true", "yes"]
+profile_dir = os.environ.get("PROFILE_DIR", PROFILE_DIR)
+# Only one request is profiled at a time
+profile_lock = threading.Lock()
+
+# Record latency of every request by route. Requests with the X-Profile header are profiled with cProfile
+# when profiling is enabled, the profile is saved to the profile directory and its path returned in X-Profile-File.
+# The profiler sees the event loop thread, so other requests running at the same time show up in it as well,
+# and work on the inference workers only as the time spent waiting for them.
+@app.middleware("http")
+async def measure_request(request: Request, call_next):
+    profiler = None
+    if profiling_enabled and request.headers.get("X-Profile") and profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profile_lock.release()
+    route = request.scope.get("route")
+    request_seconds.observe(time.perf_counter() - start, path=route.path if route is not None else "unmatched",
+                            method=request.method, status=response.status_code)
+    if profiler is not None:
+        response.headers["X-Profile-File"] = await run_io(save_profile, profiler, request.url.path)
+    return response
+
+# Save profile of a request, read it with pstats or snakeviz
+def save_profile(profiler, path):
+    os.makedirs(profile_dir, exist_ok=True)
+    file_path = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9}"
+                                          f"{path.replace('/', '_')}.prof")
+    profiler.dump_stats(file_path)
+    print(f"Profile of {path} saved to {file_path}, {pstats.Stats(profiler).total_tt:.3f}s")
+    return file_path
+
+# Metrics in the Prometheus text format
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/register")
 async def register_user(user_name: str = Body(..., embed=True), email: str = Body(..., embed=True),password: str = Body(..., embed=True)):
+    # Users are unique by user name and email, checked before the password is hashed
+    if await collection.find_one({"$or": [{"username": user_name}, {"email": email}]}, {"_id": 1}) is not None:
+        raise HTTPException(status_code=400, detail="User with this user name already exists")
     # Hash the password using Argon2
-    hashed_password = argon2.hash_password(password.encode('utf-8'))
+    hashed_password = await hash_password(password)
     document = {
         "username": user_name,
         "email": email,
-        "password": hashed_password.decode('utf-8'),
-        "files": []
+        "password": hashed_password,
     }
-    inserted_document = {}
-    
-    # Save user into database if it doesn't exist
-    if collection.find_one({"$or": [{"user_name": user_name}, {"email": email}]}) is None:
-        result = collection.insert_one(document)
-        inserted_id = result.inserted_id
-        inserted_document = collection.find_one({"_id": inserted_id})
-    else:
+    # Save user into database, the unique indexes catch registrations racing each other
+    try:
+        result = await collection.insert_one(document)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="User with this user name already exists")
+    inserted_document = await collection.find_one({"_id": result.inserted_id})
     parseObjectIDs(inserted_document)
     return inserted_document
 # Parse object id to string
 def parseObjectIDs(document):
     document["_id"] = str(document["_id"])
-    for i in document["files"]:
-        i["_id"] = str(i["_id"])
 # Login user
 @app.post("/login")
 async def login_user(email: str = Body(..., embed=True), password: str = Body(..., embed=True)):
-    # Get user based on email
-    user_document = collection.find_one({"email": email})
+    # Get user based on email, without files of users that weren't migrated yet
+    user_document = await collection.find_one({"email": email}, {"files": 0})
     if user_document is None:
         raise HTTPException(status_code=404, detail="User with provided email not found")
     # Get the password
     hashed_password:str = user_document["password"]
     parseObjectIDs(user_document)
-    try:
-        # Verify password
-        if argon2.verify_password(hashed_password.encode('utf-8'),password.encode('utf-8')):
-            return user_document
-    except VerifyMismatchError:
+    # Verify password
+    valid, new_hash = await verify_password(hashed_password, password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    # Hashes made with older cost parameters are replaced
+    if new_hash is not None:
+        await collection.update_one({"_id": ObjectId(user_document["_id"])}, {"$set": {"password": new_hash}})
+    return user_document
+
+# Hash and verify passwords on the hashing threads, rejecting them when too many are waiting
+async def hash_password(password):
+    try:
+        return await password_hashing.hash(password)
+    except HashingSaturated as error:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later",
+                            headers={"Retry-After": str(error.retry_after)})
+
+async def verify_password(hashed_password, password):
+    try:
+        return await password_hashing.verify(hashed_password, password)
+    except HashingSaturated as error:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later",
+                            headers={"Retry-After": str(error.retry_after)})
 
-def remove_empty_lines(content):
-    # Split the content into lines, remove empty lines, and join them back
-    lines = content.splitlines()
-    cleaned_lines = [line for line in lines if line.strip()]
-    return cleaned_lines
 # File upload
 @app.post("/file/upload")
 async def upload_file(file: UploadFile = File(...), user_id: str = Body(..., embed=True)):
     if not ObjectId.is_valid(user_id):
         raise HTTPException(status_code=400, detail="Invalid Object ID format")
+    if await collection.find_one({"_id": ObjectId(user_id)}, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="User not found")
 
     user_dir = f"uploads/{user_id}"
-    if not os.path.exists(user_dir):
-        os.makedirs(user_dir)
+    await run_io(os.makedirs, user_dir, exist_ok=True)
 
     file_name = os.path.basename(file.filename)
     file_path = f"uploads/{user_id}/{file_name}"
 
-    # Read the entire file content
-    content = await file.read()
-    content_str = content.decode("utf-8")
-
-    # Remove empty lines
-    cleaned_content = remove_empty_lines(content_str)
-    if len(cleaned_content) < 36:
-        raise HTTPException(status_code=400, detail="Dataset has to be more than 36 rows")
-    # Save the file
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(cleaned_content))
-
-    new_file_id = ObjectId()  
-
-    # Create new file to be added
-    new_file = {"_id": new_file_id, "name": file_name, "path": file_path}
-    # Add the file to user file array
-    result =  collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$push": {"files": new_file}}
-    )
-
-    if result.matched_count == 0:
-        raise HTTPException(status_code=404, detail="User not found")
-    # Parse object id to string
-    new_file["_id"] = str(new_file["_id"])
-    return new_file
+    # Stream the file to disk without empty lines, it only replaces the saved file if it is long enough
+    try:
+        rows = await run_io(save_upload, file.file, file_path, MIN_DATASET_ROWS)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File has to be UTF-8 encoded")
+    if rows < MIN_DATASET_ROWS:
+        raise HTTPException(status_code=400, detail=f"Dataset has to be more than {MIN_DATASET_ROWS} rows")
+    # Index row offsets so pages of the file can be read without rescanning it, and convert the
+    # numeric columns once into the binary store forecasts read from
+    await run_io(build_derived, file_path)
+    # Drop forecasts cached for the previous content of the file
+    forecast_cache.invalidate(file_path)
+    # A newer version of a dataset the user trained models on updates them, forecasts use the new versions once
+    # they are saved. The shared models of the bundled datasets are never updated from uploads.
+    if UPDATE_MODELS_ON_UPLOAD:
+        prefix = model_prefixes(user_id, file_name)[0]
+        if any(model_registry.version(prefix + "_" + method) is not None for method in METHODS):
+            await job_queue.submit("update", prefix, file_path, user_id=user_id)
+
+    # Save metadata of the file, a file uploaded again under the same name keeps its id
+    file_document = await files_collection.find_one_and_update(
+        {"user_id": ObjectId(user_id), "name": file_name},
+        {"$set": {"path": file_path, "uploaded": time.time()}, "$setOnInsert": {"_id": ObjectId()}},
+        upsert=True, return_document=ReturnDocument.AFTER)
+    return {"_id": str(file_document["_id"]), "name": file_name, "path": file_path}
+
+# Get name of a user's file, None if the user has no such file
+async def find_file_name(user_id: str, file_id: str):
+    file_document = await files_collection.find_one({"_id": ObjectId(file_id), "user_id": ObjectId(user_id)},
+                                                    {"name": 1})
+    return None if file_document is None else file_document["name"]
+
 # Delete file based on id
 @app.delete("/file/")
 async def delete_file(user_id:str = Body(..., embed=True),file_id:str = Body(..., embed=True)):
     try:
         if not ObjectId.is_valid(file_id) or not ObjectId.is_valid(user_id):
             raise HTTPException(status_code=400, detail="Invalid Object ID format")
-        # Get user document
-        user_document =  collection.find_one(
-        {"_id": ObjectId(user_id), "files._id": ObjectId(file_id)},
-        {"_id": 0, "files.$": 1}
-        )
-        if not user_document or "files" not in user_document or not user_document["files"]:
-            raise HTTPException(status_code=404, detail="File not found")
         # Get file name of the file to be deleted
-        file_name = user_document["files"][0]["name"]
+        file_name = await find_file_name(user_id, file_id)
+        if file_name is None:
+            raise HTTPException(status_code=404, detail="File not found")
         # Delete file from server file system
-        os.remove(f"uploads/{user_id}/{file_name}")
-        # Remove file from user file array
-        result = collection.update_one(
-        {"_id": ObjectId(user_id)},
-        {"$pull": {"files": {"_id": ObjectId(file_id)}}}
-        )
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="User not found")
-        if result.modified_count == 0:
+        await run_io(os.remove, f"uploads/{user_id}/{file_name}")
+        await run_io(remove_derived, f"uploads/{user_id}/{file_name}")
+        # Drop cached forecasts of the file
+        forecast_cache.invalidate(f"uploads/{user_id}/{file_name}")
+        # Remove file metadata
+        result = await files_collection.delete_one({"_id": ObjectId(file_id), "user_id": ObjectId(user_id)})
+        if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="File not found in user's files")
     except FileNotFoundError:
         return {"error": "File not found"}
     
 # Get file data based on id
 @app.post("/file/data")
-async def get_file_data(file_id:str = Body(..., embed=True),user_id:str = Body(..., embed=True)):
+async def get_file_data(file_id:str = Body(..., embed=True),user_id:str = Body(..., embed=True),
+                        offset: Optional[int] = Body(None, embed=True), limit: Optional[int] = Body(None, embed=True),
+                        shape: str = Body("rows", embed=True)):
     if not ObjectId.is_valid(file_id) or not ObjectId.is_valid(user_id):
         raise HTTPException(status_code=400, detail="Invalid Object ID format")
-    # Get user document
-    user_document = collection.find_one(
-    {"_id": ObjectId(user_id), "files._id": ObjectId(file_id)},
-    {"_id": 0, "files.$": 1}
-    )
-    if not user_document or "files" not in user_document or not user_document["files"]:
-        raise HTTPException(status_code=404, detail="File not found")
-    # Get file name from user document
-    file_name = user_document["files"][0]["name"]
+    if shape not in ["rows", "columns"]:
+        raise HTTPException(status_code=400, detail="Shape has to be 'rows' or 'columns'")
+    if (offset is not None and offset < 0) or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="Offset and limit can't be negative")
+    # Get file name
+    file_name = await find_file_name(user_id, file_id)
     if file_name is None:
-        return {"error": "File not found in database","columns": [],"rows":[]}
+        raise HTTPException(status_code=404, detail="File not found")
+    file_path = f"uploads/{user_id}/{file_name}"
+    # Read a page of rows, or the whole file in columns
+    if offset is not None or limit is not None or shape == "columns":
+        page = await run_io(read_rows, file_path, offset or 0, limit)
+        if page is None:
+            return {"error": "File not found in server filesystem","columns": [],"rows":[]}
+        headers, rows, total = page
+        result = {"columns": headers, "offset": offset or 0, "limit": limit, "total": total}
+        if shape == "columns":
+            # One array per column instead of one object per row, header names aren't repeated
+            result["values"] = [[row[i] if i < len(row) else None for row in rows] for i in range(len(headers))]
+        else:
+            result["rows"] = [dict(zip(headers, row)) for row in rows]
+        return result
     # Read the file and format content as CSV
-    file_data = parse_csv(f"uploads/{user_id}/{file_name}")
+    file_data = await run_io(parse_csv, file_path)
     if file_data is None:
         return {"error": "File not found in server filesystem","columns": [],"rows":[]}
     # Get headers
@@ -203,22 +307,18 @@ def parse_csv(file_path: str):
     
 # Get all files
 @app.post("/file/")
-async def get_file_names(user_id: str = Body(..., embed=True)):
-    try:
-        if not ObjectId.is_valid(user_id):
-            raise HTTPException(status_code=400, detail="Invalid Object ID format")
-        # Get user document
-        user_document = collection.find_one({"_id": ObjectId(user_id)}, {"files": 1})
-        if user_document is None:
-            raise HTTPException(status_code=404, detail="User not found")
-        parseObjectIDs(user_document)
-        # Get user files
-        result = user_document.get('files')
-        return result
-    except FileNotFoundError:
-        return {"error": "File not found"}
-# Validation forecast size
-TEST_FORECAST_STEP_SIZE = 12
+async def get_file_names(user_id: str = Body(..., embed=True), offset: int = Body(0, embed=True),
+                         limit: Optional[int] = Body(None, embed=True)):
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid Object ID format")
+    if offset < 0 or (limit is not None and limit < 0):
+        raise HTTPException(status_code=400, detail="Offset and limit can't be negative")
+    # Page of the user's files in upload order, only ids and names are read
+    files = await files_collection.find({"user_id": ObjectId(user_id)}, {"name": 1}, sort=[("_id", 1)],
+                                        skip=offset, limit=limit or 0)
+    if not files and await collection.find_one({"_id": ObjectId(user_id)}, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return [{"_id": str(file["_id"]), "name": file["name"]} for file in files]
 # Forecast based on model type passed
 @app.post("/forecast")
 async def forecast(method_name: str = Body(..., embed=True),user_id: str = Body(..., embed=True),file_id: str = Body(..., embed=True), steps: int = Body(TEST_FORECAST_STEP_SIZE, embed=True)):
@@ -227,142 +327,166 @@ async def forecast(method_name: str = Body(..., embed=True),user_id: str = Body(
         steps = TEST_FORECAST_STEP_SIZE
     if not ObjectId.is_valid(file_id) or not ObjectId.is_valid(user_id):
         return {"error": "Invalid Object ID format"}
-    # Get user document
-    user_document =  collection.find_one(
-    {"_id": ObjectId(user_id), "files._id": ObjectId(file_id)},
-    {"_id": 0, "files.$": 1}
-    )
+    # Stage latencies are labelled by method, unknown methods share one label
+    label = method_name if method_name in METHODS else "other"
     # Get file name
-    file_name = user_document["files"][0]["name"]
+    with forecast_stage_seconds.time(stage="lookup", method_name=label):
+        file_name = await find_file_name(user_id, file_id)
     if file_name is None:
         return {"error": "File not found in database","columns": [],"rows":[]}
-    forecast = []
+    with forecast_stage_seconds.time(stage="prepare", method_name=label):
+        request = await prepare_forecast(user_id, file_name, method_name, steps)
+    if request is None:
+        return []
+    model_name, file_path, cache_key = request
+    # Return cached forecast if the same file was already forecasted with the same model
+    cached_forecast = forecast_cache.get(cache_key)
+    if cached_forecast is not None:
+        return encode_forecast(cached_forecast, label)
+    # Model work runs on the inference worker processes so other requests are not blocked,
+    # the stages on the workers are recorded by the pool
+    try:
+        with forecast_stage_seconds.time(stage="inference", method_name=label):
+            forecast = await inference_pool.forecast(model_name, method_name, file_path, steps)
+    except PoolSaturated as error:
+        raise HTTPException(status_code=503, detail="Server is busy, try again later",
+                            headers={"Retry-After": str(error.retry_after)})
+    # Only successful forecasts are cached
+    if isinstance(forecast, list):
+        forecast_cache.put(cache_key, forecast, file_path)
+    return encode_forecast(forecast, label)
+
+# Encode forecast response, timed as its own stage
+def encode_forecast(forecast, label):
+    with forecast_stage_seconds.time(stage="encode", method_name=label):
+        return JSONResponse(forecast)
+
+# Models trained for a user are named after the user and the file, the built-in models after the dataset only
+def model_prefixes(user_id: str, file_name: str):
+    dataset_name = os.path.basename(file_name).split('.')[0]
+    return [user_id + "_" + dataset_name, dataset_name]
+
+# Prefix of the models forecasts of the file use, the user's own models first, None if there are none
+def model_prefix(user_id: str, file_name: str, method_name: str = None):
+    methods = METHODS if method_name is None else [method_name]
+    for prefix in model_prefixes(user_id, file_name):
+        if any(model_registry.version(prefix + "_" + method) is not None for method in methods):
+            return prefix
+    return None
+
+# Get model name, file path and cache key of a forecast, None if there is no model for it
+async def prepare_forecast(user_id: str, file_name: str, method_name: str, steps: int):
     # Get the model
-    model = models.get(os.path.basename(file_name).split('.')[0]+"_"+method_name)
-    # Read the file
-    df = pd.read_csv(f"uploads/{user_id}/{file_name}")
-    # Get only number column and flatten the array
-    df = np.array(df[df.select_dtypes(include=[np.number]).columns]).flatten()
+    prefix = model_prefix(user_id, file_name, method_name)
+    if prefix is None:
+        return None
+    model_name = prefix + "_" + method_name
+    # Forecasts change when the model or any model it is stacked on changes
+    versions = [model_registry.version(name) for name in model_dependencies(model_name)]
+    if versions[0] is None:
+        return None
+    version = "+".join(str(version) for version in versions)
+    file_path = f"uploads/{user_id}/{file_name}"
+    content_hash = await run_io(file_content_hash, file_path)
+    return model_name, file_path, ForecastCache.make_key(content_hash, method_name, steps, version)
 
-    if model is None:
-        return []
-    # Svr model
-    if method_name.endswith("svr"):
-        # Scale the data into [0,1] interval
-        scaler = MinMaxScaler()
-        df = scaler.fit_transform(df.reshape(-1, 1))
-        # Get feature and target arrays from data
-        X, _ = preprocess_data(df)
-        # Extrapolation forecast
-        if steps != TEST_FORECAST_STEP_SIZE:
-            forecasts = []
-            # Forecast using last feature array 
-            forecast = model.predict(X[-1:])
-            # Remove first 12 values and append 12 forecasted values
-            X = np.append(X[-1:][:, 12:], forecast.reshape(-1,12), axis=1)
-            # Save forecasts, rescaled back
-            forecasts.append(scaler.inverse_transform(forecast.reshape(-1, 1)).flatten())
-            # Perform rolling forecasting until required forecast steps are reached
-            for _ in range(steps//12 + 1):
-                next_forecast = model.predict(X)
-                # Save forecasts, rescaled back
-                forecasts.append(scaler.inverse_transform(next_forecast.reshape(-1, 1)).flatten())
-                # Remove first 12 values and append 12 forecasted values
-                X = np.append(X[-1:][:, 12:], next_forecast.reshape(-1,12), axis=1)
-            forecast = np.array(forecasts).flatten()[:steps]
-        # Validation forecast
-        else:
-            # Test set forecast
-            forecast = model.predict(X)
-            # Rescale back
-            forecast = scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()[-steps:]
-            # Return the difference between real values and forecasts
-            forecast = np.subtract(forecast.flatten(), df[-steps:].flatten())
-    # Sarima svr
-    elif method_name.endswith("sarima_svr"):
-        scaler = MinMaxScaler()
-        train = df[:-
-                       TEST_SIZE_SAMPLES_ARIMA]
-        test_forecast = model.forecast(steps=TEST_SIZE_SAMPLES_ARIMA)
-        train_index = np.arange(len(train))
-        train_forecast = model.predict(start=train_index[0],
-                                           end=train_index[-1],
-                                           typ='levels')
-        # Extrapolation forecast
-        if steps != TEST_FORECAST_STEP_SIZE:
-            arima_forecasts = np.concatenate((train_forecast[-LAG_COUNT:],test_forecast))
-            # Scale the data into [0,1] interval
-            arima_forecasts = scaler.fit_transform(arima_forecasts.reshape(-1, 1))
-            # Get feature and target arrays from data
-            X, _ = preprocess_data(arima_forecasts)
-            forecast = model.predict(X)
-            forecast = scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()
-        # Validation forecast
-        else:
-            arima_forecasts = np.concatenate((train_forecast,test_forecast))
-            # Scale the data into [0,1] interval
-            arima_forecasts = scaler.fit_transform(arima_forecasts.reshape(-1, 1))
-            # Get feature and target arrays from data
-            X, _ = preprocess_data(arima_forecasts)
-            # Test set forecast
-            forecast = model.predict(X)
-            # Rescale back
-            forecast = scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()[-steps:]
-            # Return the difference between real values and forecasts
-            forecast = np.subtract(forecast.flatten(), df[-steps:].flatten())
-    # Sarima
-    elif method_name.endswith("sarima"):
-        # Create train set
-        train= df[:-
-                       TEST_SIZE_SAMPLES_ARIMA]
-        # Extrapolation forecast
-        if steps != TEST_FORECAST_STEP_SIZE:
-            forecast = model.forecast(steps=steps)
-        # Validation forecast
-        else:
-            test_forecast = model.forecast(steps=TEST_SIZE_SAMPLES_ARIMA)
-            train_index = np.arange(len(train))
-            train_forecast = model.predict(start=train_index[0],
-                                            end=train_index[-1],
-                                            typ='levels')
-            # Rescale back
-            forecast = np.concatenate((train_forecast,test_forecast)).flatten()[-steps:]
-            # Return the difference between real values and forecasts
-            forecast = np.subtract(forecast.flatten(), df[-steps:].flatten())
-    # Lstm
-    elif method_name.endswith("lstm"):
-        # Scale the data into [-1,1] interval
-        scaler = MinMaxScaler(feature_range=(-1, 1))
-        df = scaler.fit_transform(df.reshape(-1, 1))
-        # Get feature and target arrays from data
-        X, _ = preprocess_data(df)
-        # Reshape feature array into correct form
-        X = X.reshape(
-            X.shape[0], X.shape[1], 1)
-        # Extrapolation forecast
-        if steps != TEST_FORECAST_STEP_SIZE:
-            forecasts = []
-            # Forecast using last feature array 
-            forecast = model.predict(X[-1:], verbose=0) 
-            # Remove first 12 values and append 12 forecasted values
-            X = np.append(X[-1:][:, 12:, :], forecast.reshape(1,12,1), axis=1)
-            # Save forecasts, rescaled back
-            forecasts.append(scaler.inverse_transform(forecast.reshape(-1, 1)).flatten())
-            for _ in range(steps//12 + 1):
-                next_forecast = model.predict(X, verbose=0)  
-                # Save forecasts, rescaled back
-                forecasts.append(scaler.inverse_transform(next_forecast.reshape(-1, 1)).flatten())
-                # Remove first 12 values and append 12 forecasted values
-                X = np.append(X[-1:][:, 12:, :], forecast.reshape(1,12,1), axis=1)
-            forecast = np.array(forecasts).flatten()[:steps]
-        # Validation forecast
-        else:
-            # Test set forecast
-            forecast = model.predict(X, verbose=0)
-            # Rescale back
-            forecast = scaler.inverse_transform(forecast).flatten()[-steps:]
-            # Return the difference between real values and forecasts
-            forecast = np.subtract(forecast.flatten(), df[-steps:].flatten())
-    else:
-        return {"error": "Invalid model name"}
-    return forecast.tolist()
+# Single forecast of a batch
+class ForecastRequest(BaseModel):
+    file_id: str
+    method_name: str
+    steps: Optional[int] = TEST_FORECAST_STEP_SIZE
+
+# Forecast several files and methods at once, results are returned in the order of the requests
+@app.post("/forecast/batch")
+async def forecast_batch(user_id: str = Body(..., embed=True), forecasts: List[ForecastRequest] = Body(..., embed=True)):
+    if not ObjectId.is_valid(user_id) or not all(ObjectId.is_valid(request.file_id) for request in forecasts):
+        return {"error": "Invalid Object ID format"}
+    if len(forecasts) > MAX_FORECAST_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch can have at most {MAX_FORECAST_BATCH_SIZE} forecasts")
+    # Get names of the requested files with one query
+    file_ids = list({ObjectId(request.file_id) for request in forecasts})
+    files = await files_collection.find({"user_id": ObjectId(user_id), "_id": {"$in": file_ids}}, {"name": 1})
+    if not files and await collection.find_one({"_id": ObjectId(user_id)}, {"_id": 1}) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    file_names = {str(file["_id"]): file["name"] for file in files}
+
+    results = [None] * len(forecasts)
+    # Forecasts that aren't cached, computed by one inference task
+    missing = []
+    for index, request in enumerate(forecasts):
+        # Set steps if it was not passed as a request parameter
+        steps = TEST_FORECAST_STEP_SIZE if request.steps is None else request.steps
+        file_name = file_names.get(request.file_id)
+        if file_name is None:
+            results[index] = {"error": "File not found in database"}
+            continue
+        prepared = await prepare_forecast(user_id, file_name, request.method_name, steps)
+        if prepared is None:
+            results[index] = []
+            continue
+        model_name, file_path, cache_key = prepared
+        cached_forecast = forecast_cache.get(cache_key)
+        if cached_forecast is not None:
+            results[index] = cached_forecast
+            continue
+        missing.append((index, cache_key, (model_name, request.method_name, file_path, steps)))
+    if missing:
+        try:
+            computed = await inference_pool.forecast_batch([request for _, _, request in missing])
+        except PoolSaturated as error:
+            raise HTTPException(status_code=503, detail="Server is busy, try again later",
+                                headers={"Retry-After": str(error.retry_after)})
+        for (index, cache_key, request), forecast in zip(missing, computed):
+            results[index] = forecast
+            # Only successful forecasts are cached
+            if isinstance(forecast, list):
+                forecast_cache.put(cache_key, forecast, request[2])
+    return results
+
+# Get forecast cache counters
+@app.get("/forecast/cache")
+async def get_forecast_cache_stats():
+    return forecast_cache.stats()
+
+# Get available models and the models loaded by each inference worker
+@app.get("/models")
+async def get_models():
+    return {"available": {name: model_registry.version(name) for name in model_registry.available()},
+            "workers": inference_pool.worker_stats}
+
+# Job record with the object id as string
+def job_response(job):
+    return {**job, "_id": str(job["_id"])}
+
+# Queue training of the models of an uploaded file, forecasts of the file use them once the job is done
+@app.post("/train")
+async def train_models(user_id: str = Body(..., embed=True), file_id: str = Body(..., embed=True),
+                       methods: Optional[List[str]] = Body(None, embed=True)):
+    if not ObjectId.is_valid(file_id) or not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid Object ID format")
+    if methods is not None and (not methods or not set(methods) <= set(METHODS)):
+        raise HTTPException(status_code=400, detail=f"Methods have to be some of {METHODS}")
+    file_name = await find_file_name(user_id, file_id)
+    if file_name is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    job = await job_queue.submit("train", model_prefixes(user_id, file_name)[0], f"uploads/{user_id}/{file_name}",
+                                 user_id=user_id, file_id=file_id, methods=methods)
+    return job_response(job)
+
+# Get state and progress of a training or model update job
+@app.get("/train/{job_id}")
+async def get_training_job(job_id: str):
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="Invalid Object ID format")
+    job = await jobs_collection.find_one({"_id": ObjectId(job_id)})
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_response(job)
+
+# Get the jobs of a user, newest first
+@app.post("/train/jobs")
+async def get_training_jobs(user_id: str = Body(..., embed=True)):
+    if not ObjectId.is_valid(user_id):
+        raise HTTPException(status_code=400, detail="Invalid Object ID format")
+    jobs = await jobs_collection.find({"user_id": user_id}, sort=[("created", -1)])
+    return [job_response(job) for job in jobs]
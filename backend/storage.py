@@ -0,0 +1,237 @@
+import codecs
+import csv
+import io
+import json
+import os
+import tempfile
+import warnings
+import numpy as np
+from constants import UPLOAD_CHUNK_SIZE
+
+# Directory next to the uploaded files holding data derived from them
+CACHE_DIR = ".cache"
+
+
+# Read binary stream chunk by chunk
+def read_chunks(source, chunk_size=UPLOAD_CHUNK_SIZE):
+    return iter(lambda: source.read(chunk_size), b"")
+
+
+# Characters str.splitlines breaks lines at
+LINE_BOUNDARIES = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+# Non-empty lines of a stream of utf-8 encoded chunks without their line endings, one list per chunk.
+# Raises UnicodeDecodeError when the content isn't valid utf-8.
+def clean_lines(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        lines = text.splitlines()
+        # Last line continues in the next chunk if it has no line ending yet
+        pending = lines.pop() if text and text[-1] not in LINE_BOUNDARIES else ""
+        yield [line for line in lines if line.strip()]
+    yield [line for line in (pending + decoder.decode(b"", final=True)).splitlines() if line.strip()]
+
+
+# Stream upload into file_path with empty lines removed, holding one chunk in memory at a time.
+# Content goes into a temporary file next to the target that replaces it only when the upload has at
+# least min_rows rows, so a failed upload leaves the previous file as it was. Returns the number of rows.
+def save_upload(source, file_path, min_rows, chunk_size=UPLOAD_CHUNK_SIZE):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".", prefix=".upload-", suffix=".tmp")
+    rows = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            for lines in clean_lines(read_chunks(source, chunk_size)):
+                if not lines:
+                    continue
+                # Lines are joined with "\n", without a line ending after the last one
+                f.write(("" if rows == 0 else "\n") + "\n".join(lines))
+                rows += len(lines)
+        if rows >= min_rows:
+            os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return rows
+
+
+# Path of a file derived from an uploaded file, kept in the cache directory of its upload directory
+def derived_path(file_path, suffix):
+    directory, file_name = os.path.split(file_path)
+    return os.path.join(directory, CACHE_DIR, file_name + suffix)
+
+
+def row_index_path(file_path):
+    return derived_path(file_path, ".rows.npy")
+
+
+def values_path(file_path):
+    return derived_path(file_path, ".values.npy")
+
+
+def dates_path(file_path):
+    return derived_path(file_path, ".dates.npy")
+
+
+def meta_path(file_path):
+    return derived_path(file_path, ".meta.json")
+
+
+# Derived file is up to date if it was written after the uploaded file
+def is_fresh(path, file_path):
+    try:
+        return os.stat(path).st_mtime_ns >= os.stat(file_path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+# Write file under a temporary name and move it into place, so readers never load a partial file
+def write_atomic(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".derived-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def save_array(path, array):
+    write_atomic(path, lambda f: np.save(f, array))
+
+
+# Byte offsets the csv records of the file end at. A record ends with the line where csv.reader finishes it,
+# so quoted fields may span lines.
+def _record_ends(file_path):
+    position = 0
+
+    def lines():
+        nonlocal position
+        with open(file_path, "rb") as f:
+            for line in f:
+                position += len(line)
+                yield line.decode("utf-8")
+    return [position for _ in csv.reader(lines())]
+
+
+# Build index of the byte offset every row of the file starts at, followed by the file size.
+# Uploads are saved with "\n" line endings, files without quotes have one row per line and are indexed by
+# their line endings, other files by their csv records.
+def build_row_index(file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    starts = [np.zeros(1, dtype=np.int64)]
+    position = 0
+    quoted = False
+    with open(file_path, "rb") as f:
+        for chunk in read_chunks(f, chunk_size):
+            if b'"' in chunk:
+                quoted = True
+                break
+            newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == ord("\n"))
+            starts.append(newlines.astype(np.int64) + position + 1)
+            position += len(chunk)
+    if quoted:
+        offsets = np.array([0] + _record_ends(file_path), dtype=np.int64)
+    else:
+        offsets = np.concatenate(starts)
+        # A line ending at the end of the file doesn't start another line
+        offsets = np.append(offsets[offsets < position], position)
+    save_array(row_index_path(file_path), offsets)
+    return offsets
+
+
+# Row index of the file, rebuilt when it is missing or older than the file
+def load_row_index(file_path):
+    index_path = row_index_path(file_path)
+    if is_fresh(index_path, file_path):
+        return np.load(index_path, mmap_mode="r")
+    return build_row_index(file_path)
+
+
+# Read header and limit rows starting at row offset of a csv file, seeking straight to them with the row
+# index. Returns (header, rows, total number of rows), None if the file doesn't exist.
+def read_rows(file_path, offset=0, limit=None):
+    try:
+        offsets = load_row_index(file_path)
+        if len(offsets) < 2:
+            return [], [], 0
+        total = len(offsets) - 2
+        start = min(offset, total)
+        end = total if limit is None else min(start + limit, total)
+        with open(file_path, "rb") as f:
+            header = f.read(int(offsets[1])).decode("utf-8")
+            f.seek(int(offsets[1 + start]))
+            content = f.read(int(offsets[1 + end] - offsets[1 + start])).decode("utf-8")
+    except FileNotFoundError:
+        return None
+    # Rows are parsed from the text with its line endings, quoted fields may contain them
+    header = next(csv.reader(io.StringIO(header)), [])
+    return header, list(csv.reader(io.StringIO(content))), total
+
+
+# Convert csv file once into a typed binary store: its numeric columns as one (rows, columns) array,
+# the first column that parses as dates as datetime64 values, and the column names. Returns the values.
+def build_series_store(file_path):
+    import pandas as pd
+    df = pd.read_csv(file_path)
+    numeric_columns = list(df.select_dtypes(include=[np.number]).columns)
+    values = np.ascontiguousarray(np.array(df[numeric_columns]))
+    date_column = None
+    for column in df.columns:
+        if column in numeric_columns:
+            continue
+        try:
+            # Columns without a single date format are parsed value by value, which pandas warns about
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                dates = pd.to_datetime(df[column])
+        except (ValueError, TypeError, OverflowError):
+            continue
+        date_column = column
+        save_array(dates_path(file_path), dates.to_numpy(dtype="datetime64[ns]"))
+        break
+    meta = {"columns": list(df.columns), "numeric_columns": numeric_columns, "date_column": date_column,
+            "rows": len(df), "dtype": str(values.dtype)}
+    write_atomic(meta_path(file_path), lambda f: f.write(json.dumps(meta).encode("utf-8")))
+    # Values are written last, they mark the store as complete
+    save_array(values_path(file_path), values)
+    return values
+
+
+# Numeric columns of the csv file as a memory mapped (rows, columns) array, converting the file if the
+# store is missing or older than the file
+def load_series_values(file_path):
+    path = values_path(file_path)
+    if is_fresh(path, file_path):
+        return np.load(path, mmap_mode="r")
+    return build_series_store(file_path)
+
+
+# Dates of the csv file as a memory mapped array, None if it has no date column
+def load_series_dates(file_path):
+    if not is_fresh(values_path(file_path), file_path):
+        build_series_store(file_path)
+    path = dates_path(file_path)
+    if not is_fresh(path, file_path):
+        return None
+    return np.load(path, mmap_mode="r")
+
+
+# Build row index and binary store of an uploaded file
+def build_derived(file_path):
+    build_row_index(file_path)
+    # Files that can't be converted are still saved, forecasting them fails like before
+    try:
+        build_series_store(file_path)
+    except Exception as error:
+        print(f"Failed to convert '{file_path}': {error!r}")
+
+
+# Remove files derived from an uploaded file
+def remove_derived(file_path):
+    for path in [row_index_path(file_path), values_path(file_path), dates_path(file_path), meta_path(file_path)]:
+        if os.path.exists(path):
+            os.remove(path)
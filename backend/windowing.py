@@ -0,0 +1,47 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Lag window construction shared by the server and the training pipeline in create_models.
+# Windows are strided views into the series, no data is copied.
+
+
+# Series as a (length, channels) array
+def _as_channels(data):
+    series = np.asarray(data)
+    if series.ndim == 1:
+        return series[:, np.newaxis]
+    return series.reshape(len(series), int(np.prod(series.shape[1:])))
+
+
+# Create lagged feature array X and target array Y.
+# Windows start at start_index and every sliding_window_size points after it, each holding lag_count
+# features followed by forecasting_period targets. Windows without a full target are left out.
+# For single channel data X has shape (windows, lag_count), for multi-channel data (windows, lag_count, channels)
+# where the first channel is the target series and the others are exogenous features.
+def make_windows(data, lag_count, forecasting_period, sliding_window_size, start_index=0):
+    series = _as_channels(data)
+    channels = series.shape[1]
+    width = lag_count + forecasting_period
+    if len(series) - start_index < width:
+        X = np.empty((0, lag_count) if channels == 1 else (0, lag_count, channels), dtype=series.dtype)
+        return X, np.empty((0, forecasting_period), dtype=series.dtype)
+    # Shape (windows, channels, width)
+    windows = sliding_window_view(series[start_index:], width, axis=0)[::sliding_window_size]
+    Y = windows[:, 0, lag_count:]
+    if channels == 1:
+        X = windows[:, 0, :lag_count]
+    else:
+        X = windows[:, :, :lag_count].transpose(0, 2, 1)
+    return X, Y
+
+
+# Create lagged feature array only, for every window start before the last lag_count points
+def lag_matrix(data, lag_count, sliding_window_size, start_index=0):
+    series = _as_channels(data)
+    channels = series.shape[1]
+    if len(series) - start_index <= lag_count:
+        return np.empty((0, lag_count) if channels == 1 else (0, lag_count, channels), dtype=series.dtype)
+    windows = sliding_window_view(series[start_index:len(series) - 1], lag_count, axis=0)[::sliding_window_size]
+    if channels == 1:
+        return windows[:, 0, :]
+    return windows.transpose(0, 2, 1)
@@ -6,9 +6,13 @@ import { DataTable } from "./DataTable";
 import { LineChart } from "./LineChart";
 import {
   Column,
+  ColumnarData,
   Data,
   ForecastData,
+  ForecastErrors,
+  ForecastResult,
   MethodCheckboxes,
+  Row,
   User,
   UserContextType,
   UserFile,
@@ -64,6 +68,10 @@ function App() {
     sarima_svr: [],
     svr: [],
   });
+  // States for errors of the methods without validation and extrapolation forecasts
+  const [validationForecastErrors, setValidationForecastErrors] =
+    useState<ForecastErrors>({});
+  const [forecastErrors, setForecastErrors] = useState<ForecastErrors>({});
   // States for column selection and errors
   const [dateColumn, setDateColumn] = useState<string>("");
   const [targetColumn, setTargetColumn] = useState<string>("");
@@ -118,6 +126,8 @@ function App() {
       sarima_svr: [],
       svr: [],
     });
+    setValidationForecastErrors({});
+    setForecastErrors({});
   };
 
   // Get file names and data from remote server
@@ -242,53 +252,40 @@ function App() {
   // Get all forecasts
   const getForecasts = async (steps: number | null = null) => {
     try {
-      var svr = await fetchData(
-        process.env.REACT_APP_REMOTE_SERVER_URL + `/forecast`,
+      // Get forecasts of all methods with one request
+      const methods = ["svr", "lstm", "sarima", "sarima_svr"];
+      const { data, statusCode } = await fetchData(
+        process.env.REACT_APP_REMOTE_SERVER_URL + `/forecast/batch`,
         "POST",
         {
           user_id: user?._id,
-          file_id: currentActiveFile?._id,
-          method_name: "svr",
-          steps: steps,
-        }
-      );
-      var lstm = await fetchData(
-        process.env.REACT_APP_REMOTE_SERVER_URL + `/forecast`,
-        "POST",
-        {
-          user_id: user?._id,
-          file_id: currentActiveFile?._id,
-          method_name: "lstm",
-          steps: steps,
-        }
-      );
-      var sarima = await fetchData(
-        process.env.REACT_APP_REMOTE_SERVER_URL + `/forecast`,
-        "POST",
-        {
-          user_id: user?._id,
-          file_id: currentActiveFile?._id,
-          method_name: "sarima",
-          steps: steps,
-        }
-      );
-      var sarima_svr = await fetchData(
-        process.env.REACT_APP_REMOTE_SERVER_URL + `/forecast`,
-        "POST",
-        {
-          user_id: user?._id,
-          file_id: currentActiveFile?._id,
-          method_name: "sarima_svr",
-          steps: steps,
+          forecasts: methods.map((method) => ({
+            file_id: currentActiveFile?._id,
+            method_name: method,
+            steps: steps,
+          })),
         }
       );
+      const results = data as ForecastResult[];
       if (
-        lstm.statusCode === 200 &&
-        svr.statusCode === 200 &&
-        sarima.statusCode === 200 &&
-        sarima_svr.statusCode === 200
+        statusCode === 200 &&
+        Array.isArray(results)
       ) {
+        // Entries without a forecast are drawn empty and their error is shown instead
+        const errors: ForecastErrors = {};
+        const [svr, lstm, sarima, sarima_svr] = methods.map((method, index) => {
+          const result = results[index];
+          if (Array.isArray(result) && result.length > 0) {
+            return { data: result };
+          }
+          errors[method] =
+            result && !Array.isArray(result) && result.error
+              ? result.error
+              : "No model for this file";
+          return { data: [] };
+        });
         if (steps === null) {
+          setValidationForecastErrors(errors);
           setValidationForecasts({
             ...validationForecasts,
             lstm: lstm.data as number[],
@@ -304,6 +301,7 @@ function App() {
             sarima_svr: sarima_svr.data as number[],
           });
         } else {
+          setForecastErrors(errors);
           setForecasts({
             ...forecasts,
             lstm: lstm.data as number[],
@@ -334,19 +332,28 @@ function App() {
       var { data } = await fetchData(
         process.env.REACT_APP_REMOTE_SERVER_URL + `/file/data`,
         "POST",
-        { user_id: user?._id, file_id: userFile._id }
+        { user_id: user?._id, file_id: userFile._id, shape: "columns" }
       );
-      const originalData = data as Data;
+      const originalData = data as ColumnarData;
 
-      if (originalData && originalData.columns) {
+      if (originalData && originalData.columns && originalData.values) {
         // Get header column names for displaying in the data table
         const columns: Column[] = originalData.columns.map((col: any) => {
           return { id: col, label: col };
         });
+        // Build table rows from the column arrays
+        const rows: Row[] = Array.from({ length: originalData.total }, (_, index) => {
+          const row: Row = {};
+          originalData.columns.forEach((column, columnIndex) => {
+            const value = originalData.values[columnIndex][index];
+            if (value !== null) row[column] = value;
+          });
+          return row;
+        });
         setCurrentFileData({
           ...currentFileData,
           columns: columns,
-          rows: originalData.rows,
+          rows: rows,
         });
       }
       setLoadingData(false);
@@ -533,6 +540,7 @@ function App() {
                   setVisibleValidationForecasts={setVisibleValidationForecasts}
                   visibleValidationForecasts={visibleValidationForecasts}
                   validationForecasts={validationForecasts}
+                  forecastErrors={validationForecastErrors}
                   loadingForecasts={loadingValidationForecasts}
                   data={currentFileData}
                   validationForecastChart={true}
@@ -556,6 +564,7 @@ function App() {
                   validationForecastChart={false}
                   visibleValidationForecasts={undefined}
                   validationForecasts={undefined}
+                  forecastErrors={forecastErrors}
                   handleStepChange={handleStepChange}
                   numberOfSteps={parseInt(numberOfSteps, 10)}
                   handleExtrapolationForecast={handleExtrapolationForecast}
@@ -45,6 +45,7 @@ export const LineChart: React.FC<LineChartProps> = ({
   validationForecasts,
   visibleForecasts,
   validationForecastChart,
+  forecastErrors,
   handleStepChange,
   numberOfSteps,
   checkboxes,
@@ -830,6 +831,15 @@ export const LineChart: React.FC<LineChartProps> = ({
               </div>
             </div>
           )}
+          {/* Methods without forecasts */}
+          {!loadingForecasts &&
+            forecastErrors &&
+            Object.keys(forecastErrors).map((methodName: string) => (
+              <FormHelperText key={methodName} error>
+                {methodName.toUpperCase().replace("_", "+")}:{" "}
+                {forecastErrors[methodName]}
+              </FormHelperText>
+            ))}
           {loadingForecasts ? (
             <div
               style={{
@@ -15,6 +15,14 @@ export interface Data {
     columns: Column[],
     rows: Row[]
 }
+// File data returned with one array per column
+export interface ColumnarData {
+    columns: string[],
+    values: (string | null)[][],
+    offset: number,
+    limit: number | null,
+    total: number
+}
 export interface ParsedData {
     date: Date,
     value: Number
@@ -29,6 +37,15 @@ export interface ForecastData {
     sarima_svr: number[]
 }
 
+// Forecast of one request of a batch: the forecast, an empty array when there is no model for it,
+// or an error entry
+export type ForecastResult = number[] | { error: string };
+
+// Forecast errors of the methods that have no forecast
+export interface ForecastErrors {
+    [key: string]: string
+}
+
 // Forecasting method selection interface
 export interface MethodCheckboxes {
     [key: string]: boolean,
@@ -116,6 +133,7 @@ export interface LineChartProps extends DataTableProps {
     forecasts: ForecastData | undefined,
     validationForecasts: ForecastData | undefined,
     visibleForecasts: ForecastData | undefined,
+    forecastErrors?: ForecastErrors,
     setVisibleValidationForecasts?: React.Dispatch<React.SetStateAction<ForecastData>>,
     setVisibleForecasts?: React.Dispatch<React.SetStateAction<ForecastData>>,
     validationForecastChart?: boolean